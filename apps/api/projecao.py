@@ -0,0 +1,131 @@
+"""
+Projeção de campos (sparse fieldsets) das respostas da API
+?fields=numero,fase_atual,dados.cnpj seleciona só as colunas pedidas: cada
+campo da API declara as colunas de que precisa e as linhas são lidas com
+values_list. dados.<campo> extrai no banco apenas a chave pedida do JSON,
+sem trazer o dicionário inteiro de dados
+"""
+import re
+
+from django.db import connection
+from django.db.models import JSONField
+from django.db.models.expressions import RawSQL
+from django.db.models.fields.json import KeyTransform
+
+PREFIXO_DADOS = 'dados.'
+_NOME_CAMPO = re.compile(r'^[a-z][a-z0-9_]*$')
+
+
+class ProjecaoInvalida(ValueError):
+    """Campo pedido em ?fields que não existe no recurso"""
+
+
+class Campo:
+    """Colunas lidas do banco e a função que monta o valor de saída a partir delas"""
+
+    def __init__(self, *colunas, montar=None):
+        self.colunas = colunas
+        self.montar = montar
+
+
+def _data(valor):
+    return valor.isoformat() if valor else None
+
+
+def _relacao(rotulo='nome'):
+    def montar(pk, valor):
+        return {'id': pk, rotulo: valor} if pk is not None else None
+    return montar
+
+
+CAMPOS_PROCESSO = {
+    'id': Campo('id'),
+    'numero': Campo('numero'),
+    'tipo_processo': Campo('tipo_processo_id', 'tipo_processo__nome', montar=_relacao()),
+    'fase_atual': Campo('fase_atual_id', 'fase_atual__nome', montar=_relacao()),
+    'responsavel': Campo('responsavel_atual_id', 'responsavel_atual__username', montar=_relacao('username')),
+    'origem': Campo('origem'),
+    'criado_em': Campo('criado_em', montar=_data),
+    'atualizado_em': Campo('atualizado_em', montar=_data),
+    'dados': Campo('dados'),
+}
+
+CAMPOS_EVENTO = {
+    'id': Campo('id'),
+    'tipo_evento': Campo('tipo_evento'),
+    'criado_em': Campo('criado_em', montar=_data),
+    'fase_anterior': Campo('fase_anterior_id', 'fase_anterior__nome', montar=_relacao()),
+    'fase_nova': Campo('fase_nova_id', 'fase_nova__nome', montar=_relacao()),
+    'usuario': Campo('usuario_id', 'usuario__username', montar=_relacao('username')),
+    'observacoes': Campo('observacoes'),
+    'dados_alterados': Campo('dados_alterados'),
+}
+
+
+def valor_dados(modelo, nome_campo):
+    """
+    Expressão com o valor JSON de uma chave de dados, preservando o tipo
+    (json_extract do SQLite devolveria "0123" como o número 123)
+    """
+    tabela = connection.ops.quote_name(modelo._meta.db_table)
+    if connection.vendor == 'postgresql':
+        return RawSQL(f"({tabela}.\"dados\" -> '{nome_campo}')", [], output_field=JSONField())
+    if connection.vendor == 'sqlite':
+        return RawSQL(f"json_quote(json_extract({tabela}.\"dados\", '$.\"{nome_campo}\"'))", [], output_field=JSONField())
+    return KeyTransform(nome_campo, 'dados')
+
+
+class Projecao:
+    """
+    Colunas a selecionar e montagem de cada linha da resposta
+    internas: colunas sempre lidas depois das pedidas (cursor, busca por número)
+    e nunca incluídas na saída
+    """
+
+    def __init__(self, campos, pedido=None, internas=('criado_em', 'id'), com_dados=False):
+        nomes = [nome.strip() for nome in (pedido or '').split(',') if nome.strip()] or list(campos)
+        self.anotacoes = {}
+        self.colunas = []
+        # (nome de saída, chave de dados ou None, posição inicial, Campo)
+        self._montagem = []
+
+        for nome in dict.fromkeys(nomes):
+            if com_dados and nome.startswith(PREFIXO_DADOS):
+                chave = nome[len(PREFIXO_DADOS):]
+                if not _NOME_CAMPO.match(chave):
+                    raise ProjecaoInvalida(f"Campo de dados inválido: {nome}")
+                apelido = f'dados_{chave}'
+                self.anotacoes[apelido] = chave
+                self._montagem.append(('dados', chave, len(self.colunas), Campo(apelido)))
+                self.colunas.append(apelido)
+                continue
+            campo = campos.get(nome)
+            if campo is None:
+                raise ProjecaoInvalida(f"Campo desconhecido: {nome}. Disponíveis: {', '.join(campos)}")
+            self._montagem.append((nome, None, len(self.colunas), campo))
+            self.colunas.extend(campo.colunas)
+
+        self.inicio_internas = len(self.colunas)
+        self.colunas.extend(internas)
+
+    def consultar(self, queryset):
+        """values_list só com as colunas da projeção (pedidas e internas)"""
+        anotacoes = {
+            apelido: valor_dados(queryset.model, chave) for apelido, chave in self.anotacoes.items()
+        }
+        return queryset.annotate(**anotacoes).values_list(*self.colunas)
+
+    def internas(self, linha):
+        return linha[self.inicio_internas:]
+
+    def montar(self, linha):
+        """Dicionário de saída de uma linha, só com os campos pedidos"""
+        saida = {}
+        for nome, chave, inicio, campo in self._montagem:
+            valores = linha[inicio:inicio + len(campo.colunas)]
+            valor = campo.montar(*valores) if campo.montar else valores[0]
+            if chave is None:
+                saida[nome] = valor
+            else:
+                saida.setdefault('dados', {})[chave] = valor
+        return saida
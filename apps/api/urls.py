@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.urls import path
+from . import views, views_assincronas
+
+app_name = 'api'
+
+# Variantes com o ORM assíncrono para o servidor ASGI (VIEWS_ASSINCRONAS)
+modulo = views_assincronas if settings.VIEWS_ASSINCRONAS else views
+
+urlpatterns = [
+    path('processos/', modulo.processos, name='processos'),
+    path('processos/<int:processo_id>/', modulo.processo, name='processo'),
+    path('processos/<int:processo_id>/historico/', modulo.historico, name='historico'),
+    path('tipos-processo/', modulo.tipos_processo, name='tipos_processo'),
+]
@@ -0,0 +1,250 @@
+"""
+API JSON somente leitura (v1) para integrações
+Processos (com os mesmos filtros da listagem), histórico e configuração do
+workflow. Listas paginam por cursor (?cursor=, ?limite=) ou, com
+?formato=ndjson, são enviadas inteiras em streaming, um objeto por linha
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from apps.auditoria.models import HistoricoProcesso
+from apps.core.desempenho import orcamento_consultas
+from apps.core.models import TipoProcesso, Fase, CampoFormulario
+from apps.core.paginacao import PaginadorCursor
+from apps.processos.filtros import filtros_da_requisicao, filtrar_processos
+from apps.processos.models import InstanciaProcesso
+from apps.usuarios.permissoes import fases_autorizadas
+from .projecao import Projecao, ProjecaoInvalida, CAMPOS_PROCESSO, CAMPOS_EVENTO
+
+# Colunas internas dos processos: número (busca em lote) e cursor
+INTERNAS_PROCESSO = ('numero', 'criado_em', 'id')
+
+
+class ParametroInvalido(ValueError):
+    """Parâmetro da querystring fora do formato aceito"""
+
+
+def exige_login(view_func):
+    """Como login_required, mas responde 401 em JSON em vez de redirecionar"""
+    @wraps(view_func)
+    def _view(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'erro': 'Autenticação necessária'}, status=401)
+        return view_func(request, *args, **kwargs)
+    return _view
+
+
+def _erro(mensagem, status=400):
+    return JsonResponse({'erro': mensagem}, status=status)
+
+
+def _limite(request):
+    try:
+        limite = int(request.GET.get('limite') or settings.API_POR_PAGINA)
+    except ValueError:
+        raise ParametroInvalido("limite deve ser um número inteiro")
+    if not 1 <= limite <= settings.API_LIMITE_MAXIMO:
+        raise ParametroInvalido(f"limite deve estar entre 1 e {settings.API_LIMITE_MAXIMO}")
+    return limite
+
+
+def _numeros(request):
+    """Números da busca em lote: ?numeros=A,B,C (ou o parâmetro repetido)"""
+    numeros = [
+        numero.strip()
+        for valor in request.GET.getlist('numeros')
+        for numero in valor.split(',')
+        if numero.strip()
+    ]
+    numeros = list(dict.fromkeys(numeros))
+    if len(numeros) > settings.API_LIMITE_MAXIMO:
+        raise ParametroInvalido(f"No máximo {settings.API_LIMITE_MAXIMO} números por consulta")
+    return numeros
+
+
+def _processos_visiveis(usuario):
+    """Processos nas fases em que o usuário pode atuar (todos para superusuário)"""
+    processos = InstanciaProcesso.objects.all()
+    if not usuario.is_superuser:
+        processos = processos.filter(fase_atual_id__in=fases_autorizadas(usuario))
+    return processos
+
+
+def _json(dados):
+    return JsonResponse(dados, json_dumps_params={'ensure_ascii': False})
+
+
+def _projecao_processo(request):
+    return Projecao(CAMPOS_PROCESSO, request.GET.get('fields'), internas=INTERNAS_PROCESSO, com_dados=True)
+
+
+def _eventos(request, processo_id):
+    """Eventos do histórico no banco, filtrados por ?tipo_evento="""
+    eventos = HistoricoProcesso.objects.filter(instancia_processo_id=processo_id)
+    if request.GET.get('tipo_evento'):
+        eventos = eventos.filter(tipo_evento=request.GET['tipo_evento'])
+    return eventos
+
+
+def _ndjson(projecao, linhas):
+    """Gerador de blocos NDJSON (um objeto JSON por linha)"""
+    codificador = DjangoJSONEncoder(ensure_ascii=False)
+    bloco = []
+    for linha in linhas.iterator(chunk_size=settings.PROCESSOS_EXPORTACAO_BLOCO):
+        bloco.append(codificador.encode(projecao.montar(linha)))
+        if len(bloco) == 500:
+            yield '\n'.join(bloco) + '\n'
+            bloco = []
+    if bloco:
+        yield '\n'.join(bloco) + '\n'
+
+
+def _resposta_ndjson(blocos):
+    return StreamingHttpResponse(blocos, content_type='application/x-ndjson; charset=utf-8')
+
+
+def _paginador(request, projecao, linhas):
+    return PaginadorCursor(
+        linhas, por_pagina=_limite(request), chave=lambda linha: projecao.internas(linha)[-2:]
+    )
+
+
+def _resposta_pagina(projecao, pagina, chave_lista):
+    return _json({
+        chave_lista: [projecao.montar(linha) for linha in pagina],
+        'cursores': pagina.cursores(),
+    })
+
+
+def _resposta_processos(projecao, linhas, numeros):
+    """Resultado da busca em lote, com os números não encontrados"""
+    encontrados = {projecao.internas(linha)[0] for linha in linhas}
+    return _json({
+        'processos': [projecao.montar(linha) for linha in linhas],
+        'nao_encontrados': [numero for numero in numeros if numero not in encontrados],
+    })
+
+
+def _tipos(request):
+    """Tipos ativos da configuração, filtrados por ?tipo="""
+    tipos = TipoProcesso.objects.filter(ativo=True).order_by('nome')
+    if request.GET.get('tipo'):
+        if not request.GET['tipo'].isdigit():
+            raise ParametroInvalido('tipo deve ser o id do tipo de processo')
+        tipos = tipos.filter(pk=request.GET['tipo'])
+    return tipos.values('id', 'nome', 'descricao', 'prefixo_numero')
+
+
+def _fases(tipos_ids):
+    return Fase.objects.filter(tipo_processo_id__in=tipos_ids).order_by('ordem', 'id').values(
+        'tipo_processo_id', 'id', 'nome', 'ordem', 'setor_responsavel', 'fase_inicial', 'fase_final',
+        'permite_avancar', 'permite_retornar',
+    )
+
+
+def _campos(tipos_ids):
+    return CampoFormulario.objects.filter(tipo_processo_id__in=tipos_ids).order_by('ordem', 'id').values(
+        'tipo_processo_id', 'nome_campo', 'label', 'tipo_campo', 'opcoes', 'obrigatorio', 'grupo',
+        'indexado', 'visivel_formulario_externo',
+    )
+
+
+def _configuracao(tipos, fases, campos):
+    """Resposta de tipos_processo: cada tipo com suas fases e campos"""
+    tipos = {tipo['id']: {**tipo, 'fases': [], 'campos': []} for tipo in tipos}
+    for fase in fases:
+        tipos[fase.pop('tipo_processo_id')]['fases'].append(fase)
+    for campo in campos:
+        tipos[campo.pop('tipo_processo_id')]['campos'].append(campo)
+    return _json({'tipos_processo': list(tipos.values())})
+
+
+def _listar(request, projecao, queryset, chave_lista):
+    """Página por cursor, ou a lista inteira em NDJSON com ?formato=ndjson"""
+    linhas = projecao.consultar(queryset)
+
+    if request.GET.get('formato') == 'ndjson':
+        return _resposta_ndjson(_ndjson(projecao, linhas.order_by('-criado_em', '-id')))
+
+    pagina = _paginador(request, projecao, linhas).pagina(request.GET.get('cursor'))
+    return _resposta_pagina(projecao, pagina, chave_lista)
+
+
+@orcamento_consultas(8)
+@exige_login
+@require_GET
+def processos(request):
+    """
+    Processos com os filtros da listagem (tipo, fase, setor, responsavel,
+    busca, dado_<campo>, de_/ate_<campo>) e ?fields=
+    Com ?numeros=, busca em lote por número (sem paginação) e informa os
+    números não encontrados
+    """
+    try:
+        projecao = _projecao_processo(request)
+        numeros = _numeros(request)
+        processos = filtrar_processos(_processos_visiveis(request.user), filtros_da_requisicao(request))
+
+        if not numeros:
+            return _listar(request, projecao, processos, 'processos')
+
+        processos = processos.filter(numero__in=numeros)
+        if request.GET.get('formato') == 'ndjson':
+            return _listar(request, projecao, processos, 'processos')
+
+        linhas = list(projecao.consultar(processos).order_by('-criado_em', '-id'))
+        return _resposta_processos(projecao, linhas, numeros)
+    except ValueError as e:
+        # ParametroInvalido, ProjecaoInvalida, CursorInvalido e filtros com valor inválido
+        return _erro(str(e))
+
+
+@orcamento_consultas(7)
+@exige_login
+@require_GET
+def processo(request, processo_id):
+    """Um processo (aceita ?fields)"""
+    try:
+        projecao = _projecao_processo(request)
+    except ProjecaoInvalida as e:
+        return _erro(str(e))
+
+    linha = projecao.consultar(_processos_visiveis(request.user).filter(pk=processo_id)).first()
+    if linha is None:
+        return _erro('Processo não encontrado', status=404)
+    return _json(projecao.montar(linha))
+
+
+@orcamento_consultas(8)
+@exige_login
+@require_GET
+def historico(request, processo_id):
+    """
+    Eventos do histórico no banco (os arquivados ficam em /processos/<id>/historico/)
+    Parâmetros: tipo_evento, fields, cursor, limite, formato=ndjson
+    """
+    if not _processos_visiveis(request.user).filter(pk=processo_id).exists():
+        return _erro('Processo não encontrado', status=404)
+
+    try:
+        projecao = Projecao(CAMPOS_EVENTO, request.GET.get('fields'))
+        return _listar(request, projecao, _eventos(request, processo_id), 'eventos')
+    except ValueError as e:
+        return _erro(str(e))
+
+
+@orcamento_consultas(6)
+@exige_login
+@require_GET
+def tipos_processo(request):
+    """Configuração do workflow: tipos ativos com fases e campos (3 consultas)"""
+    try:
+        tipos = list(_tipos(request))
+    except ParametroInvalido as e:
+        return _erro(str(e))
+    ids = [tipo['id'] for tipo in tipos]
+    return _configuracao(tipos, _fases(ids), _campos(ids))
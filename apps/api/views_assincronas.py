@@ -0,0 +1,150 @@
+"""
+API JSON (v1) com o ORM assíncrono, para o servidor ASGI (VIEWS_ASSINCRONAS=True)
+Mesmos parâmetros, respostas e orçamentos de consultas de views, cujos
+auxiliares leem a requisição e montam as respostas; aqui ficam só as
+chamadas ao ORM. Sessão, usuário e permissões são resolvidos numa thread (o request.user do Django
+4.2 é síncrono); as consultas usam afirst/aexists/async for e o NDJSON é
+lido bloco a bloco numa thread
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from apps.core.desempenho import orcamento_consultas
+from apps.processos.filtros import filtros_da_requisicao, filtrar_processos
+from .projecao import Projecao, ProjecaoInvalida, CAMPOS_EVENTO
+from .views import (
+    ParametroInvalido, _campos, _configuracao, _erro, _eventos, _fases, _json, _numeros, _paginador,
+    _processos_visiveis, _projecao_processo, _resposta_ndjson, _resposta_pagina, _resposta_processos, _tipos,
+)
+from .views import _ndjson as _ndjson_sincrono
+
+
+def _autenticar(request):
+    """Usuário autenticado ou None (sessão e usuário vêm do banco)"""
+    return request.user if request.user.is_authenticated else None
+
+
+async def _visiveis(usuario):
+    """Queryset dos processos visíveis (as fases autorizadas podem vir do banco)"""
+    return await sync_to_async(_processos_visiveis)(usuario)
+
+
+def exige_login(view_func):
+    """Como views.exige_login, para views assíncronas"""
+    @wraps(view_func)
+    async def _view(request, *args, **kwargs):
+        if await sync_to_async(_autenticar)(request) is None:
+            return JsonResponse({'erro': 'Autenticação necessária'}, status=401)
+        return await view_func(request, *args, **kwargs)
+    return _view
+
+
+def somente_get(view_func):
+    """require_GET para views assíncronas (o do Django 4.2 só envolve views síncronas)"""
+    @wraps(view_func)
+    async def _view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        return await view_func(request, *args, **kwargs)
+    return _view
+
+
+async def _ndjson(projecao, linhas):
+    """
+    Blocos NDJSON de views._ndjson, cada um lido numa thread
+    (o aiterator do Django 4.2 executa consultas values_list dentro do loop)
+    """
+    blocos = _ndjson_sincrono(projecao, linhas)
+    proximo = sync_to_async(next, thread_sensitive=True)
+    while True:
+        bloco = await proximo(blocos, None)
+        if bloco is None:
+            return
+        yield bloco
+
+
+async def _listar(request, projecao, queryset, chave_lista):
+    """Página por cursor, ou a lista inteira em NDJSON com ?formato=ndjson"""
+    linhas = projecao.consultar(queryset)
+
+    if request.GET.get('formato') == 'ndjson':
+        return _resposta_ndjson(_ndjson(projecao, linhas.order_by('-criado_em', '-id')))
+
+    pagina = await _paginador(request, projecao, linhas).apagina(request.GET.get('cursor'))
+    return _resposta_pagina(projecao, pagina, chave_lista)
+
+
+@orcamento_consultas(8)
+@exige_login
+@somente_get
+async def processos(request):
+    """Processos com os filtros da listagem e ?fields= (ver views.processos)"""
+    try:
+        projecao = _projecao_processo(request)
+        numeros = _numeros(request)
+        # Filtros por campo consultam o esquema do tipo (cache ou ORM síncrono)
+        processos = await sync_to_async(filtrar_processos)(
+            await _visiveis(request.user), filtros_da_requisicao(request)
+        )
+
+        if not numeros:
+            return await _listar(request, projecao, processos, 'processos')
+
+        processos = processos.filter(numero__in=numeros)
+        if request.GET.get('formato') == 'ndjson':
+            return await _listar(request, projecao, processos, 'processos')
+
+        linhas = [linha async for linha in projecao.consultar(processos).order_by('-criado_em', '-id')]
+        return _resposta_processos(projecao, linhas, numeros)
+    except ValueError as e:
+        return _erro(str(e))
+
+
+@orcamento_consultas(7)
+@exige_login
+@somente_get
+async def processo(request, processo_id):
+    """Um processo (aceita ?fields)"""
+    try:
+        projecao = _projecao_processo(request)
+    except ProjecaoInvalida as e:
+        return _erro(str(e))
+
+    processos = await _visiveis(request.user)
+    linha = await projecao.consultar(processos.filter(pk=processo_id)).afirst()
+    if linha is None:
+        return _erro('Processo não encontrado', status=404)
+    return _json(projecao.montar(linha))
+
+
+@orcamento_consultas(8)
+@exige_login
+@somente_get
+async def historico(request, processo_id):
+    """Eventos do histórico no banco (ver views.historico)"""
+    processos = await _visiveis(request.user)
+    if not await processos.filter(pk=processo_id).aexists():
+        return _erro('Processo não encontrado', status=404)
+
+    try:
+        projecao = Projecao(CAMPOS_EVENTO, request.GET.get('fields'))
+        return await _listar(request, projecao, _eventos(request, processo_id), 'eventos')
+    except ValueError as e:
+        return _erro(str(e))
+
+
+@orcamento_consultas(6)
+@exige_login
+@somente_get
+async def tipos_processo(request):
+    """Configuração do workflow: tipos ativos com fases e campos (3 consultas)"""
+    try:
+        tipos = [tipo async for tipo in _tipos(request)]
+    except ParametroInvalido as e:
+        return _erro(str(e))
+    ids = [tipo['id'] for tipo in tipos]
+    fases = [fase async for fase in _fases(ids)]
+    campos = [campo async for campo in _campos(ids)]
+    return _configuracao(tipos, fases, campos)
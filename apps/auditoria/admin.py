@@ -1,5 +1,10 @@
-from django.contrib import admin
-from .models import HistoricoProcesso
+from django.contrib import admin, messages
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path
+from apps.processos.models import InstanciaProcesso
+from .models import HistoricoProcesso, SegmentoHistorico
+from . import arquivamento
 
 
 @admin.register(HistoricoProcesso)
@@ -10,6 +15,34 @@ class HistoricoProcessoAdmin(admin.ModelAdmin):
     readonly_fields = ['instancia_processo', 'tipo_evento', 'fase_anterior', 'fase_nova', 
                        'usuario', 'observacoes', 'dados_alterados', 'criado_em']
     
+    def get_urls(self):
+        urls = [
+            path(
+                'arquivado/<int:processo_id>/',
+                self.admin_site.admin_view(self.historico_arquivado_view),
+                name='auditoria_historicoprocesso_arquivado',
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def historico_arquivado_view(self, request, processo_id):
+        """Eventos do processo lidos dos segmentos arquivados"""
+        processo = get_object_or_404(InstanciaProcesso, id=processo_id)
+        try:
+            eventos = arquivamento.eventos_arquivados(processo)
+        except arquivamento.SegmentoCorrompido as e:
+            eventos = []
+            messages.error(request, f'Não foi possível ler o histórico arquivado: {e}')
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Histórico arquivado de {processo.numero}',
+            'processo': processo,
+            'eventos': eventos,
+        }
+        return TemplateResponse(request, 'admin/auditoria/historico_arquivado.html', context)
+    
     def has_add_permission(self, request):
         """Impede criação manual de histórico"""
         return False
@@ -21,3 +54,22 @@ class HistoricoProcessoAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         """Impede exclusão de histórico"""
         return False
+
+
+@admin.register(SegmentoHistorico)
+class SegmentoHistoricoAdmin(admin.ModelAdmin):
+    list_display = ['mes', 'parte', 'total_eventos', 'total_processos', 'tamanho_bytes', 'status', 'concluido_em']
+    list_filter = ['status']
+    readonly_fields = ['mes', 'parte', 'arquivo', 'sha256', 'tamanho_bytes', 'total_eventos',
+                       'total_processos', 'status', 'criado_em', 'concluido_em']
+    
+    def has_add_permission(self, request):
+        """Segmentos são criados pelo comando arquivar_historico"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        """O índice dos eventos arquivados depende do segmento"""
+        return False
@@ -0,0 +1,308 @@
+"""
+Análise do workflow sobre uma extração colunar do histórico
+Os eventos de criação e mudança de fase são extraídos de forma incremental
+(a partir da marca d'água do último id extraído, só até eventos com mais de
+ANALITICO_ATRASO_SEGUNDOS, para não saltar ids de transações ainda abertas
+que confirmam depois de ids maiores) para arquivos binários
+int64/int32, um por coluna, lidos com numpy.memmap. As métricas por tipo de
+processo (vazão, tempo de ciclo, retrabalho e gargalos) são calculadas com
+operações vetorizadas sobre essas colunas, sem consultar o histórico
+"""
+import gzip
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core.models import Fase
+from .arquivamento import _limites, diretorio_arquivo
+from .models import HistoricoProcesso, SegmentoHistorico
+
+COLUNAS = {
+    'evento': np.int64,
+    'instancia': np.int64,
+    'tipo': np.int32,
+    'fase_anterior': np.int32,   # 0 no evento de criação
+    'fase_nova': np.int32,
+    'tempo': np.int64,           # segundos desde a época (UTC)
+}
+
+EVENTOS_DE_FASE = ['criacao', 'mudanca_fase']
+PERCENTIS = (50, 90, 95)
+
+
+def diretorio_analitico():
+    return Path(settings.ANALITICO_DIR)
+
+
+def _caminho(coluna):
+    return diretorio_analitico() / f'{coluna}.bin'
+
+
+def ler_metadados():
+    caminho = diretorio_analitico() / 'metadados.json'
+    if not caminho.exists():
+        return {'marca_dagua': 0, 'total': 0, 'extraido_em': None}
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_metadados(metadados):
+    caminho = diretorio_analitico() / 'metadados.json'
+    temporario = caminho.with_suffix('.tmp')
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(metadados, arquivo)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+
+
+def carregar_colunas():
+    """Colunas extraídas como memmaps somente leitura (dict coluna -> array)"""
+    total = ler_metadados()['total']
+    colunas = {}
+    for coluna, tipo in COLUNAS.items():
+        if total:
+            colunas[coluna] = np.memmap(_caminho(coluna), dtype=tipo, mode='r', shape=(total,))
+        else:
+            colunas[coluna] = np.empty(0, dtype=tipo)
+    return colunas
+
+
+class _Gravador:
+    """Acrescenta blocos às colunas; o total só vale após gravar os metadados"""
+
+    def __init__(self, total, tamanho_bloco):
+        diretorio_analitico().mkdir(parents=True, exist_ok=True)
+        self.tamanho_bloco = tamanho_bloco
+        self.total = total
+        self.arquivos = {}
+        for coluna, tipo in COLUNAS.items():
+            arquivo = open(_caminho(coluna), 'ab')
+            # Descarta o que uma extração interrompida gravou além do total
+            arquivo.truncate(total * np.dtype(tipo).itemsize)
+            self.arquivos[coluna] = arquivo
+        self.linhas = []
+
+    def adicionar(self, linha):
+        self.linhas.append(linha)
+        if len(self.linhas) >= self.tamanho_bloco:
+            self.descarregar()
+
+    def descarregar(self):
+        if not self.linhas:
+            return
+        bloco = np.array(self.linhas, dtype=np.int64)
+        for posicao, (coluna, tipo) in enumerate(COLUNAS.items()):
+            self.arquivos[coluna].write(bloco[:, posicao].astype(tipo).tobytes())
+        self.total += len(self.linhas)
+        self.linhas = []
+
+    def fechar(self):
+        self.descarregar()
+        for arquivo in self.arquivos.values():
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+            arquivo.close()
+
+
+def _segmentos_iniciais(gravador, tipos_por_instancia):
+    """Eventos de fase dos segmentos arquivados (apenas na primeira extração)"""
+    for segmento in SegmentoHistorico.objects.filter(status='concluido').order_by('mes', 'parte'):
+        with gzip.open(diretorio_arquivo() / segmento.arquivo, 'rt', encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                evento = json.loads(linha)
+                if evento['tipo_evento'] not in EVENTOS_DE_FASE:
+                    continue
+                gravador.adicionar((
+                    evento['id'],
+                    evento['instancia_processo_id'],
+                    tipos_por_instancia.get(evento['instancia_processo_id'], 0),
+                    evento['fase_anterior_id'] or 0,
+                    evento['fase_nova_id'] or 0,
+                    int(parse_datetime(evento['criado_em']).timestamp()),
+                ))
+
+
+def extrair(tamanho_bloco=50000):
+    """
+    Acrescenta às colunas os eventos de fase com id acima da marca d'água,
+    em ordem de id, parando no primeiro evento mais recente que o atraso
+    Na primeira extração também lê os segmentos já arquivados; o
+    arquivar_historico extrai antes de remover eventos do banco
+    Retorna o número de eventos novos
+    """
+    from apps.processos.models import InstanciaProcesso
+
+    corte = timezone.now() - timedelta(seconds=settings.ANALITICO_ATRASO_SEGUNDOS)
+    metadados = ler_metadados()
+    gravador = _Gravador(metadados['total'], tamanho_bloco)
+    marca = metadados['marca_dagua']
+    try:
+        if not metadados['total']:
+            tipos_por_instancia = dict(InstanciaProcesso.objects.values_list('id', 'tipo_processo_id'))
+            _segmentos_iniciais(gravador, tipos_por_instancia)
+
+        eventos = HistoricoProcesso.objects.filter(
+            id__gt=marca, tipo_evento__in=EVENTOS_DE_FASE
+        ).order_by('id').values_list(
+            'id', 'instancia_processo_id', 'instancia_processo__tipo_processo_id',
+            'fase_anterior_id', 'fase_nova_id', 'criado_em',
+        )
+        for evento_id, instancia_id, tipo_id, anterior_id, nova_id, criado_em in eventos.iterator(chunk_size=tamanho_bloco):
+            if criado_em > corte:
+                break
+            gravador.adicionar((
+                evento_id, instancia_id, tipo_id, anterior_id or 0, nova_id or 0, int(criado_em.timestamp())
+            ))
+            marca = evento_id
+    finally:
+        gravador.fechar()
+
+    novos = gravador.total - metadados['total']
+    _gravar_metadados({
+        'marca_dagua': marca,
+        'total': gravador.total,
+        'extraido_em': timezone.now().isoformat(),
+    })
+    return novos
+
+
+def nao_extraidos(mes):
+    """
+    Eventos de fase do mês ainda acima da marca d'água, após uma extração
+    (0 se a extração não existe: a primeira lê os segmentos arquivados)
+    """
+    if not ler_metadados()['total']:
+        return 0
+    extrair()
+    inicio, fim = _limites(mes)
+    return HistoricoProcesso.objects.filter(
+        id__gt=ler_metadados()['marca_dagua'], tipo_evento__in=EVENTOS_DE_FASE,
+        criado_em__gte=inicio, criado_em__lt=fim,
+    ).count()
+
+
+def recriar():
+    """Apaga a extração (a próxima extrai tudo de novo)"""
+    for coluna in COLUNAS:
+        _caminho(coluna).unlink(missing_ok=True)
+    (diretorio_analitico() / 'metadados.json').unlink(missing_ok=True)
+
+
+def _percentis(valores):
+    if not len(valores):
+        return {p: None for p in PERCENTIS}
+    calculados = np.percentile(valores, PERCENTIS)
+    return {p: float(v) for p, v in zip(PERCENTIS, calculados)}
+
+
+def metricas(tipo_processo, dias=30, colunas=None, agora=None):
+    """
+    Métricas do tipo de processo a partir das colunas extraídas
+    dias: janela da vazão (entradas e saídas por fase)
+    Durações em segundos
+    """
+    colunas = colunas if colunas is not None else carregar_colunas()
+    agora = int((agora or timezone.now()).timestamp())
+    fases = list(Fase.objects.filter(tipo_processo=tipo_processo).order_by('ordem').values(
+        'id', 'nome', 'ordem', 'fase_final', cor=F('cor_badge'),
+    ))
+
+    filtro = np.asarray(colunas['tipo']) == tipo_processo.id
+    instancia = np.asarray(colunas['instancia'])[filtro]
+    tempo = np.asarray(colunas['tempo'])[filtro]
+    anterior = np.asarray(colunas['fase_anterior'])[filtro]
+    nova = np.asarray(colunas['fase_nova'])[filtro]
+    evento = np.asarray(colunas['evento'])[filtro]
+
+    # Eventos de cada processo em ordem cronológica
+    ordem = np.lexsort((evento, tempo, instancia))
+    instancia, tempo, anterior, nova = instancia[ordem], tempo[ordem], anterior[ordem], nova[ordem]
+
+    # Estadias: da entrada na fase (fase_nova) até o próximo evento do mesmo processo
+    mesmo_processo = instancia[1:] == instancia[:-1]
+    fase_estadia = nova[:-1][mesmo_processo]
+    duracao = (tempo[1:] - tempo[:-1])[mesmo_processo]
+    saida = tempo[1:][mesmo_processo]
+
+    # Última fase de cada processo (estadia em aberto)
+    ultimo = np.ones(len(instancia), dtype=bool)
+    ultimo[:-1] = ~mesmo_processo
+    fase_atual = nova[ultimo]
+    entrada_atual = tempo[ultimo]
+
+    # Ordem de cada fase, para identificar retornos (retrabalho)
+    ids_fase = np.array([f['id'] for f in fases], dtype=np.int64)
+    ordens = np.array([f['ordem'] for f in fases], dtype=np.int64)
+    posicoes = np.argsort(ids_fase)
+
+    def ordem_de(valores):
+        if not len(ids_fase):
+            return np.zeros(len(valores), dtype=np.int64)
+        indices = np.clip(np.searchsorted(ids_fase[posicoes], valores), 0, len(ids_fase) - 1)
+        encontrada = ids_fase[posicoes][indices] == valores
+        return np.where(encontrada, ordens[posicoes][indices], -1)
+
+    mudanca = anterior != 0
+    retorno = mudanca & (ordem_de(nova) < ordem_de(anterior)) & (ordem_de(nova) >= 0)
+
+    inicio_janela = agora - dias * 86400
+    resultado_fases = []
+    for fase in fases:
+        da_fase = fase_estadia == fase['id']
+        duracoes = duracao[da_fase]
+        saidas = int(np.count_nonzero(da_fase & (saida >= inicio_janela)))
+        abertas = fase_atual == fase['id']
+        retornos = int(np.count_nonzero(retorno & (anterior == fase['id'])))
+        percentis = _percentis(duracoes)
+        wip = int(np.count_nonzero(abertas)) if not fase['fase_final'] else 0
+        resultado_fases.append({
+            **fase,
+            'entradas': int(np.count_nonzero((nova == fase['id']) & (tempo >= inicio_janela))),
+            'saidas': saidas,
+            'vazao_dia': round(saidas / dias, 2) if dias else None,
+            'estadias': int(len(duracoes)),
+            'duracao': percentis,
+            'em_andamento': wip,
+            'espera_atual_p50': float(np.median(agora - entrada_atual[abertas])) if wip else None,
+            'retrabalho': round(retornos / len(duracoes), 4) if len(duracoes) else 0.0,
+            # Gargalo: processos parados na fase x mediana do tempo na fase
+            'gargalo': round(wip * (percentis[50] or 0) / 86400, 1),
+        })
+
+    # Tempo de ciclo: criação até a primeira entrada numa fase final
+    finais = ids_fase[np.array([f['fase_final'] for f in fases], dtype=bool)]
+    criados, primeira = np.unique(instancia, return_index=True)
+    em_final = np.isin(nova, finais)
+    concluidos, primeira_final = np.unique(instancia[em_final], return_index=True)
+    inicio_ciclo = tempo[primeira][np.searchsorted(criados, concluidos)]
+    ciclo = tempo[em_final][primeira_final] - inicio_ciclo
+
+    com_retorno = np.unique(instancia[retorno])
+    return {
+        'tipo_processo': tipo_processo,
+        'dias': dias,
+        'processos': int(len(criados)),
+        'eventos': int(len(instancia)),
+        'concluidos': int(len(concluidos)),
+        'ciclo': _percentis(ciclo),
+        'taxa_retrabalho': round(len(com_retorno) / len(criados), 4) if len(criados) else 0.0,
+        'fases': resultado_fases,
+        'gargalos': sorted(
+            (f for f in resultado_fases if f['gargalo'] > 0), key=lambda f: f['gargalo'], reverse=True
+        )[:3],
+    }
+
+
+def formatar_duracao(segundos):
+    if segundos is None:
+        return '-'
+    horas = segundos / 3600
+    return f"{horas / 24:.1f}d" if horas >= 48 else f"{horas:.1f}h"
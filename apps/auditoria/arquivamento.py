@@ -0,0 +1,258 @@
+"""
+Arquivamento do histórico de processos
+Meses fechados são exportados para segmentos JSONL compactados (um membro
+gzip por processo, com checksum SHA-256 do arquivo) e só então removidos do
+banco, em lotes curtos. A leitura dos eventos arquivados de um processo lê
+apenas o membro gzip daquele processo
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core.models import Fase
+from .models import HistoricoProcesso, SegmentoHistorico, IndiceSegmentoHistorico
+
+CAMPOS_EVENTO = [
+    'id', 'instancia_processo_id', 'tipo_evento', 'fase_anterior_id', 'fase_nova_id',
+    'usuario_id', 'observacoes', 'dados_alterados', 'criado_em',
+]
+
+
+class SegmentoCorrompido(Exception):
+    """Arquivo de segmento ausente ou com checksum divergente"""
+
+
+def diretorio_arquivo():
+    return Path(settings.HISTORICO_ARQUIVO_DIR)
+
+
+def inicio_do_mes(data):
+    return date(data.year, data.month, 1)
+
+
+def proximo_mes(mes):
+    return date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+
+
+def _limites(mes):
+    """Intervalo [início, fim) do mês no fuso do projeto"""
+    fuso = timezone.get_current_timezone()
+    inicio = timezone.make_aware(datetime.combine(mes, datetime.min.time()), fuso)
+    fim = timezone.make_aware(datetime.combine(proximo_mes(mes), datetime.min.time()), fuso)
+    return inicio, fim
+
+
+def meses_fechados(retencao_meses):
+    """Meses anteriores à janela de retenção que ainda têm eventos no banco"""
+    limite = inicio_do_mes(timezone.localdate())
+    for _ in range(retencao_meses):
+        limite = inicio_do_mes(limite - timedelta(days=1))
+    corte, _ = _limites(limite)
+
+    mais_antigo = HistoricoProcesso.objects.filter(criado_em__lt=corte).order_by('criado_em').first()
+    if mais_antigo is None:
+        return []
+
+    meses = []
+    mes = inicio_do_mes(timezone.localtime(mais_antigo.criado_em).date())
+    while mes < limite:
+        meses.append(mes)
+        mes = proximo_mes(mes)
+    return meses
+
+
+def _sha256(caminho):
+    digest = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def _serializar(evento):
+    evento = dict(evento)
+    evento['criado_em'] = evento['criado_em'].isoformat()
+    return json.dumps(evento, ensure_ascii=False, separators=(',', ':'))
+
+
+def exportar_mes(mes, tamanho_leitura=2000):
+    """
+    Grava os eventos do mês num novo segmento e registra seu índice
+    Retorna o SegmentoHistorico (status 'exportado') ou None se não há eventos
+    """
+    inicio, fim = _limites(mes)
+    eventos = HistoricoProcesso.objects.filter(
+        criado_em__gte=inicio, criado_em__lt=fim
+    ).order_by('instancia_processo_id', 'criado_em', 'id').values(*CAMPOS_EVENTO)
+
+    parte = (SegmentoHistorico.objects.filter(mes=mes).order_by('-parte')
+             .values_list('parte', flat=True).first() or 0) + 1
+    relativo = Path(str(mes.year)) / f"{mes:%Y-%m}-parte{parte:02d}.jsonl.gz"
+    destino = diretorio_arquivo() / relativo
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_suffix('.tmp')
+
+    indices = []
+    total = 0
+    with open(temporario, 'wb') as arquivo:
+        atual = None
+        linhas = []
+
+        def gravar_membro():
+            # Cada processo vira um membro gzip (wbits=31) independente
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            dados = compressor.compress('\n'.join(linhas).encode() + b'\n') + compressor.flush()
+            indices.append((atual, len(linhas), arquivo.tell(), len(dados)))
+            arquivo.write(dados)
+
+        for evento in eventos.iterator(chunk_size=tamanho_leitura):
+            if evento['instancia_processo_id'] != atual:
+                if linhas:
+                    gravar_membro()
+                atual, linhas = evento['instancia_processo_id'], []
+            linhas.append(_serializar(evento))
+            total += 1
+        if linhas:
+            gravar_membro()
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+
+    if not total:
+        temporario.unlink()
+        return None
+
+    os.replace(temporario, destino)
+    os.chmod(destino, 0o444)
+
+    with transaction.atomic():
+        segmento = SegmentoHistorico.objects.create(
+            mes=mes,
+            parte=parte,
+            arquivo=relativo.as_posix(),
+            sha256=_sha256(destino),
+            tamanho_bytes=destino.stat().st_size,
+            total_eventos=total,
+            total_processos=len(indices),
+        )
+        IndiceSegmentoHistorico.objects.bulk_create([
+            IndiceSegmentoHistorico(
+                segmento=segmento, instancia_processo_id=instancia_id,
+                eventos=quantidade, deslocamento=deslocamento, tamanho=tamanho,
+            )
+            for instancia_id, quantidade, deslocamento, tamanho in indices
+        ], batch_size=2000)
+    return segmento
+
+
+def verificar_segmento(segmento):
+    """Confere checksum e número de eventos do arquivo; levanta SegmentoCorrompido"""
+    caminho = diretorio_arquivo() / segmento.arquivo
+    if not caminho.exists():
+        raise SegmentoCorrompido(f"Arquivo ausente: {caminho}")
+    if _sha256(caminho) != segmento.sha256:
+        raise SegmentoCorrompido(f"Checksum divergente: {caminho}")
+    with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+        linhas = sum(1 for _ in arquivo)
+    if linhas != segmento.total_eventos:
+        raise SegmentoCorrompido(
+            f"{caminho}: {linhas} eventos no arquivo, {segmento.total_eventos} registrados"
+        )
+
+
+def ids_do_segmento(segmento, tamanho_lote):
+    """Ids dos eventos gravados no segmento, em lotes"""
+    lote = []
+    with gzip.open(diretorio_arquivo() / segmento.arquivo, 'rt', encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            lote.append(json.loads(linha)['id'])
+            if len(lote) >= tamanho_lote:
+                yield lote
+                lote = []
+    if lote:
+        yield lote
+
+
+def remover_do_banco(segmento, tamanho_lote=5000, pausa=None):
+    """
+    Remove do banco os eventos já gravados no segmento, um lote por transação
+    (bloqueios curtos), e marca o segmento como concluído. Pode ser retomado
+    """
+    verificar_segmento(segmento)
+    removidos = 0
+    for ids in ids_do_segmento(segmento, tamanho_lote):
+        with transaction.atomic():
+            # QuerySet.delete: o bloqueio de HistoricoProcesso.delete() é só para
+            # exclusões individuais; aqui os eventos já estão no segmento
+            removidos += HistoricoProcesso.objects.filter(id__in=ids).delete()[0]
+        if pausa:
+            time.sleep(pausa)
+
+    segmento.status = 'concluido'
+    segmento.concluido_em = timezone.now()
+    segmento.save(update_fields=['status', 'concluido_em'])
+    return removidos
+
+
+def total_arquivado(instancia_processo):
+    """Número de eventos arquivados do processo"""
+    return IndiceSegmentoHistorico.objects.filter(
+        instancia_processo=instancia_processo
+    ).aggregate(total=Sum('eventos'))['total'] or 0
+
+
+def eventos_arquivados(instancia_processo):
+    """
+    Eventos arquivados do processo como instâncias (não salvas) de
+    HistoricoProcesso, mais recentes primeiro, com fases e usuários carregados
+    """
+    indices = IndiceSegmentoHistorico.objects.filter(
+        instancia_processo=instancia_processo
+    ).select_related('segmento')
+
+    registros = []
+    for indice in indices:
+        caminho = diretorio_arquivo() / indice.segmento.arquivo
+        try:
+            with open(caminho, 'rb') as arquivo:
+                arquivo.seek(indice.deslocamento)
+                membro = arquivo.read(indice.tamanho)
+            # gzip confere o CRC32 do membro
+            conteudo = gzip.decompress(membro).decode('utf-8')
+        except (OSError, EOFError, zlib.error) as e:
+            raise SegmentoCorrompido(f"{caminho}: {e}")
+        registros.extend(json.loads(linha) for linha in conteudo.splitlines() if linha)
+
+    fase_ids = {r[c] for r in registros for c in ('fase_anterior_id', 'fase_nova_id') if r[c]}
+    usuario_ids = {r['usuario_id'] for r in registros if r['usuario_id']}
+    fases = Fase.objects.in_bulk(fase_ids) if fase_ids else {}
+    usuarios = User.objects.in_bulk(usuario_ids) if usuario_ids else {}
+
+    eventos = []
+    for registro in registros:
+        evento = HistoricoProcesso(
+            id=registro['id'],
+            instancia_processo=instancia_processo,
+            tipo_evento=registro['tipo_evento'],
+            fase_anterior=fases.get(registro['fase_anterior_id']),
+            fase_nova=fases.get(registro['fase_nova_id']),
+            usuario=usuarios.get(registro['usuario_id']),
+            observacoes=registro['observacoes'],
+            dados_alterados=registro['dados_alterados'],
+            criado_em=parse_datetime(registro['criado_em']),
+        )
+        evento.arquivado = True
+        eventos.append(evento)
+    eventos.sort(key=lambda e: (e.criado_em, e.id), reverse=True)
+    return eventos
@@ -0,0 +1,260 @@
+"""
+Reconstrução do estado de um processo em um instante
+O estado (dados, fase e responsável) é capturado em SnapshotProcesso na
+criação, em cada mudança de fase e a cada HISTORICO_SNAPSHOT_INTERVALO
+edições/atribuições. estado_em parte do snapshot mais próximo anterior ao
+instante e reaplica só os eventos seguintes; sem snapshot anterior (processos
+legados), desfaz os eventos a partir do snapshot seguinte ou do estado atual
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.core.esquema import obter_esquema
+from apps.core.models import Fase
+from .arquivamento import eventos_arquivados, inicio_do_mes
+from .models import HistoricoProcesso, IndiceSegmentoHistorico, SnapshotProcesso
+
+# Eventos que alteram o estado; comentários não entram na reconstrução
+EVENTOS_DE_ESTADO = ['criacao', 'mudanca_fase', 'edicao_dados', 'atribuicao']
+
+
+class EstadoProcesso:
+    """Estado reconstruído de um processo em um instante"""
+
+    def __init__(self, momento, dados, fase, responsavel, eventos_aplicados, origem):
+        self.momento = momento
+        self.dados = dados
+        self.fase = fase
+        self.responsavel = responsavel
+        # Eventos reaplicados/desfeitos e ponto de partida ('snapshot' ou 'atual')
+        self.eventos_aplicados = eventos_aplicados
+        self.origem = origem
+
+
+def intervalo_snapshots():
+    return settings.HISTORICO_SNAPSHOT_INTERVALO
+
+
+def registrar_snapshot(instancia, evento):
+    """
+    Grava um snapshot após edição/atribuição quando já há
+    HISTORICO_SNAPSHOT_INTERVALO eventos de estado desde o último (1 consulta)
+    """
+    intervalo = intervalo_snapshots()
+    ultimo = SnapshotProcesso.objects.filter(
+        instancia_processo=instancia
+    ).order_by('-evento_em', '-evento_id').values('evento_em')[:1]
+    pendentes = HistoricoProcesso.objects.filter(
+        instancia_processo=instancia,
+        tipo_evento__in=EVENTOS_DE_ESTADO,
+        criado_em__gt=Coalesce(Subquery(ultimo), Value(instancia.criado_em)),
+    )[:intervalo].count()
+    if pendentes >= intervalo:
+        SnapshotProcesso.capturar(instancia, evento).save()
+
+
+def _apos(momento, evento_id=None):
+    """Eventos com (criado_em, id) depois da posição"""
+    if evento_id is None:
+        return Q(criado_em__gt=momento)
+    return Q(criado_em__gt=momento) | Q(criado_em=momento, id__gt=evento_id)
+
+
+def _depois_de(evento, posicao):
+    """Mesmo critério de _apos, para eventos já carregados (arquivados)"""
+    momento, evento_id = posicao
+    if evento.criado_em != momento:
+        return evento.criado_em > momento
+    return evento_id is not None and evento.id > evento_id
+
+
+def eventos_entre(instancia, inicio=None, fim=None):
+    """
+    Eventos de estado do processo depois de inicio e até fim, inclusive,
+    em ordem cronológica; inicio e fim são (datetime, evento_id ou None)
+    Inclui os eventos arquivados quando o intervalo alcança meses arquivados
+    """
+    eventos = HistoricoProcesso.objects.filter(
+        instancia_processo=instancia, tipo_evento__in=EVENTOS_DE_ESTADO
+    )
+    if inicio is not None:
+        eventos = eventos.filter(_apos(*inicio))
+    if fim is not None:
+        eventos = eventos.exclude(_apos(*fim))
+    eventos = list(eventos.order_by('criado_em', 'id'))
+
+    indices = IndiceSegmentoHistorico.objects.filter(instancia_processo=instancia)
+    if inicio is not None:
+        indices = indices.filter(segmento__mes__gte=inicio_do_mes(timezone.localtime(inicio[0]).date()))
+    if fim is not None:
+        indices = indices.filter(segmento__mes__lte=timezone.localtime(fim[0]).date())
+    if indices.exists():
+        arquivados = [
+            evento for evento in eventos_arquivados(instancia)
+            if evento.tipo_evento in EVENTOS_DE_ESTADO
+            and (inicio is None or _depois_de(evento, inicio))
+            and (fim is None or not _depois_de(evento, fim))
+        ]
+        eventos = sorted(arquivados + eventos, key=lambda e: (e.criado_em, e.id))
+    return eventos
+
+
+def aplicar(estado, evento):
+    """Reaplica o evento sobre o estado (dict com dados, fase_id e responsavel)"""
+    alteracoes = evento.dados_alterados or {}
+    if evento.tipo_evento == 'mudanca_fase':
+        estado['fase_id'] = evento.fase_nova_id
+    elif evento.tipo_evento == 'edicao_dados':
+        for campo, mudanca in alteracoes.items():
+            if isinstance(mudanca, dict) and 'novo' in mudanca:
+                estado['dados'][campo] = mudanca['novo']
+    elif evento.tipo_evento == 'atribuicao' and 'responsavel_novo' in alteracoes:
+        estado['responsavel'] = alteracoes['responsavel_novo']
+
+
+def desfazer(estado, evento):
+    """Desfaz o evento sobre o estado, voltando ao estado anterior a ele"""
+    alteracoes = evento.dados_alterados or {}
+    if evento.tipo_evento == 'mudanca_fase':
+        estado['fase_id'] = evento.fase_anterior_id
+    elif evento.tipo_evento == 'edicao_dados':
+        for campo, mudanca in alteracoes.items():
+            if isinstance(mudanca, dict) and 'anterior' in mudanca:
+                if mudanca['anterior'] is None:
+                    estado['dados'].pop(campo, None)
+                else:
+                    estado['dados'][campo] = mudanca['anterior']
+    elif evento.tipo_evento == 'atribuicao' and 'responsavel_anterior' in alteracoes:
+        estado['responsavel'] = alteracoes['responsavel_anterior']
+
+
+def _estado_inicial(dados, fase_id, responsavel):
+    # Responsável pelo username, como gravado nos eventos de atribuição
+    return {
+        'dados': dict(dados or {}),
+        'fase_id': fase_id,
+        'responsavel': responsavel.username if responsavel else None,
+    }
+
+
+def _montar(instancia, momento, estado, eventos_aplicados, origem, responsavel=None):
+    fase = obter_esquema(instancia.tipo_processo_id).fases_por_id.get(estado['fase_id'])
+    if fase is None and estado['fase_id']:
+        fase = Fase.objects.filter(id=estado['fase_id']).first()
+    if responsavel is None or responsavel.username != estado['responsavel']:
+        responsavel = None
+        if estado['responsavel']:
+            responsavel = User.objects.filter(username=estado['responsavel']).first()
+    return EstadoProcesso(momento, estado['dados'], fase, responsavel, eventos_aplicados, origem)
+
+
+def estado_em(instancia, momento):
+    """
+    Estado do processo no instante (EstadoProcesso), ou None se o processo
+    ainda não existia
+    """
+    if momento < instancia.criado_em:
+        return None
+
+    snapshots = SnapshotProcesso.objects.filter(instancia_processo=instancia).select_related('responsavel')
+    anterior = snapshots.filter(evento_em__lte=momento).order_by('-evento_em', '-evento_id').first()
+    if anterior is not None:
+        estado = _estado_inicial(anterior.dados, anterior.fase_id, anterior.responsavel)
+        eventos = eventos_entre(
+            instancia, inicio=(anterior.evento_em, anterior.evento_id), fim=(momento, None)
+        )
+        for evento in eventos:
+            aplicar(estado, evento)
+        return _montar(instancia, momento, estado, len(eventos), 'snapshot', anterior.responsavel)
+
+    # Sem snapshot anterior: desfaz a partir do snapshot seguinte ou do estado atual
+    seguinte = snapshots.filter(evento_em__gt=momento).order_by('evento_em', 'evento_id').first()
+    if seguinte is not None:
+        estado = _estado_inicial(seguinte.dados, seguinte.fase_id, seguinte.responsavel)
+        fim, origem, responsavel = (seguinte.evento_em, seguinte.evento_id), 'snapshot', seguinte.responsavel
+    else:
+        estado = _estado_inicial(instancia.dados, instancia.fase_atual_id, instancia.responsavel_atual)
+        fim, origem, responsavel = None, 'atual', instancia.responsavel_atual
+
+    eventos = eventos_entre(instancia, inicio=(momento, None), fim=fim)
+    for evento in reversed(eventos):
+        desfazer(estado, evento)
+    return _montar(instancia, momento, estado, len(eventos), origem, responsavel)
+
+
+def comparar_estados(instancia, estado_a, estado_b):
+    """
+    Diferenças entre dois estados: lista de dicts com rotulo, antes e depois
+    (fase, responsável e cada campo do formulário alterado)
+    """
+    def nome_responsavel(usuario):
+        return (usuario.get_full_name() or usuario.username) if usuario else None
+
+    diferencas = []
+    if estado_a.fase != estado_b.fase:
+        diferencas.append({
+            'rotulo': 'Fase',
+            'antes': estado_a.fase.nome if estado_a.fase else None,
+            'depois': estado_b.fase.nome if estado_b.fase else None,
+        })
+    if estado_a.responsavel != estado_b.responsavel:
+        diferencas.append({
+            'rotulo': 'Responsável',
+            'antes': nome_responsavel(estado_a.responsavel),
+            'depois': nome_responsavel(estado_b.responsavel),
+        })
+
+    campos = obter_esquema(instancia.tipo_processo_id).campos_por_nome
+    nomes = list(campos) + sorted((set(estado_a.dados) | set(estado_b.dados)) - set(campos))
+    for nome in nomes:
+        antes, depois = estado_a.dados.get(nome), estado_b.dados.get(nome)
+        if antes != depois:
+            campo = campos.get(nome)
+            diferencas.append({
+                'rotulo': campo.label if campo else nome,
+                'antes': antes,
+                'depois': depois,
+            })
+    return diferencas
+
+
+def reconstruir_snapshots(instancia, intervalo=None, eventos=None):
+    """
+    Monta (sem salvar) os snapshots de um processo sem snapshots (legado),
+    desfazendo o histórico a partir do estado atual
+    eventos: eventos de estado já carregados, em ordem cronológica (opcional)
+    """
+    intervalo = intervalo or intervalo_snapshots()
+    if eventos is None:
+        eventos = eventos_entre(instancia)
+    if not eventos:
+        return []
+
+    usuarios = dict(User.objects.filter(
+        username__in={
+            valor for evento in eventos if evento.tipo_evento == 'atribuicao'
+            for valor in (evento.dados_alterados or {}).values() if valor
+        }
+    ).values_list('username', 'id'))
+    if instancia.responsavel_atual:
+        usuarios[instancia.responsavel_atual.username] = instancia.responsavel_atual_id
+
+    estado = _estado_inicial(instancia.dados, instancia.fase_atual_id, instancia.responsavel_atual)
+    snapshots = []
+    for posicao in range(len(eventos) - 1, -1, -1):
+        evento = eventos[posicao]
+        # Estado logo após o evento; ordinal contado a partir da criação
+        if evento.tipo_evento in ('criacao', 'mudanca_fase') or (posicao + 1) % intervalo == 0:
+            snapshots.append(SnapshotProcesso(
+                instancia_processo=instancia,
+                evento_id=evento.id,
+                evento_em=evento.criado_em,
+                dados=dict(estado['dados']),
+                fase_id=estado['fase_id'],
+                responsavel_id=usuarios.get(estado['responsavel']) if estado['responsavel'] else None,
+            ))
+        desfazer(estado, evento)
+    return snapshots
@@ -0,0 +1,82 @@
+"""
+Vazão, tempo de ciclo, retrabalho e gargalos por tipo de processo
+Extrai os eventos de fase novos (desde a última extração) e calcula as
+métricas sobre as colunas extraídas
+Execute: python manage.py analisar_workflow [--tipo TEF] [--dias 30] [--json]
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.auditoria import analitico
+from apps.core.models import TipoProcesso
+
+
+class Command(BaseCommand):
+    help = 'Métricas do workflow por tipo de processo, a partir de uma extração incremental do histórico'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', help='Prefixo do tipo de processo (padrão: todos os ativos)')
+        parser.add_argument('--dias', type=int, default=30, help='Janela da vazão em dias')
+        parser.add_argument('--recriar', action='store_true', help='Descarta a extração e extrai tudo de novo')
+        parser.add_argument('--sem-extrair', action='store_true', help='Usa apenas o que já foi extraído')
+        parser.add_argument('--json', action='store_true', help='Saída em JSON')
+
+    def handle(self, *args, **options):
+        tipos = TipoProcesso.objects.filter(ativo=True).order_by('nome')
+        if options['tipo']:
+            tipos = TipoProcesso.objects.filter(prefixo_numero=options['tipo'].upper())
+            if not tipos:
+                raise CommandError(f"Tipo de processo não encontrado: {options['tipo']}")
+
+        if options['recriar']:
+            analitico.recriar()
+        if not options['sem_extrair']:
+            inicio = time.perf_counter()
+            novos = analitico.extrair()
+            metadados = analitico.ler_metadados()
+            self.stderr.write(
+                f"{novos} eventos extraídos em {time.perf_counter() - inicio:.1f}s "
+                f"(total {metadados['total']}, até o evento {metadados['marca_dagua']})"
+            )
+
+        colunas = analitico.carregar_colunas()
+        inicio = time.perf_counter()
+        relatorios = [analitico.metricas(tipo, options['dias'], colunas) for tipo in tipos]
+        self.stderr.write(f"Métricas calculadas em {(time.perf_counter() - inicio) * 1000:.0f}ms")
+
+        if options['json']:
+            for relatorio in relatorios:
+                relatorio['tipo_processo'] = relatorio['tipo_processo'].prefixo_numero
+                relatorio['gargalos'] = [fase['nome'] for fase in relatorio['gargalos']]
+            self.stdout.write(json.dumps(relatorios, ensure_ascii=False, indent=2))
+            return
+
+        for relatorio in relatorios:
+            self._imprimir(relatorio)
+
+    def _imprimir(self, relatorio):
+        formatar = analitico.formatar_duracao
+        ciclo = relatorio['ciclo']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{relatorio['tipo_processo'].nome} ({relatorio['tipo_processo'].prefixo_numero})"
+        ))
+        self.stdout.write(
+            f"{relatorio['processos']} processos, {relatorio['concluidos']} concluídos, "
+            f"retrabalho em {relatorio['taxa_retrabalho']:.1%}; ciclo p50 {formatar(ciclo[50])}, "
+            f"p90 {formatar(ciclo[90])}, p95 {formatar(ciclo[95])}"
+        )
+        self.stdout.write(
+            f"{'Fase':30} {'entradas':>8} {'saídas':>8} {'/dia':>6} "
+            + ' '.join(f"{'p' + str(p):>7}" for p in analitico.PERCENTIS)
+            + f" {'parados':>8} {'retorno':>8} {'gargalo':>8}"
+        )
+        for fase in relatorio['fases']:
+            self.stdout.write(
+                f"{fase['nome'][:30]:30} {fase['entradas']:>8} {fase['saidas']:>8} {fase['vazao_dia']:>6} "
+                + ' '.join(f"{formatar(fase['duracao'][p]):>7}" for p in analitico.PERCENTIS)
+                + f" {fase['em_andamento']:>8} {fase['retrabalho']:>8.1%} {fase['gargalo']:>8}"
+            )
+        if relatorio['gargalos']:
+            self.stdout.write('Gargalos: ' + ', '.join(fase['nome'] for fase in relatorio['gargalos']))
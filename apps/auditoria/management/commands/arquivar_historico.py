@@ -0,0 +1,95 @@
+"""
+Arquiva o histórico de meses fechados
+Exporta cada mês fora da retenção para um segmento JSONL compactado com
+checksum e remove os eventos do banco em lotes curtos (sem bloqueios longos).
+Antes da remoção, atualiza a extração analítica (analisar_workflow): eventos
+ainda não extraídos não são removidos
+Execute: python manage.py arquivar_historico [--meses 12] [--lote 5000] [--simular]
+         python manage.py arquivar_historico --verificar
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.auditoria.analitico import nao_extraidos
+from apps.auditoria.arquivamento import (
+    SegmentoCorrompido, meses_fechados, exportar_mes, remover_do_banco, verificar_segmento,
+)
+from apps.auditoria.models import SegmentoHistorico
+
+
+class Command(BaseCommand):
+    help = 'Exporta meses fechados do histórico para segmentos compactados e os remove do banco'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=settings.HISTORICO_RETENCAO_MESES,
+                            help='Meses completos mantidos no banco, além do mês atual')
+        parser.add_argument('--ate', help='Arquiva somente até este mês (AAAA-MM)')
+        parser.add_argument('--lote', type=int, default=5000, help='Eventos removidos por transação')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos entre os lotes de remoção')
+        parser.add_argument('--simular', action='store_true', help='Apenas lista os meses a arquivar')
+        parser.add_argument('--verificar', action='store_true', help='Confere o checksum de todos os segmentos')
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            return self._verificar()
+
+        meses = meses_fechados(options['meses'])
+        if options['ate']:
+            try:
+                ate = datetime.strptime(options['ate'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("--ate deve estar no formato AAAA-MM")
+            meses = [mes for mes in meses if mes <= ate]
+
+        pendentes = list(SegmentoHistorico.objects.filter(status='exportado').order_by('mes', 'parte'))
+
+        if options['simular']:
+            for segmento in pendentes:
+                self.stdout.write(f"Remoção pendente: {segmento}")
+            for mes in meses:
+                self.stdout.write(f"Mês a arquivar: {mes:%m/%Y}")
+            return
+
+        # Segmentos exportados numa execução interrompida: conclui a remoção
+        for segmento in pendentes:
+            self._remover(segmento, options)
+
+        for mes in meses:
+            segmento = exportar_mes(mes)
+            if segmento is None:
+                continue
+            self.stdout.write(
+                f"{mes:%m/%Y}: {segmento.total_eventos} eventos de {segmento.total_processos} "
+                f"processos em {segmento.arquivo} ({segmento.tamanho_bytes / 1024:.0f} KB)"
+            )
+            self._remover(segmento, options)
+
+        self.stdout.write(self.style.SUCCESS("Arquivamento concluído"))
+
+    def _remover(self, segmento, options):
+        pendentes = nao_extraidos(segmento.mes)
+        if pendentes:
+            raise CommandError(
+                f"{segmento}: {pendentes} eventos de fase ainda não extraídos para a análise "
+                f"(nenhum evento removido; rode analisar_workflow após ANALITICO_ATRASO_SEGUNDOS)"
+            )
+        try:
+            removidos = remover_do_banco(segmento, options['lote'], options['pausa'])
+        except SegmentoCorrompido as e:
+            raise CommandError(f"{segmento}: {e} (nenhum evento removido)")
+        self.stdout.write(f"  {removidos} eventos removidos do banco")
+
+    def _verificar(self):
+        erros = 0
+        for segmento in SegmentoHistorico.objects.order_by('mes', 'parte'):
+            try:
+                verificar_segmento(segmento)
+                self.stdout.write(f"OK    {segmento.arquivo}")
+            except SegmentoCorrompido as e:
+                erros += 1
+                self.stdout.write(self.style.ERROR(f"ERRO  {e}"))
+        if erros:
+            raise CommandError(f"{erros} segmento(s) com problema")
+        self.stdout.write(self.style.SUCCESS("Todos os segmentos conferem"))
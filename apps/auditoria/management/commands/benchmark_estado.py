@@ -0,0 +1,80 @@
+"""
+Benchmark da reconstrução do estado de um processo em um instante
+Gera, num banco de teste, processos com milhares de eventos e mede estado_em
+em instantes aleatórios com snapshots e sem eles (desfazendo a partir do
+estado atual, como nos processos legados)
+Execute: python manage.py benchmark_estado --eventos 100 1000 5000
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.auditoria.estado import estado_em
+from apps.auditoria.models import SnapshotProcesso
+from apps.core.utilitarios_teste import banco_de_teste
+from apps.processos.carga import criar_estrutura, planejar, gravar_lote
+from apps.processos.models import InstanciaProcesso
+
+
+class Command(BaseCommand):
+    help = 'Mede estado_em com e sem snapshots para processos com muitos eventos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--eventos', type=int, nargs='+', default=[100, 1000, 5000],
+                            help='Eventos por processo')
+        parser.add_argument('--repeticoes', type=int, default=50, help='Instantes medidos por processo')
+        parser.add_argument('--semente', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with banco_de_teste():
+            self._executar(options)
+
+    def _executar(self, options):
+        tipo = criar_estrutura(1, 6, 12, prefixo='ESTADO')[0]
+        usuarios_ids = list(User.objects.filter(username__startswith='carga_').values_list('id', flat=True))
+        rng = random.Random(options['semente'])
+
+        self.stdout.write(
+            f"{'eventos':>8} {'snapshots':>10} {'modo':>14} {'p50 (ms)':>10} {'p95 (ms)':>10} "
+            f"{'consultas':>10} {'reaplicados':>12}"
+        )
+        for total in options['eventos']:
+            lote = planejar([tipo], 1, 1, 1)[0]
+            gravar_lote(lote, total, usuarios_ids, semente=options['semente'], exatos=True)
+            processo = InstanciaProcesso.objects.filter(tipo_processo=tipo).order_by('-id').first()
+            inicio = processo.criado_em.timestamp()
+            fim = processo.atualizado_em.timestamp()
+            instantes = [
+                processo.criado_em.fromtimestamp(rng.uniform(inicio, fim), tz=processo.criado_em.tzinfo)
+                for _ in range(options['repeticoes'])
+            ]
+            eventos = processo.historico.count()
+            snapshots = processo.snapshots.count()
+
+            self._medir(processo, instantes, eventos, snapshots, 'com snapshots')
+            SnapshotProcesso.objects.filter(instancia_processo=processo).delete()
+            self._medir(processo, instantes, eventos, 0, 'sem snapshots')
+
+    def _medir(self, processo, instantes, eventos, snapshots, modo):
+        tempos = []
+        consultas = []
+        reaplicados = []
+        for instante in instantes:
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                estado = estado_em(processo, instante)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(len(capturadas))
+            reaplicados.append(estado.eventos_aplicados)
+
+        tempos.sort()
+        self.stdout.write(
+            f"{eventos:>8} {snapshots:>10} {modo:>14} {statistics.median(tempos):>10.2f} "
+            f"{tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))]:>10.2f} "
+            f"{statistics.mean(consultas):>10.1f} {statistics.mean(reaplicados):>12.1f}"
+        )
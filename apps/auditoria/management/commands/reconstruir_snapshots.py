@@ -0,0 +1,74 @@
+"""
+Cria os snapshots de estado dos processos que ainda não têm nenhum
+(processos anteriores aos snapshots ou importados de outra base)
+Execute: python manage.py reconstruir_snapshots [--tipo TEF] [--intervalo 50]
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.auditoria.arquivamento import SegmentoCorrompido
+from apps.auditoria.estado import EVENTOS_DE_ESTADO, eventos_entre, reconstruir_snapshots
+from apps.auditoria.models import HistoricoProcesso, IndiceSegmentoHistorico, SnapshotProcesso
+from apps.core.models import TipoProcesso
+from apps.processos.models import InstanciaProcesso
+
+
+class Command(BaseCommand):
+    help = 'Gera snapshots de estado para processos sem snapshots, desfazendo o histórico'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', help='Prefixo do tipo de processo (padrão: todos)')
+        parser.add_argument('--intervalo', type=int, default=settings.HISTORICO_SNAPSHOT_INTERVALO,
+                            help='Edições/atribuições entre snapshots')
+        parser.add_argument('--lote', type=int, default=200, help='Processos por transação')
+
+    def handle(self, *args, **options):
+        processos = InstanciaProcesso.objects.filter(
+            snapshots__isnull=True
+        ).select_related('responsavel_atual').order_by('id')
+
+        if options['tipo']:
+            tipo = TipoProcesso.objects.filter(prefixo_numero=options['tipo'].upper()).first()
+            if not tipo:
+                raise CommandError(f"Tipo de processo não encontrado: {options['tipo']}")
+            processos = processos.filter(tipo_processo=tipo)
+
+        inicio = time.perf_counter()
+        total = snapshots = 0
+        ultimo_id = 0
+        while True:
+            lote = list(processos.filter(id__gt=ultimo_id)[:options['lote']])
+            if not lote:
+                break
+            # Eventos do lote numa consulta; processos com histórico arquivado
+            # também leem os segmentos
+            eventos = {processo.id: [] for processo in lote}
+            for evento in HistoricoProcesso.objects.filter(
+                instancia_processo__in=lote, tipo_evento__in=EVENTOS_DE_ESTADO
+            ).order_by('criado_em', 'id'):
+                eventos[evento.instancia_processo_id].append(evento)
+            com_arquivo = set(IndiceSegmentoHistorico.objects.filter(
+                instancia_processo__in=lote
+            ).values_list('instancia_processo_id', flat=True))
+
+            novos = []
+            for processo in lote:
+                try:
+                    if processo.id in com_arquivo:
+                        eventos[processo.id] = eventos_entre(processo)
+                    novos.extend(reconstruir_snapshots(processo, options['intervalo'], eventos[processo.id]))
+                except SegmentoCorrompido as e:
+                    self.stdout.write(self.style.ERROR(f"{processo.numero}: {e}"))
+            with transaction.atomic():
+                SnapshotProcesso.objects.bulk_create(novos, batch_size=1000)
+            snapshots += len(novos)
+            total += len(lote)
+            ultimo_id = lote[-1].id
+            self.stdout.write(f"  {total} processos, {snapshots} snapshots")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{snapshots} snapshots criados para {total} processos em {time.perf_counter() - inicio:.1f}s"
+        ))
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.28 on 2026-10-17 22:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def criar_indice_data(apps, schema_editor):
+    """
+    Índice por data para a varredura mensal do arquivamento
+    No PostgreSQL um BRIN: minúsculo e eficiente numa tabela só de inserção,
+    em que criado_em acompanha a ordem física das linhas
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX auditoria_historico_criado_brin ON auditoria_historicoprocesso "
+            "USING brin (criado_em) WITH (pages_per_range = 32)"
+        )
+    else:
+        schema_editor.execute(
+            "CREATE INDEX auditoria_historico_criado_idx ON auditoria_historicoprocesso (criado_em)"
+        )
+
+
+def remover_indice_data(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS auditoria_historico_criado_brin")
+    else:
+        schema_editor.execute("DROP INDEX IF EXISTS auditoria_historico_criado_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0003_contagemfase'),
+        ('auditoria', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentoHistorico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês arquivado', verbose_name='Mês')),
+                ('parte', models.PositiveIntegerField(default=1, help_text='Número do segmento dentro do mês', verbose_name='Parte')),
+                ('arquivo', models.CharField(help_text='Caminho relativo a HISTORICO_ARQUIVO_DIR', max_length=255, verbose_name='Arquivo')),
+                ('sha256', models.CharField(max_length=64, verbose_name='Checksum SHA-256')),
+                ('tamanho_bytes', models.BigIntegerField(verbose_name='Tamanho (bytes)')),
+                ('total_eventos', models.PositiveIntegerField(verbose_name='Total de Eventos')),
+                ('total_processos', models.PositiveIntegerField(verbose_name='Total de Processos')),
+                ('status', models.CharField(choices=[('exportado', 'Exportado (removendo do banco)'), ('concluido', 'Concluído')], default='exportado', max_length=20, verbose_name='Status')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+            ],
+            options={
+                'verbose_name': 'Segmento de Histórico Arquivado',
+                'verbose_name_plural': 'Segmentos de Histórico Arquivado',
+                'ordering': ['-mes', '-parte'],
+                'unique_together': {('mes', 'parte')},
+            },
+        ),
+        migrations.CreateModel(
+            name='IndiceSegmentoHistorico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('eventos', models.PositiveIntegerField(verbose_name='Eventos')),
+                ('deslocamento', models.BigIntegerField(verbose_name='Deslocamento (bytes)')),
+                ('tamanho', models.PositiveIntegerField(verbose_name='Tamanho (bytes)')),
+                ('instancia_processo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historico_arquivado', to='processos.instanciaprocesso', verbose_name='Processo')),
+                ('segmento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indices', to='auditoria.segmentohistorico', verbose_name='Segmento')),
+            ],
+            options={
+                'verbose_name': 'Índice de Segmento',
+                'verbose_name_plural': 'Índices de Segmentos',
+                'unique_together': {('segmento', 'instancia_processo')},
+            },
+        ),
+        migrations.RunPython(criar_indice_data, remover_indice_data),
+    ]
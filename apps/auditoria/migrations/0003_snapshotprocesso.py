@@ -0,0 +1,37 @@
+# Generated by Django 4.2.28 on 2026-10-17 22:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0003_campo_pesquisavel'),
+        ('processos', '0003_contagemfase'),
+        ('auditoria', '0002_arquivamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotProcesso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('evento_id', models.BigIntegerField(help_text='Id do evento de histórico após o qual o estado foi capturado', verbose_name='Evento')),
+                ('evento_em', models.DateTimeField(verbose_name='Data/Hora do Evento')),
+                ('dados', models.JSONField(default=dict, verbose_name='Dados')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('fase', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.fase', verbose_name='Fase')),
+                ('instancia_processo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='processos.instanciaprocesso', verbose_name='Processo')),
+                ('responsavel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Responsável')),
+            ],
+            options={
+                'verbose_name': 'Snapshot do Processo',
+                'verbose_name_plural': 'Snapshots dos Processos',
+                'ordering': ['-evento_em', '-evento_id'],
+                'indexes': [models.Index(fields=['instancia_processo', '-evento_em', '-evento_id'], name='auditoria_s_instanc_5865d5_idx')],
+            },
+        ),
+    ]
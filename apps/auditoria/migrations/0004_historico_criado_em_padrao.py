@@ -0,0 +1,19 @@
+# Generated by Django 4.2.28 on 2026-10-18 00:21
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0003_snapshotprocesso'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historicoprocesso',
+            name='criado_em',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Data/Hora'),
+        ),
+    ]
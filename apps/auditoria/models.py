@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from apps.processos.models import InstanciaProcesso
 from apps.core.models import Fase
 
@@ -64,8 +65,11 @@ class HistoricoProcesso(models.Model):
         verbose_name="Dados Alterados",
         help_text="Snapshot das alterações realizadas"
     )
+    # default em vez de auto_now_add: as mudanças em lote gravam o mesmo
+    # instante no evento e nas estadias
     criado_em = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name="Data/Hora"
     )
 
@@ -96,7 +100,14 @@ class HistoricoProcesso(models.Model):
     @classmethod
     def registrar_criacao(cls, instancia_processo, usuario=None, observacoes=''):
         """Registra a criação de um processo"""
-        return cls.objects.create(
+        evento = cls.construir_criacao(instancia_processo, usuario, observacoes)
+        evento.save()
+        return evento
+
+    @classmethod
+    def construir_criacao(cls, instancia_processo, usuario=None, observacoes=''):
+        """Monta (sem salvar) o evento de criação, para uso com bulk_create"""
+        return cls(
             instancia_processo=instancia_processo,
             tipo_evento='criacao',
             fase_nova=instancia_processo.fase_atual,
@@ -108,7 +119,14 @@ class HistoricoProcesso(models.Model):
     @classmethod
     def registrar_mudanca_fase(cls, instancia_processo, fase_anterior, fase_nova, usuario, observacoes=''):
         """Registra mudança de fase"""
-        return cls.objects.create(
+        evento = cls.construir_mudanca_fase(instancia_processo, fase_anterior, fase_nova, usuario, observacoes)
+        evento.save()
+        return evento
+
+    @classmethod
+    def construir_mudanca_fase(cls, instancia_processo, fase_anterior, fase_nova, usuario, observacoes=''):
+        """Monta (sem salvar) o evento de mudança de fase, para uso com bulk_create"""
+        return cls(
             instancia_processo=instancia_processo,
             tipo_evento='mudanca_fase',
             fase_anterior=fase_anterior,
@@ -155,3 +173,141 @@ class HistoricoProcesso(models.Model):
             usuario=usuario,
             observacoes=comentario
         )
+
+
+class SegmentoHistorico(models.Model):
+    """
+    Arquivo JSONL compactado (gzip) com os eventos de histórico de um mês
+    Criado pelo comando arquivar_historico; o arquivo é gravado uma única vez
+    e o checksum SHA-256 garante que não foi alterado
+    """
+    STATUS_CHOICES = [
+        ('exportado', 'Exportado (removendo do banco)'),
+        ('concluido', 'Concluído'),
+    ]
+
+    mes = models.DateField(
+        verbose_name="Mês",
+        help_text="Primeiro dia do mês arquivado"
+    )
+    parte = models.PositiveIntegerField(
+        default=1,
+        verbose_name="Parte",
+        help_text="Número do segmento dentro do mês"
+    )
+    arquivo = models.CharField(
+        max_length=255,
+        verbose_name="Arquivo",
+        help_text="Caminho relativo a HISTORICO_ARQUIVO_DIR"
+    )
+    sha256 = models.CharField(max_length=64, verbose_name="Checksum SHA-256")
+    tamanho_bytes = models.BigIntegerField(verbose_name="Tamanho (bytes)")
+    total_eventos = models.PositiveIntegerField(verbose_name="Total de Eventos")
+    total_processos = models.PositiveIntegerField(verbose_name="Total de Processos")
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='exportado',
+        verbose_name="Status"
+    )
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+    concluido_em = models.DateTimeField(null=True, blank=True, verbose_name="Concluído em")
+
+    class Meta:
+        verbose_name = "Segmento de Histórico Arquivado"
+        verbose_name_plural = "Segmentos de Histórico Arquivado"
+        ordering = ['-mes', '-parte']
+        unique_together = [['mes', 'parte']]
+
+    def __str__(self):
+        return f"{self.mes.strftime('%m/%Y')} (parte {self.parte}) - {self.total_eventos} eventos"
+
+
+class IndiceSegmentoHistorico(models.Model):
+    """
+    Localização dos eventos de um processo dentro de um segmento
+    Cada processo é um membro gzip independente, lido sem descompactar o resto
+    """
+    segmento = models.ForeignKey(
+        SegmentoHistorico,
+        on_delete=models.CASCADE,
+        related_name='indices',
+        verbose_name="Segmento"
+    )
+    instancia_processo = models.ForeignKey(
+        InstanciaProcesso,
+        on_delete=models.CASCADE,
+        related_name='historico_arquivado',
+        verbose_name="Processo"
+    )
+    eventos = models.PositiveIntegerField(verbose_name="Eventos")
+    deslocamento = models.BigIntegerField(verbose_name="Deslocamento (bytes)")
+    tamanho = models.PositiveIntegerField(verbose_name="Tamanho (bytes)")
+
+    class Meta:
+        verbose_name = "Índice de Segmento"
+        verbose_name_plural = "Índices de Segmentos"
+        unique_together = [['segmento', 'instancia_processo']]
+
+    def __str__(self):
+        return f"{self.segmento} - processo {self.instancia_processo_id}"
+
+
+class SnapshotProcesso(models.Model):
+    """
+    Estado completo do processo (dados, fase e responsável) logo após um evento
+    Ponto de partida da reconstrução do estado em um instante: só os eventos
+    posteriores ao snapshot mais próximo são reaplicados
+    """
+    instancia_processo = models.ForeignKey(
+        InstanciaProcesso,
+        on_delete=models.CASCADE,
+        related_name='snapshots',
+        verbose_name="Processo"
+    )
+    # Sem FK: o evento pode ter sido arquivado (removido do banco)
+    evento_id = models.BigIntegerField(
+        verbose_name="Evento",
+        help_text="Id do evento de histórico após o qual o estado foi capturado"
+    )
+    evento_em = models.DateTimeField(verbose_name="Data/Hora do Evento")
+    dados = models.JSONField(default=dict, verbose_name="Dados")
+    fase = models.ForeignKey(
+        Fase,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name="Fase"
+    )
+    responsavel = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Responsável"
+    )
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+
+    class Meta:
+        verbose_name = "Snapshot do Processo"
+        verbose_name_plural = "Snapshots dos Processos"
+        ordering = ['-evento_em', '-evento_id']
+        indexes = [
+            models.Index(fields=['instancia_processo', '-evento_em', '-evento_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.instancia_processo_id} - {self.evento_em.strftime('%d/%m/%Y %H:%M')}"
+
+    @classmethod
+    def capturar(cls, instancia_processo, evento):
+        """Monta (sem salvar) o snapshot do estado atual do processo após o evento"""
+        return cls(
+            instancia_processo=instancia_processo,
+            evento_id=evento.id,
+            evento_em=evento.criado_em,
+            dados=dict(instancia_processo.dados or {}),
+            fase_id=instancia_processo.fase_atual_id,
+            responsavel_id=instancia_processo.responsavel_atual_id,
+        )
@@ -1,3 +1,229 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.auditoria.arquivamento import (
+    diretorio_arquivo, eventos_arquivados, exportar_mes, inicio_do_mes, remover_do_banco, verificar_segmento,
+)
+from apps.auditoria.estado import estado_em, reconstruir_snapshots
+from apps.auditoria.models import HistoricoProcesso, IndiceSegmentoHistorico, SegmentoHistorico, SnapshotProcesso
+from apps.core.models import TipoProcesso, Fase, CampoFormulario
+from apps.workflow.services import WorkflowService
+
+CACHE_ISOLADO = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def criar_tipo(prefixo):
+    """
+    Tipo com três fases e os campos nome e valor
+    Chamar dentro de captureOnCommitCallbacks(execute=True), para trocar o carimbo do esquema
+    """
+    tipo = TipoProcesso.objects.create(nome=f'Tipo {prefixo}', descricao='Auditoria', prefixo_numero=prefixo)
+    fases = [
+        Fase.objects.create(
+            tipo_processo=tipo, nome=f'Fase {ordem}', ordem=ordem,
+            fase_inicial=ordem == 1, fase_final=ordem == 3
+        )
+        for ordem in range(1, 4)
+    ]
+    for ordem, nome in enumerate(['nome', 'valor'], start=1):
+        CampoFormulario.objects.create(
+            tipo_processo=tipo, nome_campo=nome, label=nome.title(), tipo_campo='text', ordem=ordem
+        )
+    return tipo, fases
+
+
+@override_settings(CACHES=CACHE_ISOLADO, HISTORICO_SNAPSHOT_INTERVALO=3)
+class EstadoEmTest(TestCase):
+    """estado_em reconstrói dados, fase e responsável em qualquer instante"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_superuser('auditoria', password='auditoria')
+        self.ana = User.objects.create_user('ana')
+        self.bruno = User.objects.create_user('bruno')
+        with self.captureOnCommitCallbacks(execute=True):
+            tipo, fases = criar_tipo('AUD')
+
+        self.antes_da_criacao = timezone.now() - timedelta(seconds=1)
+        self.processo = WorkflowService.criar_processo(tipo, fases[0], {'nome': 'A'}, usuario=self.usuario)
+        # (instante, estado esperado) depois de cada operação
+        self.marcos = []
+        self.marcar()
+
+        passos = [
+            lambda p: WorkflowService.editar_dados(p, {'nome': 'B', 'valor': '1'}, self.usuario),
+            lambda p: WorkflowService.atribuir_responsavel(p, self.ana, self.usuario),
+            lambda p: WorkflowService.transicionar_fase(p, fases[1], self.usuario),
+            lambda p: WorkflowService.editar_dados(p, {'nome': 'C'}, self.usuario),
+            lambda p: WorkflowService.adicionar_comentario(p, self.usuario, 'Sem efeito no estado'),
+            lambda p: WorkflowService.atribuir_responsavel(p, self.bruno, self.usuario),
+            lambda p: WorkflowService.editar_dados(p, {'valor': '2'}, self.usuario),
+            lambda p: WorkflowService.transicionar_fase(p, fases[2], self.usuario),
+            lambda p: WorkflowService.editar_dados(p, {'nome': 'D'}, self.usuario),
+        ]
+        for passo in passos:
+            passo(self.processo)
+            self.marcar()
+
+    def marcar(self):
+        self.processo.refresh_from_db()
+        responsavel = self.processo.responsavel_atual
+        self.marcos.append((timezone.now(), (
+            dict(self.processo.dados), self.processo.fase_atual_id, responsavel.username if responsavel else None
+        )))
+        # Instantes distintos entre os eventos de passos seguidos
+        time.sleep(0.002)
+
+    def verificar(self, origem=None):
+        self.assertIsNone(estado_em(self.processo, self.antes_da_criacao))
+        for indice, (momento, esperado) in enumerate(self.marcos):
+            with self.subTest(passo=indice):
+                estado = estado_em(self.processo, momento)
+                obtido = (estado.dados, estado.fase.id, estado.responsavel.username if estado.responsavel else None)
+                self.assertEqual(obtido, esperado)
+                if origem:
+                    self.assertEqual(estado.origem, origem)
+
+    def test_com_snapshots(self):
+        self.assertGreater(SnapshotProcesso.objects.filter(instancia_processo=self.processo).count(), 3)
+        self.verificar(origem='snapshot')
+
+    def test_sem_snapshots_desfaz_a_partir_do_estado_atual(self):
+        SnapshotProcesso.objects.filter(instancia_processo=self.processo).delete()
+        self.verificar(origem='atual')
+
+    def test_antes_do_primeiro_snapshot(self):
+        # Processo legado com snapshots só a partir da segunda mudança de fase
+        snapshots = SnapshotProcesso.objects.filter(instancia_processo=self.processo)
+        ultimo = snapshots.order_by('-evento_em', '-evento_id').first()
+        snapshots.exclude(pk=ultimo.pk).delete()
+        self.assertGreater(ultimo.evento_em, self.marcos[5][0])
+        self.verificar()
+
+    def test_snapshots_reconstruidos(self):
+        SnapshotProcesso.objects.filter(instancia_processo=self.processo).delete()
+        snapshots = reconstruir_snapshots(self.processo, intervalo=3)
+        SnapshotProcesso.objects.bulk_create(snapshots)
+        # Criação, duas mudanças de fase e os múltiplos do intervalo
+        self.assertGreaterEqual(len(snapshots), 4)
+        self.verificar(origem='snapshot')
+
+
+def resumo(eventos):
+    """Campos gravados de cada evento, para comparar banco e arquivo"""
+    return [
+        (e.id, e.tipo_evento, e.fase_anterior_id, e.fase_nova_id, e.usuario_id,
+         e.observacoes, e.dados_alterados, e.criado_em)
+        for e in eventos
+    ]
+
+
+@override_settings(CACHES=CACHE_ISOLADO)
+class ArquivamentoTest(TestCase):
+    """Segmentos gzip JSONL: exportação, índice por processo e leitura após a remoção"""
+
+    def setUp(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio)
+        configuracao = override_settings(
+            HISTORICO_ARQUIVO_DIR=str(Path(diretorio) / 'arquivo'),
+            ANALITICO_DIR=str(Path(diretorio) / 'analitico'),
+        )
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        self.usuario = User.objects.create_superuser('arquivo', password='arquivo')
+        with self.captureOnCommitCallbacks(execute=True):
+            tipo, fases = criar_tipo('ARQ')
+        self.processos = []
+        for indice in range(3):
+            processo = WorkflowService.criar_processo(tipo, fases[0], {'nome': f'P{indice}'}, usuario=self.usuario)
+            WorkflowService.editar_dados(processo, {'nome': f'P{indice}-editado'}, self.usuario)
+            WorkflowService.transicionar_fase(processo, fases[1], self.usuario)
+            WorkflowService.adicionar_comentario(processo, self.usuario, 'Comentário com acentuação')
+            self.processos.append(processo)
+
+        # Eventos dos dois primeiros processos num mês fechado (o terceiro fica no mês atual)
+        self.mes = inicio_do_mes(timezone.localdate() - timedelta(days=95))
+        antigos = HistoricoProcesso.objects.filter(instancia_processo__in=self.processos[:2]).order_by('id')
+        inicio = timezone.make_aware(datetime(self.mes.year, self.mes.month, 15, 12))
+        for posicao, evento_id in enumerate(antigos.values_list('id', flat=True)):
+            HistoricoProcesso.objects.filter(id=evento_id).update(criado_em=inicio + timedelta(minutes=posicao))
+
+        self.antes = {
+            processo.id: resumo(processo.historico.order_by('-criado_em', '-id'))
+            for processo in self.processos
+        }
+
+    def test_segmento_e_indice(self):
+        segmento = exportar_mes(self.mes)
+        self.assertEqual(segmento.total_processos, 2)
+        self.assertEqual(segmento.total_eventos, 8)
+        verificar_segmento(segmento)
+
+        arquivo = diretorio_arquivo() / segmento.arquivo
+        with gzip.open(arquivo, 'rt', encoding='utf-8') as conteudo:
+            self.assertEqual(len(conteudo.read().splitlines()), 8)
+
+        # Cada processo é um membro gzip legível sozinho, pelo deslocamento do índice
+        indices = IndiceSegmentoHistorico.objects.filter(segmento=segmento).order_by('instancia_processo_id')
+        self.assertEqual([i.instancia_processo_id for i in indices], [p.id for p in self.processos[:2]])
+        dados = arquivo.read_bytes()
+        for indice in indices:
+            membro = gzip.decompress(dados[indice.deslocamento:indice.deslocamento + indice.tamanho])
+            linhas = [json.loads(linha) for linha in membro.decode().splitlines()]
+            self.assertEqual(len(linhas), indice.eventos)
+            self.assertEqual({linha['instancia_processo_id'] for linha in linhas}, {indice.instancia_processo_id})
+
+    def test_leitura_igual_antes_e_depois_da_remocao(self):
+        segmento = exportar_mes(self.mes)
+        for processo in self.processos[:2]:
+            self.assertEqual(resumo(eventos_arquivados(processo)), self.antes[processo.id])
+
+        self.assertEqual(remover_do_banco(segmento, tamanho_lote=3), 8)
+        self.assertFalse(HistoricoProcesso.objects.filter(instancia_processo__in=self.processos[:2]).exists())
+        for processo in self.processos[:2]:
+            self.assertEqual(resumo(eventos_arquivados(processo)), self.antes[processo.id])
+        self.assertEqual(resumo(eventos_arquivados(self.processos[2])), [])
+        self.assertEqual(
+            resumo(self.processos[2].historico.order_by('-criado_em', '-id')), self.antes[self.processos[2].id]
+        )
+
+        # A tela de histórico oferece e lê os eventos arquivados
+        cliente = Client()
+        cliente.force_login(self.usuario)
+        url = reverse('processos:historico', args=[self.processos[0].id])
+        resposta = cliente.get(url).json()
+        self.assertEqual(resposta['eventos'], [])
+        self.assertEqual(resposta['total_arquivado'], 4)
+        arquivados = cliente.get(resposta['arquivado_url']).json()
+        self.assertEqual([e['id'] for e in arquivados['eventos']], [e[0] for e in self.antes[self.processos[0].id]])
+
+    def test_comando_arquiva(self):
+        call_command('arquivar_historico', meses=1, stdout=io.StringIO())
+        segmento = SegmentoHistorico.objects.get()
+        self.assertEqual(segmento.status, 'concluido')
+        for processo in self.processos[:2]:
+            self.assertFalse(processo.historico.exists())
+            self.assertEqual(resumo(eventos_arquivados(processo)), self.antes[processo.id])
+
+    def test_comando_nao_remove_com_segmento_corrompido(self):
+        segmento = exportar_mes(self.mes)
+        arquivo = diretorio_arquivo() / segmento.arquivo
+        arquivo.chmod(0o644)
+        arquivo.write_bytes(arquivo.read_bytes()[:-10])
+
+        with self.assertRaises(CommandError):
+            call_command('arquivar_historico', meses=1, stdout=io.StringIO())
+        self.assertEqual(HistoricoProcesso.objects.filter(instancia_processo__in=self.processos[:2]).count(), 8)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import TipoProcesso, Fase, CampoFormulario
+from .models import TipoProcesso, Fase, CampoFormulario, SequenciaProcesso
 
 
 class FaseInline(admin.TabularInline):
@@ -62,7 +62,7 @@ class FaseAdmin(admin.ModelAdmin):
 @admin.register(CampoFormulario)
 class CampoFormularioAdmin(admin.ModelAdmin):
     list_display = ['label', 'tipo_processo', 'nome_campo', 'tipo_campo', 'obrigatorio', 'grupo', 'ordem', 'visivel_formulario_externo']
-    list_filter = ['tipo_processo', 'tipo_campo', 'obrigatorio', 'visivel_formulario_externo', 'grupo']
+    list_filter = ['tipo_processo', 'tipo_campo', 'obrigatorio', 'visivel_formulario_externo', 'indexado', 'grupo']
     search_fields = ['label', 'nome_campo', 'tipo_processo__nome']
     filter_horizontal = ['obrigatorio_em_fases']
     
@@ -77,7 +77,7 @@ class CampoFormularioAdmin(admin.ModelAdmin):
             'fields': ('obrigatorio', 'obrigatorio_em_fases')
         }),
         ('Organização', {
-            'fields': ('grupo', 'ordem', 'visivel_formulario_externo')
+            'fields': ('grupo', 'ordem', 'visivel_formulario_externo', 'pesquisavel', 'indexado')
         }),
     )
     
@@ -91,3 +91,14 @@ class CampoFormularioAdmin(admin.ModelAdmin):
                 '[{"value": "sim", "label": "Sim"}, {"value": "nao", "label": "Não"}]'
             )
         return form
+
+
+@admin.register(SequenciaProcesso)
+class SequenciaProcessoAdmin(admin.ModelAdmin):
+    list_display = ['tipo_processo', 'ano', 'ultimo_valor', 'atualizado_em']
+    list_filter = ['tipo_processo', 'ano']
+    readonly_fields = ['tipo_processo', 'ano', 'ultimo_valor', 'atualizado_em']
+    
+    def has_add_permission(self, request):
+        """Contadores são criados automaticamente na numeração"""
+        return False
@@ -0,0 +1,145 @@
+"""
+Instrumentação de desempenho por view
+Mede consultas SQL, tempo de SQL, consultas repetidas (N+1) e tempo total de
+cada requisição, registrando no log estruturado 'workflow.desempenho' e num
+buffer em memória exibido em /configuracoes/desempenho/
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+
+logger = logging.getLogger('workflow.desempenho')
+
+_RE_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_RE_LISTA = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+
+
+def impressao_digital(sql):
+    """Normaliza o SQL removendo literais, para agrupar consultas repetidas"""
+    sql = _RE_TEXTO.sub('?', sql)
+    sql = _RE_NUMERO.sub('?', sql)
+    return _RE_LISTA.sub('(...)', sql)
+
+
+def orcamento_consultas(maximo):
+    """
+    Declara o número máximo de consultas SQL de uma view
+    Verificado pelo middleware (aviso no log) e pelos testes (apps.core.tests)
+    """
+    def decorator(view_func):
+        view_func.orcamento_consultas = maximo
+        return view_func
+    return decorator
+
+
+class MedidorConsultas:
+    """execute_wrapper que acumula as consultas executadas numa requisição"""
+
+    def __init__(self):
+        self.total = 0
+        self.tempo_sql = 0.0
+        self.digitais = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_sql += time.perf_counter() - inicio
+            self.total += 1
+            self.digitais[impressao_digital(sql)] += 1
+
+    def repetidas(self, minimo=2):
+        """Consultas com a mesma impressão digital executadas mais de uma vez"""
+        return [
+            {'sql': sql[:300], 'vezes': vezes}
+            for sql, vezes in self.digitais.most_common()
+            if vezes >= minimo
+        ]
+
+
+class RegistroDesempenho:
+    """Buffer circular das últimas medições (por processo)"""
+
+    def __init__(self, tamanho):
+        self._medicoes = deque(maxlen=tamanho)
+        self._lock = threading.Lock()
+
+    def adicionar(self, medicao):
+        with self._lock:
+            self._medicoes.append(medicao)
+
+    def recentes(self):
+        with self._lock:
+            return list(reversed(self._medicoes))
+
+    def limpar(self):
+        with self._lock:
+            self._medicoes.clear()
+
+    def resumo(self):
+        """Agregado por nome de URL, ordenado pelo maior número médio de consultas"""
+        por_view = {}
+        for medicao in self.recentes():
+            item = por_view.setdefault(medicao['view'], {
+                'view': medicao['view'],
+                'requisicoes': 0,
+                'consultas_max': 0,
+                'consultas_soma': 0,
+                'sql_ms_soma': 0.0,
+                'total_ms_soma': 0.0,
+                'repetidas_max': 0,
+                'orcamento': medicao['orcamento'],
+                'excedeu': 0,
+            })
+            item['requisicoes'] += 1
+            item['consultas_max'] = max(item['consultas_max'], medicao['consultas'])
+            item['consultas_soma'] += medicao['consultas']
+            item['sql_ms_soma'] += medicao['sql_ms']
+            item['total_ms_soma'] += medicao['total_ms']
+            item['repetidas_max'] = max(
+                item['repetidas_max'],
+                sum(r['vezes'] for r in medicao['repetidas'])
+            )
+            item['excedeu'] += medicao['excedeu']
+
+        resumo = []
+        for item in por_view.values():
+            n = item['requisicoes']
+            item['consultas_media'] = round(item.pop('consultas_soma') / n, 1)
+            item['sql_ms_media'] = round(item.pop('sql_ms_soma') / n, 1)
+            item['total_ms_media'] = round(item.pop('total_ms_soma') / n, 1)
+            resumo.append(item)
+        return sorted(resumo, key=lambda i: i['consultas_media'], reverse=True)
+
+
+registro = RegistroDesempenho(getattr(settings, 'DESEMPENHO_REGISTROS', 500))
+
+
+def registrar_medicao(request, response, medidor, inicio, orcamento):
+    """Monta a medição da requisição, grava no buffer e no log estruturado"""
+    match = getattr(request, 'resolver_match', None)
+    medicao = {
+        'view': match.view_name if match else request.path,
+        'metodo': request.method,
+        'caminho': request.path,
+        'status': response.status_code,
+        'consultas': medidor.total,
+        'sql_ms': round(medidor.tempo_sql * 1000, 2),
+        'total_ms': round((time.perf_counter() - inicio) * 1000, 2),
+        'repetidas': medidor.repetidas(),
+        'orcamento': orcamento,
+        'excedeu': orcamento is not None and medidor.total > orcamento,
+        'momento': time.time(),
+    }
+    registro.adicionar(medicao)
+
+    nivel = logging.WARNING if medicao['excedeu'] else logging.INFO
+    logger.log(nivel, json.dumps(medicao, ensure_ascii=False))
+    return medicao
@@ -0,0 +1,109 @@
+"""
+Esquema compilado por tipo de processo
+Mantém em memória, por processo do servidor, os campos (regex compiladas no
+primeiro uso) e as fases de cada TipoProcesso. A validade é controlada por um
+carimbo de versão no banco (apps.core.versoes, compartilhado por todos os
+workers), trocado pelos signals de TipoProcesso, Fase e CampoFormulario. Com
+a cópia local do carimbo válida, nenhuma consulta de esquema é feita.
+"""
+import threading
+from types import MappingProxyType
+
+from . import versoes
+
+CHAVE_VERSAO = 'esquema:versao:{}'
+GRUPO_PADRAO = 'Informações Gerais'
+
+_esquemas = {}
+_lock = threading.Lock()
+
+
+class EsquemaCompilado:
+    """
+    Metadados imutáveis de um tipo de processo
+    Os objetos CampoFormulario/Fase são compartilhados entre requisições
+    e não devem ser alterados
+    """
+
+    def __init__(self, tipo_processo_id, versao, campos, fases, obrigatorios_por_fase):
+        self.tipo_processo_id = tipo_processo_id
+        self.versao = versao
+
+        # Ordem de exibição dos dados (ordem, id)
+        self.campos = tuple(campos)
+        self.campos_por_nome = MappingProxyType({c.nome_campo: c for c in self.campos})
+
+        # Ordem dos formulários (grupo, ordem, id)
+        self.campos_formulario = tuple(sorted(self.campos, key=lambda c: (c.grupo, c.ordem, c.id)))
+        self.campos_visiveis = tuple(c for c in self.campos_formulario if c.visivel_formulario_externo)
+        self.grupos_visiveis = self._agrupar(self.campos_visiveis)
+        self.grupos = self._agrupar(self.campos)
+
+        self.fases = tuple(fases)
+        self.fases_por_id = MappingProxyType({f.id: f for f in self.fases})
+        self.fase_inicial = next((f for f in self.fases if f.fase_inicial), None)
+
+        self.obrigatorios_globais = tuple(c for c in self.campos if c.obrigatorio)
+        self.obrigatorios_por_fase = MappingProxyType({
+            fase_id: tuple(c for c in self.campos if c.id in ids)
+            for fase_id, ids in obrigatorios_por_fase.items()
+        })
+
+    @staticmethod
+    def _agrupar(campos):
+        grupos = {}
+        for campo in campos:
+            grupos.setdefault(campo.grupo or GRUPO_PADRAO, []).append(campo)
+        return MappingProxyType({nome: tuple(lista) for nome, lista in grupos.items()})
+
+    @classmethod
+    def carregar(cls, tipo_processo_id, versao):
+        """Carrega o esquema do banco (3 consultas)"""
+        from apps.core.models import CampoFormulario, Fase
+
+        campos = CampoFormulario.objects.filter(
+            tipo_processo_id=tipo_processo_id
+        ).order_by('ordem', 'id')
+        fases = Fase.objects.filter(tipo_processo_id=tipo_processo_id).order_by('ordem')
+
+        obrigatorios_por_fase = {}
+        relacoes = CampoFormulario.obrigatorio_em_fases.through.objects.filter(
+            campoformulario__tipo_processo_id=tipo_processo_id
+        ).values_list('fase_id', 'campoformulario_id')
+        for fase_id, campo_id in relacoes:
+            obrigatorios_por_fase.setdefault(fase_id, set()).add(campo_id)
+
+        return cls(tipo_processo_id, versao, list(campos), list(fases), obrigatorios_por_fase)
+
+    def campos_obrigatorios(self, fase_id):
+        """Campos obrigatórios globalmente e na fase, sem repetição"""
+        da_fase = self.obrigatorios_por_fase.get(fase_id, ())
+        if not da_fase:
+            return self.obrigatorios_globais
+        return self.obrigatorios_globais + tuple(c for c in da_fase if not c.obrigatorio)
+
+
+def obter_versao(tipo_processo_id):
+    """Versão atual do esquema do tipo"""
+    return versoes.obter(CHAVE_VERSAO.format(tipo_processo_id))
+
+
+def obter_esquema(tipo_processo_id):
+    """Retorna o EsquemaCompilado do tipo, recarregando-o se a versão mudou"""
+    versao = obter_versao(tipo_processo_id)
+    esquema = _esquemas.get(tipo_processo_id)
+    if esquema is None or esquema.versao != versao:
+        with _lock:
+            esquema = _esquemas.get(tipo_processo_id)
+            if esquema is None or esquema.versao != versao:
+                esquema = EsquemaCompilado.carregar(tipo_processo_id, versao)
+                _esquemas[tipo_processo_id] = esquema
+    return esquema
+
+
+def invalidar_esquema(tipo_processo_id):
+    """
+    Troca a versão do esquema após o commit da transação corrente,
+    para que nenhum worker recarregue dados ainda não confirmados
+    """
+    versoes.trocar(CHAVE_VERSAO.format(tipo_processo_id))
@@ -0,0 +1,216 @@
+"""
+Benchmark de vazão: servidor síncrono (gunicorn, WSGI) x assíncrono (uvicorn, ASGI)
+Sobe cada servidor numa porta livre, com o banco configurado, e dispara
+clientes lentos concorrentes contra o formulário externo e a API de leitura:
+cada cliente envia os cabeçalhos aos poucos (--atraso segundos por
+requisição), como conexões móveis ruins. Os workers síncronos ficam presos a
+um cliente por vez; o ASGI aguarda os cabeçalhos no loop de eventos
+Execute: python manage.py benchmark_servidor [--clientes 500] [--duracao 30]
+"""
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from apps.formularios.models import FormularioExterno
+from apps.processos.models import InstanciaProcesso
+
+SERVIDORES = {
+    'sync': ('gunicorn', False),
+    'async': ('uvicorn', True),
+}
+
+
+def porta_livre():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0
+    return statistics.quantiles(valores, n=100, method='inclusive')[p - 1] if len(valores) > 1 else valores[0]
+
+
+class Command(BaseCommand):
+    help = 'Compara a vazão do servidor WSGI síncrono e do ASGI assíncrono com clientes lentos concorrentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=500, help='Clientes lentos simultâneos')
+        parser.add_argument('--duracao', type=float, default=30, help='Segundos de carga por servidor')
+        parser.add_argument('--atraso', type=float, default=1.0,
+                            help='Segundos que cada cliente leva para enviar os cabeçalhos')
+        parser.add_argument('--workers', type=int, default=4, help='Workers de cada servidor')
+        parser.add_argument('--servidores', default='sync,async', help='sync, async ou ambos')
+        parser.add_argument('--timeout', type=float, default=60, help='Tempo máximo de uma requisição')
+
+    def handle(self, *args, **options):
+        servidores = [s.strip() for s in options['servidores'].split(',') if s.strip()]
+        invalidos = set(servidores) - set(SERVIDORES)
+        if invalidos:
+            raise CommandError(f"Servidores inválidos: {', '.join(sorted(invalidos))} (use sync e/ou async)")
+        if settings.DATABASES['default']['NAME'] in ('', ':memory:'):
+            raise CommandError("O benchmark precisa de um banco compartilhado com os servidores (DATABASE_URL)")
+
+        caminhos, cookie = self._preparar()
+        self.stdout.write(
+            f"{options['clientes']} clientes, {options['atraso']}s para enviar os cabeçalhos, "
+            f"{options['duracao']}s por servidor, {options['workers']} workers"
+        )
+        for caminho in caminhos:
+            self.stdout.write(f"  {caminho}")
+
+        resultados = []
+        for nome in servidores:
+            resultado = self._medir_servidor(nome, caminhos, cookie, options)
+            resultados.append(resultado)
+            self.stdout.write(
+                f"  {nome:5} ({resultado['servidor']}): {resultado['requisicoes']:>6} respostas | "
+                f"{resultado['req_s']:8.1f} req/s | p50 {resultado['p50']:6.2f}s "
+                f"p95 {resultado['p95']:6.2f}s p99 {resultado['p99']:6.2f}s | {resultado['erros']} erros"
+            )
+
+        if len(resultados) == 2 and resultados[0]['req_s']:
+            self.stdout.write(self.style.SUCCESS(
+                f"async/sync: {resultados[1]['req_s'] / resultados[0]['req_s']:.1f}x a vazão"
+            ))
+
+    def _preparar(self):
+        """Caminhos medidos e cookie de sessão do usuário da API"""
+        formulario = FormularioExterno.objects.filter(ativo=True).order_by('id').first()
+        processo = InstanciaProcesso.objects.order_by('id').first()
+        if formulario is None or processo is None:
+            raise CommandError(
+                "São necessários um formulário externo ativo e processos (ex.: python manage.py gerar_carga)"
+            )
+
+        usuario, _ = User.objects.get_or_create(
+            username='benchmark_servidor', defaults={'is_staff': True, 'is_superuser': True}
+        )
+        cliente = Client()
+        cliente.force_login(usuario)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+        caminhos = [
+            reverse('formularios:externo', args=[formulario.token]),
+            reverse('api:processos') + '?limite=20',
+            reverse('api:processo', args=[processo.id]),
+        ]
+        return caminhos, cookie
+
+    def _medir_servidor(self, nome, caminhos, cookie, options):
+        programa, assincrono = SERVIDORES[nome]
+        porta = porta_livre()
+        if programa == 'gunicorn':
+            comando = [
+                sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+                '--bind', f'127.0.0.1:{porta}', '--workers', str(options['workers']), '--log-level', 'warning',
+            ]
+        else:
+            comando = [
+                sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+                '--host', '127.0.0.1', '--port', str(porta), '--workers', str(options['workers']),
+                '--log-level', 'warning', '--no-access-log',
+            ]
+        ambiente = {
+            **os.environ,
+            'VIEWS_ASSINCRONAS': str(assincrono),
+            'DESEMPENHO_MONITORAR': 'False',
+        }
+
+        processo = subprocess.Popen(
+            comando, cwd=settings.BASE_DIR, env=ambiente,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self._aguardar(porta, processo, caminhos[0])
+            latencias, erros = asyncio.run(self._carga(porta, caminhos, cookie, options))
+        finally:
+            processo.terminate()
+            try:
+                processo.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+
+        return {
+            'servidor': programa,
+            'requisicoes': len(latencias),
+            'req_s': len(latencias) / options['duracao'],
+            'p50': percentil(latencias, 50),
+            'p95': percentil(latencias, 95),
+            'p99': percentil(latencias, 99),
+            'erros': erros,
+        }
+
+    def _aguardar(self, porta, processo, caminho, limite=30):
+        """Espera o servidor responder"""
+        fim = time.monotonic() + limite
+        while time.monotonic() < fim:
+            if processo.poll() is not None:
+                raise CommandError(f"O servidor terminou ao iniciar: {' '.join(processo.args)}")
+            try:
+                with socket.create_connection(('127.0.0.1', porta), timeout=5) as sock:
+                    sock.sendall(f'GET {caminho} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode())
+                    if sock.recv(9).startswith(b'HTTP/1.1 '):
+                        return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f"O servidor não respondeu em {limite}s na porta {porta}")
+
+    async def _carga(self, porta, caminhos, cookie, options):
+        fim = time.monotonic() + options['duracao']
+        latencias = []
+        erros = [0]
+        await asyncio.gather(*(
+            self._cliente(porta, caminhos[indice % len(caminhos)], cookie, fim, latencias, erros, options)
+            for indice in range(options['clientes'])
+        ))
+        return latencias, erros[0]
+
+    async def _cliente(self, porta, caminho, cookie, fim, latencias, erros, options):
+        """Repete a requisição até o fim da carga, enviando uma linha de cabeçalho por vez"""
+        linhas = [
+            f'GET {caminho} HTTP/1.1\r\n',
+            'Host: 127.0.0.1\r\n',
+            'User-Agent: benchmark_servidor\r\n',
+            'Accept: text/html,application/json\r\n',
+            f'Cookie: {cookie}\r\n',
+            'Connection: close\r\n',
+            '\r\n',
+        ]
+        pausa = options['atraso'] / (len(linhas) - 1)
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            try:
+                resposta = await asyncio.wait_for(self._requisicao(porta, linhas, pausa), options['timeout'])
+                if not resposta.startswith(b'HTTP/1.1 200'):
+                    raise ValueError(resposta[:40])
+            except (OSError, ValueError, asyncio.TimeoutError):
+                erros[0] += 1
+                continue
+            # Respostas concluídas depois do fim não entram na vazão
+            if time.monotonic() <= fim:
+                latencias.append(time.perf_counter() - inicio)
+
+    async def _requisicao(self, porta, linhas, pausa):
+        leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+        try:
+            for indice, linha in enumerate(linhas):
+                if indice:
+                    await asyncio.sleep(pausa)
+                escritor.write(linha.encode())
+                await escritor.drain()
+            return await leitor.read()
+        finally:
+            escritor.close()
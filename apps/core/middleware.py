@@ -0,0 +1,106 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .desempenho import MedidorConsultas, registrar_medicao
+
+
+def _instalar_medidor(medidor):
+    connection.execute_wrappers.append(medidor)
+
+
+def _remover_medidor(medidor):
+    connection.execute_wrappers.remove(medidor)
+
+
+class DesempenhoMiddleware:
+    """
+    Mede consultas SQL e tempo de cada requisição
+    Desative com DESEMPENHO_MONITORAR=False
+    No ASGI o medidor é instalado na thread da requisição, a mesma em que o
+    Django executa o ORM assíncrono e as views síncronas
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not settings.DESEMPENHO_MONITORAR:
+            return self.get_response(request)
+
+        medidor = MedidorConsultas()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(medidor):
+            response = self.get_response(request)
+            # Respostas adiadas (TemplateResponse) ainda podem consultar o banco
+            if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                response.render()
+
+        registrar_medicao(
+            request, response, medidor, inicio,
+            getattr(request, '_orcamento_consultas', None)
+        )
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DESEMPENHO_MONITORAR:
+            return await self.get_response(request)
+
+        medidor = MedidorConsultas()
+        inicio = time.perf_counter()
+        await sync_to_async(_instalar_medidor)(medidor)
+        try:
+            response = await self.get_response(request)
+            if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                await sync_to_async(response.render)()
+        finally:
+            await sync_to_async(_remover_medidor)(medidor)
+
+        registrar_medicao(
+            request, response, medidor, inicio,
+            getattr(request, '_orcamento_consultas', None)
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._orcamento_consultas = getattr(view_func, 'orcamento_consultas', None)
+        return None
+
+
+class ArquivosEstaticosMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise que também atende no modo assíncrono (ASGI)
+    O WhiteNoiseMiddleware é só síncrono: no ASGI o Django passaria cada
+    requisição por uma thread para atravessá-lo, mesmo nas views assíncronas
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.28 on 2026-10-17 22:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaProcesso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.PositiveIntegerField(verbose_name='Ano')),
+                ('ultimo_valor', models.PositiveIntegerField(default=0, help_text='Último número sequencial já utilizado no ano', verbose_name='Último Valor')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('tipo_processo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sequencias', to='core.tipoprocesso', verbose_name='Tipo de Processo')),
+            ],
+            options={
+                'verbose_name': 'Sequência de Numeração',
+                'verbose_name_plural': 'Sequências de Numeração',
+                'ordering': ['tipo_processo', '-ano'],
+                'unique_together': {('tipo_processo', 'ano')},
+            },
+        ),
+    ]
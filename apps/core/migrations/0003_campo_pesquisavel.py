@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-17 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_sequenciaprocesso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campoformulario',
+            name='pesquisavel',
+            field=models.BooleanField(default=True, help_text='Inclui o valor do campo na busca de processos (após alterar, execute reconstruir_busca)', verbose_name='Pesquisável'),
+        ),
+    ]
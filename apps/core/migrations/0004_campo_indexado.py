@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-17 23:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_campo_pesquisavel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campoformulario',
+            name='indexado',
+            field=models.BooleanField(default=False, help_text='Cria um índice sobre o valor do campo e o oferece como filtro na lista de processos (após alterar, execute sincronizar_indices_dados)', verbose_name='Indexado'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.28 on 2026-10-18 00:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_campo_indexado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarimboVersao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=150, unique=True, verbose_name='Chave')),
+                ('versao', models.CharField(max_length=32, verbose_name='Versão')),
+            ],
+            options={
+                'verbose_name': 'Carimbo de Versão',
+                'verbose_name_plural': 'Carimbos de Versão',
+            },
+        ),
+    ]
@@ -1,6 +1,14 @@
-from django.db import models
+import re
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from apps.core.esquema import invalidar_esquema
 
 
 class TipoProcesso(models.Model):
@@ -41,22 +49,126 @@ class TipoProcesso(models.Model):
     def __str__(self):
         return self.nome
 
-    def get_proxima_sequencia(self):
-        """Retorna o próximo número sequencial para este tipo de processo"""
+    def get_proxima_sequencia(self, ano=None):
+        """Retorna o próximo número sequencial para este tipo de processo no ano"""
+        return SequenciaProcesso.proximo(self, ano=ano)
+
+    def reservar_sequencias(self, quantidade, ano=None):
+        """Reserva um bloco contíguo de números sequenciais (criação em lote)"""
+        return SequenciaProcesso.reservar(self, quantidade, ano=ano)
+
+
+class SequenciaProcesso(models.Model):
+    """
+    Contador de numeração por tipo de processo e ano
+    O incremento é feito com bloqueio de linha, evitando números duplicados
+    em submissões simultâneas, e a sequência reinicia a cada ano
+    """
+    tipo_processo = models.ForeignKey(
+        TipoProcesso,
+        on_delete=models.CASCADE,
+        related_name='sequencias',
+        verbose_name="Tipo de Processo"
+    )
+    ano = models.PositiveIntegerField(verbose_name="Ano")
+    ultimo_valor = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Último Valor",
+        help_text="Último número sequencial já utilizado no ano"
+    )
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Sequência de Numeração"
+        verbose_name_plural = "Sequências de Numeração"
+        ordering = ['tipo_processo', '-ano']
+        unique_together = [['tipo_processo', 'ano']]
+
+    def __str__(self):
+        return f"{self.tipo_processo.prefixo_numero}-{self.ano}: {self.ultimo_valor}"
+
+    @classmethod
+    def proximo(cls, tipo_processo, ano=None):
+        """Incrementa o contador e retorna o próximo número"""
+        return cls.reservar(tipo_processo, 1, ano=ano).start
+
+    @classmethod
+    def reservar(cls, tipo_processo, quantidade, ano=None):
+        """
+        Reserva `quantidade` números consecutivos de forma atômica
+        Retorna um range com os números reservados
+        """
+        if quantidade < 1:
+            raise ValueError("A quantidade reservada deve ser maior que zero")
+
+        ano = ano or timezone.now().year
+        with transaction.atomic():
+            # O UPDATE vem antes da leitura: ele bloqueia a linha (ou o banco,
+            # no SQLite) até o fim da transação, serializando as reservas
+            if not cls._incrementar(tipo_processo, ano, quantidade):
+                cls._criar_contador(tipo_processo, ano)
+                cls._incrementar(tipo_processo, ano, quantidade)
+            ultimo = cls.objects.filter(
+                tipo_processo=tipo_processo, ano=ano
+            ).values_list('ultimo_valor', flat=True).get()
+        return range(ultimo - quantidade + 1, ultimo + 1)
+
+    @classmethod
+    def _incrementar(cls, tipo_processo, ano, quantidade):
+        return cls.objects.filter(tipo_processo=tipo_processo, ano=ano).update(
+            ultimo_valor=F('ultimo_valor') + quantidade,
+            atualizado_em=timezone.now()
+        )
+
+    @classmethod
+    def _criar_contador(cls, tipo_processo, ano):
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    tipo_processo=tipo_processo,
+                    ano=ano,
+                    ultimo_valor=cls.maior_numero_existente(tipo_processo, ano)
+                )
+        except IntegrityError:
+            # Outra requisição criou o contador ao mesmo tempo
+            pass
+
+    @staticmethod
+    def maior_numero_existente(tipo_processo, ano):
+        """
+        Maior sequência já usada em números no formato PREFIXO-ANO-SEQUENCIA
+        Usado apenas ao criar o contador, para respeitar processos anteriores
+        """
         from apps.processos.models import InstanciaProcesso
-        ultimo = InstanciaProcesso.objects.filter(
-            tipo_processo=self
-        ).order_by('-id').first()
-        
-        if ultimo and ultimo.numero:
-            # Extrai o número da sequência (ex: TEF-2026-001 -> 1)
+        prefixo = f"{tipo_processo.prefixo_numero}-{ano}-"
+        numeros = InstanciaProcesso.objects.filter(
+            tipo_processo=tipo_processo,
+            numero__startswith=prefixo
+        ).values_list('numero', flat=True)
+
+        maior = 0
+        for numero in numeros.iterator():
             try:
-                partes = ultimo.numero.split('-')
-                if len(partes) >= 3:
-                    return int(partes[-1]) + 1
-            except (ValueError, IndexError):
-                pass
-        return 1
+                maior = max(maior, int(numero[len(prefixo):]))
+            except ValueError:
+                continue
+        return maior
+
+
+class CarimboVersao(models.Model):
+    """
+    Versão compartilhada por todos os workers (ver apps.core.versoes)
+    Trocada após cada alteração de esquema, formulário, permissões ou processos
+    """
+    chave = models.CharField(max_length=150, unique=True, verbose_name="Chave")
+    versao = models.CharField(max_length=32, verbose_name="Versão")
+
+    class Meta:
+        verbose_name = "Carimbo de Versão"
+        verbose_name_plural = "Carimbos de Versão"
+
+    def __str__(self):
+        return f"{self.chave}: {self.versao}"
 
 
 class Fase(models.Model):
@@ -232,6 +344,17 @@ class CampoFormulario(models.Model):
         verbose_name="Visível no Formulário Externo",
         help_text="Se desmarcado, o campo só aparece internamente"
     )
+    pesquisavel = models.BooleanField(
+        default=True,
+        verbose_name="Pesquisável",
+        help_text="Inclui o valor do campo na busca de processos (após alterar, execute reconstruir_busca)"
+    )
+    indexado = models.BooleanField(
+        default=False,
+        verbose_name="Indexado",
+        help_text="Cria um índice sobre o valor do campo e o oferece como filtro na lista de processos "
+                  "(após alterar, execute sincronizar_indices_dados)"
+    )
 
     class Meta:
         verbose_name = "Campo do Formulário"
@@ -241,3 +364,62 @@ class CampoFormulario(models.Model):
 
     def __str__(self):
         return f"{self.tipo_processo.nome} - {self.label}"
+
+    def clean(self):
+        super().clean()
+        if self.validacao_regex:
+            try:
+                re.compile(self.validacao_regex)
+            except re.error as e:
+                raise ValidationError({'validacao_regex': f'Expressão regular inválida: {e}'})
+
+    @cached_property
+    def regex_compilada(self):
+        """
+        Regex de validação compilada no primeiro uso
+        None se não configurada ou inválida (gravada fora do admin)
+        """
+        if not self.validacao_regex:
+            return None
+        try:
+            return re.compile(self.validacao_regex)
+        except re.error:
+            return None
+
+    def validar_valor(self, valor):
+        """
+        Valida um valor informado para o campo
+        Retorna a mensagem de erro ou None se o valor for válido
+        """
+        if self.obrigatorio and not valor:
+            return f'O campo "{self.label}" é obrigatório.'
+        
+        if self.validacao_regex and valor:
+            if self.regex_compilada is None:
+                # Regex inválida: só este campo é recusado, o restante do esquema continua utilizável
+                return f'O campo "{self.label}" tem uma validação mal configurada.'
+            if not self.regex_compilada.match(valor):
+                return f'O campo "{self.label}" está em formato inválido.'
+        
+        return None
+
+
+@receiver([post_save, post_delete], sender=TipoProcesso)
+def invalidar_esquema_tipo(sender, instance, **kwargs):
+    """Descarta o esquema compilado quando o tipo de processo muda"""
+    invalidar_esquema(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Fase)
+@receiver([post_save, post_delete], sender=CampoFormulario)
+def invalidar_esquema_item(sender, instance, **kwargs):
+    """Descarta o esquema compilado quando uma fase ou campo muda"""
+    invalidar_esquema(instance.tipo_processo_id)
+
+
+@receiver(m2m_changed, sender=CampoFormulario.obrigatorio_em_fases.through)
+def invalidar_esquema_obrigatoriedade(sender, instance, action, **kwargs):
+    """Descarta o esquema compilado quando a obrigatoriedade por fase muda"""
+    # instance pode ser o campo ou a fase, ambos ligados ao tipo de processo
+    if action.startswith('post_'):
+        invalidar_esquema(instance.tipo_processo_id)
@@ -0,0 +1,199 @@
+"""
+Paginação por cursor (keyset)
+Em vez de OFFSET/LIMIT, cada página continua a partir da última linha da
+anterior, usando o índice de ordenação: o custo de uma página não depende
+da profundidade e não há COUNT(*) a cada requisição.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class CursorInvalido(ValueError):
+    """Cursor malformado ou adulterado"""
+
+
+def codificar_cursor(valores, direcao):
+    dados = json.dumps({'v': valores, 'd': direcao}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        return dados['v'], dados['d']
+    except (ValueError, KeyError, TypeError):
+        raise CursorInvalido("Cursor de paginação inválido")
+
+
+class PaginaCursor:
+    """Uma página de resultados com os cursores opacos de navegação"""
+
+    def __init__(self, itens, proximo_cursor, cursor_anterior):
+        self.object_list = itens
+        self.proximo_cursor = proximo_cursor
+        self.cursor_anterior = cursor_anterior
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.proximo_cursor is not None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def cursores(self):
+        """Cursores no formato usado pelas respostas JSON"""
+        return {'proximo': self.proximo_cursor, 'anterior': self.cursor_anterior}
+
+
+class PaginadorCursor:
+    """
+    Pagina um queryset ordenado por (campo, id), por padrão (-criado_em, -id)
+    campo pode ser uma anotação; nesse caso conversor transforma o valor do
+    cursor (texto) de volta no tipo da anotação. Para linhas que não são
+    instâncias do modelo (values_list), chave retorna (valor do campo, pk)
+    
+    Uso:
+        pagina = PaginadorCursor(queryset, por_pagina=20).pagina(request.GET.get('cursor'))
+    """
+
+    def __init__(self, queryset, por_pagina=20, campo='criado_em', descendente=True, conversor=None, chave=None):
+        self.queryset = queryset
+        self.por_pagina = por_pagina
+        self.campo = campo
+        self.descendente = descendente
+        self.conversor = conversor
+        self.chave = chave
+
+    def _valores(self, item):
+        valor, pk = self.chave(item) if self.chave else (getattr(item, self.campo), item.pk)
+        if isinstance(valor, datetime):
+            valor = valor.isoformat()
+        return [valor, pk]
+
+    def _filtro_apos(self, valores, para_frente):
+        """Linhas depois (ou antes) da posição do cursor na ordenação da listagem"""
+        try:
+            if self.conversor:
+                valor = self.conversor(valores[0])
+            else:
+                valor = self.queryset.model._meta.get_field(self.campo).to_python(valores[0])
+            pk = int(valores[1])
+        except (ValidationError, ArithmeticError, ValueError, TypeError, IndexError):
+            raise CursorInvalido("Cursor de paginação inválido")
+        menor = para_frente == self.descendente
+        operador = 'lt' if menor else 'gt'
+        return (
+            Q(**{f'{self.campo}__{operador}': valor}) |
+            Q(**{self.campo: valor, f'pk__{operador}': pk})
+        )
+
+    def _ordenacao(self, para_frente):
+        crescente = para_frente != self.descendente
+        prefixo = '' if crescente else '-'
+        return [f'{prefixo}{self.campo}', f'{prefixo}pk']
+
+    def _consulta(self, cursor):
+        """Fatia do queryset a partir do cursor e a direção da navegação"""
+        para_frente = True
+        queryset = self.queryset
+        if cursor:
+            valores, direcao = decodificar_cursor(cursor)
+            para_frente = direcao != 'a'
+            queryset = queryset.filter(self._filtro_apos(valores, para_frente))
+        return queryset.order_by(*self._ordenacao(para_frente))[:self.por_pagina + 1], para_frente
+
+    def pagina(self, cursor=None):
+        """Retorna a PaginaCursor correspondente ao cursor (primeira página se vazio)"""
+        consulta, para_frente = self._consulta(cursor)
+        return self._montar(list(consulta), cursor, para_frente)
+
+    async def apagina(self, cursor=None):
+        """Como pagina(), com o ORM assíncrono (views async)"""
+        consulta, para_frente = self._consulta(cursor)
+        return self._montar([item async for item in consulta], cursor, para_frente)
+
+    def _montar(self, itens, cursor, para_frente):
+        ha_mais = len(itens) > self.por_pagina
+        itens = itens[:self.por_pagina]
+        if not para_frente:
+            itens.reverse()
+
+        if not itens:
+            return PaginaCursor([], None, None)
+
+        if para_frente:
+            tem_proxima, tem_anterior = ha_mais, bool(cursor)
+        else:
+            tem_proxima, tem_anterior = True, ha_mais
+
+        return PaginaCursor(
+            itens,
+            codificar_cursor(self._valores(itens[-1]), 'p') if tem_proxima else None,
+            codificar_cursor(self._valores(itens[0]), 'a') if tem_anterior else None,
+        )
+
+
+def paginar_sequencia(itens, cursor=None, por_pagina=20, campo='criado_em'):
+    """
+    Pagina (só para frente) uma lista já carregada em ordem (-campo, -pk),
+    com os mesmos cursores do PaginadorCursor (ex: eventos lidos de arquivo)
+    """
+    def chave(item):
+        return getattr(item, campo), item.pk
+
+    if cursor:
+        valores, _ = decodificar_cursor(cursor)
+        try:
+            limite = (datetime.fromisoformat(valores[0]), int(valores[1]))
+        except (ValueError, TypeError, IndexError):
+            raise CursorInvalido("Cursor de paginação inválido")
+        itens = [item for item in itens if chave(item) < limite]
+
+    pagina = itens[:por_pagina]
+    proximo = None
+    if len(itens) > por_pagina:
+        ultimo = pagina[-1]
+        proximo = codificar_cursor([getattr(ultimo, campo).isoformat(), ultimo.pk], 'p')
+    return PaginaCursor(pagina, proximo, None)
+
+
+def contagem_aproximada(queryset):
+    """
+    Total aproximado do queryset
+    No PostgreSQL usa a estimativa do planejador (EXPLAIN), sem percorrer a
+    tabela; nos demais bancos faz o COUNT(*) exato
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plano = cursor.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return int(plano[0]['Plan']['Plan Rows'])
+
+
+class PaginadorContagemAproximada(Paginator):
+    """Paginator cujo total vem de contagem_aproximada (ex: changelist do admin)"""
+
+    @cached_property
+    def count(self):
+        return contagem_aproximada(self.object_list)
@@ -1,3 +1,283 @@
-from django.test import TestCase
+import logging
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import URLPattern, get_resolver, reverse
+
+from apps.core.desempenho import MedidorConsultas
+from apps.core.esquema import obter_esquema
+from apps.core.models import TipoProcesso, Fase, CampoFormulario, SequenciaProcesso
+from apps.formularios.models import FormularioExterno
+from apps.processos.models import InstanciaProcesso
+from apps.usuarios.models import PerfilUsuario
+
+NAMESPACES = ['processos', 'configuracoes', 'formularios', 'api']
+
+CACHE_ISOLADO = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Sem o manifesto do collectstatic (o test runner roda com DEBUG=False)
+ESTATICOS_SEM_MANIFESTO = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+
+def popular(quantidade=50):
+    """Dados de exemplo: um tipo com 5 fases, 8 campos e processos com histórico, e outros tipos"""
+    from apps.workflow.services import WorkflowService
+
+    usuario = User.objects.create_user('orcamento', password='orcamento', is_staff=True)
+    PerfilUsuario.objects.create(user=usuario, setor='COMERCIAL')
+
+    tipo = TipoProcesso.objects.create(
+        nome='Orçamento de Consultas', descricao='Dados de exemplo', prefixo_numero='ORC'
+    )
+    fases = [
+        Fase.objects.create(
+            tipo_processo=tipo, nome=f'Fase {ordem}', ordem=ordem,
+            setor_responsavel='COMERCIAL' if ordem % 2 else 'TODOS',
+            fase_inicial=ordem == 1, fase_final=ordem == 5
+        )
+        for ordem in range(1, 6)
+    ]
+    for ordem in range(1, 9):
+        CampoFormulario.objects.create(
+            tipo_processo=tipo, nome_campo=f'campo_{ordem}', label=f'Campo {ordem}',
+            tipo_campo='text', grupo=f'Grupo {ordem % 3}', ordem=ordem,
+            obrigatorio=ordem == 1
+        )
+    formulario = FormularioExterno.objects.create(
+        tipo_processo=tipo, titulo='Orçamento', descricao='Dados de exemplo'
+    )
+
+    # Várias linhas nas listagens, para que consultas por linha apareçam
+    for indice, letra in enumerate('ABCD', start=1):
+        outro = TipoProcesso.objects.create(
+            nome=f'Tipo de Exemplo {indice}', descricao='Dados de exemplo',
+            prefixo_numero=f'EX{letra}'
+        )
+        Fase.objects.create(
+            tipo_processo=outro, nome='Entrada', ordem=1,
+            setor_responsavel='TODOS', fase_inicial=True
+        )
+        CampoFormulario.objects.create(
+            tipo_processo=outro, nome_campo='descricao', label='Descrição', tipo_campo='text'
+        )
+        FormularioExterno.objects.create(
+            tipo_processo=outro, titulo=f'Exemplo {indice}', descricao='Dados de exemplo'
+        )
+        colega = User.objects.create_user(f'exemplo{indice}', password='exemplo')
+        PerfilUsuario.objects.create(user=colega, setor='OPERACOES')
+
+    lista_dados = [
+        {f'campo_{ordem}': f'Valor {i}-{ordem}' for ordem in range(1, 9)}
+        for i in range(quantidade)
+    ]
+    processos = WorkflowService.criar_processos_em_lote(
+        tipo, fases[0], lista_dados, origem='criacao_interna', usuario=usuario
+    )
+    # Histórico variado para a tela de detalhes
+    WorkflowService.transicionar_em_lote(processos[: quantidade // 2], fases[1], usuario)
+    processo = processos[0]
+    processo.refresh_from_db()
+    for indice in range(5):
+        WorkflowService.adicionar_comentario(processo, usuario, f'Comentário {indice}')
+
+    return {
+        'usuario': usuario,
+        'tipo': tipo,
+        'fases': fases,
+        'formulario': formulario,
+        'processo': processo,
+        'processos': processos,
+    }
+
+
+def padroes():
+    """(nome, padrão) das rotas dos namespaces verificados"""
+    resolver = get_resolver()
+    for namespace in NAMESPACES:
+        for padrao in resolver.namespace_dict[namespace][1].url_patterns:
+            if isinstance(padrao, URLPattern):
+                yield f'{namespace}:{padrao.name}', padrao
+
+
+def rotas(dados):
+    """(nome, view, url) de todas as rotas dos namespaces verificados"""
+    kwargs_por_parametro = {
+        'processo_id': dados['processo'].id,
+        'tipo_id': dados['tipo'].id,
+        'fase_id': dados['fases'][0].id,
+        'token': dados['formulario'].token,
+    }
+    for nome, padrao in padroes():
+        parametros = padrao.pattern.converters.keys()
+        url = reverse(nome, kwargs={p: kwargs_por_parametro[p] for p in parametros})
+        yield nome, padrao.callback, url
+
+
+def dados_post(nome, dados):
+    """Dados válidos das views que só aceitam POST"""
+    fase_destino = dados['fases'][2].id
+    return {
+        'processos:mudar_fase': {'nova_fase': fase_destino},
+        'processos:mover': {'nova_fase': dados['fases'][3].id},
+        'processos:mudar_fase_lote': {
+            'processos': [p.id for p in dados['processos'][-10:]],
+            'nova_fase': fase_destino,
+        },
+        'processos:atribuir_responsavel': {'responsavel': dados['usuario'].id},
+        'processos:adicionar_comentario': {'comentario': 'Comentário de verificação'},
+        'formularios:externo': {
+            f'campo_{ordem}': f'Externo {ordem}' for ordem in range(1, 9)
+        },
+    }.get(nome)
+
+
+@override_settings(
+    CACHES=CACHE_ISOLADO, DESEMPENHO_MONITORAR=False, STATICFILES_STORAGE=ESTATICOS_SEM_MANIFESTO
+)
+class OrcamentoConsultasTest(TransactionTestCase):
+    """
+    Nenhuma view excede o número de consultas declarado com @orcamento_consultas
+    TransactionTestCase: as transações e os on_commit das views rodam como em
+    produção (num TestCase os savepoints entrariam na contagem)
+    """
+
+    def test_views_declaram_orcamento(self):
+        sem_orcamento = [
+            nome for nome, padrao in padroes() if getattr(padrao.callback, 'orcamento_consultas', None) is None
+        ]
+        self.assertEqual(sem_orcamento, [])
+
+    def test_views_dentro_do_orcamento(self):
+        dados = popular()
+        cliente = Client()
+        cliente.force_login(dados['usuario'])
+
+        # GETs antes dos POSTs, que alteram os dados
+        requisicoes = []
+        for nome, view, url in rotas(dados):
+            requisicoes.insert(0, (nome, view, url, 'get', None))
+            corpo = dados_post(nome, dados)
+            if corpo is not None:
+                requisicoes.append((nome, view, url, 'post', corpo))
+
+        # GET em views só-POST responde 405; não polui a saída com esses avisos
+        log = logging.getLogger('django.request')
+        nivel = log.level
+        log.setLevel(logging.CRITICAL)
+        try:
+            for nome, view, url, metodo, corpo in requisicoes:
+                # Caches vazios: mede o caminho frio, o mais caro
+                cache.clear()
+                medidor = MedidorConsultas()
+                with connection.execute_wrapper(medidor):
+                    response = getattr(cliente, metodo)(url, corpo or {})
+                    # Respostas em streaming consultam o banco enquanto são consumidas
+                    if response.streaming:
+                        for _ in response:
+                            pass
+                if response.status_code == 405:
+                    continue
+                with self.subTest(view=nome, metodo=metodo.upper()):
+                    self.assertNotEqual(response.status_code, 500)
+                    repetidas = '\n'.join(
+                        f"{r['vezes']}x {r['sql'][:150]}" for r in medidor.repetidas()[:3]
+                    )
+                    self.assertLessEqual(
+                        medidor.total, view.orcamento_consultas,
+                        f"{metodo.upper()} {nome}: {medidor.total} consultas\n{repetidas}"
+                    )
+        finally:
+            log.setLevel(nivel)
+
+
+@override_settings(CACHES=CACHE_ISOLADO, STATICFILES_STORAGE=ESTATICOS_SEM_MANIFESTO)
+class RegexInvalidaTest(TestCase):
+    """Uma validacao_regex inválida afeta só o campo, e não o esquema inteiro"""
+
+    def setUp(self):
+        # Os carimbos de versão só trocam no commit; sem isso o esquema de um
+        # tipo de outro teste, com o mesmo id, seria reaproveitado
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tipo = TipoProcesso.objects.create(nome='Regex', descricao='Regex', prefixo_numero='REG')
+            Fase.objects.create(tipo_processo=self.tipo, nome='Entrada', ordem=1, fase_inicial=True)
+            # Gravado fora do admin, sem passar pelo clean()
+            self.campo = CampoFormulario.objects.create(
+                tipo_processo=self.tipo, nome_campo='codigo', label='Código', tipo_campo='text',
+                validacao_regex='[a-',
+            )
+        self.formulario = FormularioExterno.objects.create(tipo_processo=self.tipo, titulo='Regex')
+
+    def test_esquema_e_formulario_carregam(self):
+        esquema = obter_esquema(self.tipo.id)
+        self.assertEqual([c.nome_campo for c in esquema.campos], ['codigo'])
+        response = Client().get(reverse('formularios:externo', args=[self.formulario.token]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_valor_recusado(self):
+        campo = obter_esquema(self.tipo.id).campos_por_nome['codigo']
+        self.assertIsNone(campo.regex_compilada)
+        self.assertIn('mal configurada', campo.validar_valor('abc'))
+        self.assertIsNone(campo.validar_valor(''))
+
+    def test_clean_rejeita_padrao_invalido(self):
+        with self.assertRaises(ValidationError) as contexto:
+            self.campo.full_clean()
+        self.assertIn('validacao_regex', contexto.exception.message_dict)
+
+        self.campo.validacao_regex = r'^[A-Z]{3}$'
+        self.campo.full_clean()
+        self.assertIsNone(self.campo.validar_valor('ABC'))
+
+
+@override_settings(CACHES=CACHE_ISOLADO)
+class SequenciaProcessoTest(TestCase):
+    """Numeração PREFIXO-ANO-SEQUENCIA reservada por SequenciaProcesso"""
+
+    def setUp(self):
+        self.tipo = TipoProcesso.objects.create(nome='Sequência', descricao='Sequência', prefixo_numero='SEQ')
+        self.fase = Fase.objects.create(tipo_processo=self.tipo, nome='Entrada', ordem=1, fase_inicial=True)
+
+    def criar(self, numero=''):
+        return InstanciaProcesso.objects.create(tipo_processo=self.tipo, fase_atual=self.fase, numero=numero)
+
+    def test_reservas_sem_sobreposicao(self):
+        from apps.workflow.services import WorkflowService
+
+        primeira = SequenciaProcesso.reservar(self.tipo, 25, ano=2026)
+        segunda = SequenciaProcesso.reservar(self.tipo, 10, ano=2026)
+        self.assertEqual(list(primeira), list(range(1, 26)))
+        self.assertEqual(list(segunda), list(range(26, 36)))
+
+        with mock.patch('django.utils.timezone.now', return_value=datetime(2026, 5, 1, tzinfo=dt_timezone.utc)):
+            processos = WorkflowService.criar_processos_em_lote(self.tipo, self.fase, [{}] * 30)
+        numeros = [processo.numero for processo in processos]
+        self.assertEqual(len(set(numeros)), 30)
+        self.assertEqual(numeros[0], 'SEQ-2026-036')
+        self.assertEqual(numeros[-1], 'SEQ-2026-065')
+
+    def test_contador_parte_dos_numeros_existentes(self):
+        # Processos de antes do contador (e um número fora do formato, ignorado)
+        for numero in ['SEQ-2025-007', 'SEQ-2025-012', 'SEQ-2025-ABC', 'SEQ-2024-500']:
+            self.criar(numero)
+        self.assertFalse(SequenciaProcesso.objects.filter(tipo_processo=self.tipo, ano=2025).exists())
+
+        self.assertEqual(SequenciaProcesso.proximo(self.tipo, ano=2025), 13)
+        self.assertEqual(
+            SequenciaProcesso.objects.get(tipo_processo=self.tipo, ano=2025).ultimo_valor, 13
+        )
+
+    def test_reinicia_na_virada_do_ano(self):
+        datas = [
+            datetime(2025, 12, 31, 23, tzinfo=dt_timezone.utc),
+            datetime(2025, 12, 31, 23, 30, tzinfo=dt_timezone.utc),
+            datetime(2026, 1, 1, 1, tzinfo=dt_timezone.utc),
+        ]
+        numeros = []
+        for data in datas:
+            with mock.patch('django.utils.timezone.now', return_value=data):
+                numeros.append(self.criar().numero)
+        self.assertEqual(numeros, ['SEQ-2025-001', 'SEQ-2025-002', 'SEQ-2026-001'])
@@ -25,4 +25,10 @@ urlpatterns = [
     # Usuários
     path('usuarios/', views.usuarios_lista, name='usuarios_lista'),
     path('usuarios/criar/', views.usuarios_criar, name='usuarios_criar'),
+    
+    # Desempenho
+    path('desempenho/', views.desempenho, name='desempenho'),
+    
+    # Análise do workflow
+    path('analitico/', views.analitico_workflow, name='analitico'),
 ]
@@ -0,0 +1,26 @@
+"""
+Utilitários de teste e de benchmark
+Fora de apps.core.desempenho, que o middleware carrega em toda requisição,
+para que django.test não seja importado em produção
+"""
+from contextlib import contextmanager
+
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+
+@contextmanager
+def banco_de_teste(ativo=True):
+    """
+    Banco de teste descartável dos comandos de benchmark, criado como no
+    manage.py test; ativo=False usa o banco configurado
+    """
+    setup_test_environment()
+    bancos = setup_databases(verbosity=0, interactive=False, serialized_aliases=[]) if ativo else None
+    try:
+        yield
+    finally:
+        if bancos is not None:
+            teardown_databases(bancos, verbosity=0)
+        teardown_test_environment()
@@ -0,0 +1,74 @@
+"""
+Carimbos de versão compartilhados entre os workers
+Esquemas, páginas de formulário, permissões e a marca da listagem são
+validados por carimbos que mudam a cada alteração. Os carimbos ficam no banco
+(CarimboVersao), e não no cache: com o LocMemCache padrão, a troca feita por
+um worker (ou pela fila de formulários e pelos comandos de manutenção) não
+chegaria aos outros. Cada processo guarda uma cópia local por
+CACHE_VERSOES_SEGUNDOS, o atraso máximo para uma troca chegar aos demais
+workers. Sem linha no banco a versão é INICIAL (nunca alterada)
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+INICIAL = '0'
+
+_locais = {}
+_lock = threading.Lock()
+
+
+def obter_varias(chaves, segundos=None):
+    """
+    Versões atuais das chaves ({chave: versao})
+    Uma consulta para as chaves sem cópia local válida; segundos=0 sempre lê o banco
+    """
+    from .models import CarimboVersao
+
+    segundos = settings.CACHE_VERSOES_SEGUNDOS if segundos is None else segundos
+    agora = time.monotonic()
+    versoes = {}
+    pendentes = []
+    for chave in chaves:
+        local = _locais.get(chave)
+        if segundos and local is not None and local[1] > agora:
+            versoes[chave] = local[0]
+        else:
+            pendentes.append(chave)
+
+    if pendentes:
+        lidas = dict(CarimboVersao.objects.filter(chave__in=pendentes).values_list('chave', 'versao'))
+        with _lock:
+            for chave in pendentes:
+                versoes[chave] = lidas.get(chave, INICIAL)
+                _locais[chave] = (versoes[chave], agora + segundos)
+    return versoes
+
+
+def obter(chave, segundos=None):
+    """Versão atual de uma chave"""
+    return obter_varias([chave], segundos)[chave]
+
+
+def trocar(*chaves):
+    """
+    Grava novas versões após o commit da transação corrente, para que nenhum
+    worker recarregue dados ainda não confirmados. O processo atual vê a troca
+    logo após o commit; os demais workers, em até CACHE_VERSOES_SEGUNDOS
+    """
+    from .models import CarimboVersao
+
+    def gravar():
+        novas = {chave: uuid.uuid4().hex for chave in set(chaves)}
+        CarimboVersao.objects.bulk_create(
+            [CarimboVersao(chave=chave, versao=versao) for chave, versao in novas.items()],
+            update_conflicts=True, unique_fields=['chave'], update_fields=['versao'],
+        )
+        validade = time.monotonic() + settings.CACHE_VERSOES_SEGUNDOS
+        with _lock:
+            _locais.update({chave: (versao, validade) for chave, versao in novas.items()})
+
+    transaction.on_commit(gravar)
@@ -2,12 +2,17 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.db import transaction
+from django.db.models import Count
+from django.utils.dateparse import parse_datetime
 from apps.core.models import TipoProcesso, Fase, CampoFormulario
+from apps.core.desempenho import registro, orcamento_consultas
+from apps.auditoria import analitico
 from apps.formularios.models import FormularioExterno
 from apps.usuarios.models import PerfilUsuario
 from django.contrib.auth.models import User
 
 
+@orcamento_consultas(10)
 @staff_member_required
 def configuracoes_index(request):
     """Dashboard de configurações"""
@@ -22,13 +27,18 @@ def configuracoes_index(request):
     return render(request, 'configuracoes/index.html', {'stats': stats})
 
 
+@orcamento_consultas(6)
 @staff_member_required
 def tipos_processo_lista(request):
     """Lista tipos de processo"""
-    tipos = TipoProcesso.objects.all().order_by('nome')
+    tipos = TipoProcesso.objects.annotate(
+        total_fases=Count('fases', distinct=True),
+        total_campos=Count('campos', distinct=True)
+    ).order_by('nome')
     return render(request, 'configuracoes/tipos_processo/lista.html', {'tipos': tipos})
 
 
+@orcamento_consultas(6)
 @staff_member_required
 def tipos_processo_criar(request):
     """Cria novo tipo de processo"""
@@ -53,6 +63,7 @@ def tipos_processo_criar(request):
     return render(request, 'configuracoes/tipos_processo/form.html')
 
 
+@orcamento_consultas(6)
 @staff_member_required
 def tipos_processo_editar(request, tipo_id):
     """Edita tipo de processo"""
@@ -74,6 +85,7 @@ def tipos_processo_editar(request, tipo_id):
     return render(request, 'configuracoes/tipos_processo/form.html', {'tipo': tipo})
 
 
+@orcamento_consultas(7)
 @staff_member_required
 def fases_gerenciar(request, tipo_id):
     """Gerencia fases de um tipo de processo"""
@@ -112,6 +124,7 @@ def fases_gerenciar(request, tipo_id):
     })
 
 
+@orcamento_consultas(7)
 @staff_member_required
 def campos_gerenciar(request, tipo_id):
     """Gerencia campos de um tipo de processo"""
@@ -154,6 +167,7 @@ def campos_gerenciar(request, tipo_id):
     })
 
 
+@orcamento_consultas(6)
 @staff_member_required
 def formularios_externos_lista(request):
     """Lista formulários externos"""
@@ -163,6 +177,7 @@ def formularios_externos_lista(request):
     })
 
 
+@orcamento_consultas(6)
 @staff_member_required
 def formularios_externos_criar(request):
     """Cria formulário externo"""
@@ -194,6 +209,7 @@ def formularios_externos_criar(request):
     return render(request, 'configuracoes/formularios/form.html', {'tipos': tipos})
 
 
+@orcamento_consultas(6)
 @staff_member_required
 def usuarios_lista(request):
     """Lista usuários"""
@@ -203,6 +219,7 @@ def usuarios_lista(request):
     })
 
 
+@orcamento_consultas(8)
 @staff_member_required
 def usuarios_criar(request):
     """Cria novo usuário"""
@@ -238,3 +255,54 @@ def usuarios_criar(request):
             messages.error(request, f'Erro ao criar usuário: {str(e)}')
     
     return render(request, 'configuracoes/usuarios/form.html')
+
+
+@orcamento_consultas(4)
+@staff_member_required
+def desempenho(request):
+    """Consultas SQL e tempos por view, a partir das últimas requisições"""
+    if request.method == 'POST':
+        registro.limpar()
+        messages.success(request, 'Medições de desempenho limpas.')
+        return redirect('configuracoes:desempenho')
+    
+    return render(request, 'configuracoes/desempenho.html', {
+        'resumo': registro.resumo(),
+        'recentes': registro.recentes()[:50],
+    })
+
+
+@orcamento_consultas(6)
+@staff_member_required
+def analitico_workflow(request):
+    """Vazão, tempo de ciclo, retrabalho e gargalos por tipo de processo"""
+    if request.method == 'POST':
+        novos = analitico.extrair()
+        messages.success(request, f'{novos} eventos novos extraídos do histórico.')
+        return redirect(request.get_full_path())
+
+    tipos = list(TipoProcesso.objects.filter(ativo=True).order_by('nome'))
+    tipo = next((t for t in tipos if str(t.id) == request.GET.get('tipo')), tipos[0] if tipos else None)
+    try:
+        dias = max(1, int(request.GET.get('dias', 30)))
+    except ValueError:
+        dias = 30
+
+    metadados = analitico.ler_metadados()
+    relatorio = analitico.metricas(tipo, dias) if tipo else None
+    if relatorio:
+        formatar = analitico.formatar_duracao
+        relatorio['ciclo_texto'] = {p: formatar(v) for p, v in relatorio['ciclo'].items()}
+        for fase in relatorio['fases']:
+            fase['duracao_texto'] = [formatar(fase['duracao'][p]) for p in analitico.PERCENTIS]
+            fase['espera_texto'] = formatar(fase['espera_atual_p50'])
+
+    return render(request, 'configuracoes/analitico.html', {
+        'tipos': tipos,
+        'tipo': tipo,
+        'dias': dias,
+        'relatorio': relatorio,
+        'percentis': analitico.PERCENTIS,
+        'metadados': metadados,
+        'extraido_em': parse_datetime(metadados['extraido_em']) if metadados['extraido_em'] else None,
+    })
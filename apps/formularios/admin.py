@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FormularioExterno
+from .models import FormularioExterno, SubmissaoPendente, SubmissaoFalha
 
 
 @admin.register(FormularioExterno)
@@ -43,3 +43,36 @@ class FormularioExternoAdmin(admin.ModelAdmin):
             link, link, link
         )
     get_link_completo.short_description = 'Link Público'
+
+
+@admin.register(SubmissaoPendente)
+class SubmissaoPendenteAdmin(admin.ModelAdmin):
+    list_display = ['protocolo', 'formulario', 'status', 'tentativas', 'proxima_tentativa', 'instancia', 'criado_em']
+    list_filter = ['status', 'formulario']
+    search_fields = ['protocolo']
+    readonly_fields = ['formulario', 'protocolo', 'dados', 'ip_origem', 'status', 'tentativas',
+                       'proxima_tentativa', 'ultimo_erro', 'instancia', 'criado_em', 'processado_em']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SubmissaoFalha)
+class SubmissaoFalhaAdmin(admin.ModelAdmin):
+    list_display = ['protocolo', 'formulario', 'tentativas', 'erro', 'falhou_em']
+    list_filter = ['formulario']
+    search_fields = ['protocolo']
+    readonly_fields = ['formulario', 'protocolo', 'dados', 'ip_origem', 'tentativas',
+                       'erro', 'recebido_em', 'falhou_em']
+    actions = ['reenfileirar']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description='Reenviar para a fila de entrada')
+    def reenfileirar(self, request, queryset):
+        total = 0
+        for falha in queryset:
+            falha.reenfileirar()
+            total += 1
+        self.message_user(request, f'{total} submissão(ões) reenviada(s) para a fila.')
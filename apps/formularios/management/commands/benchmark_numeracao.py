@@ -0,0 +1,119 @@
+"""
+Benchmark de concorrência da numeração de processos
+Dispara submissões simultâneas de formulário externo e verifica colisões
+Execute: python manage.py benchmark_numeracao --submissoes 300 --threads 50
+"""
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, close_old_connections
+
+from apps.core.models import TipoProcesso, Fase, CampoFormulario
+from apps.formularios.models import FormularioExterno
+from apps.processos.models import InstanciaProcesso
+
+
+class Command(BaseCommand):
+    help = 'Mede a numeração de processos sob submissões concorrentes de formulário externo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissoes', type=int, default=300, help='Total de submissões')
+        parser.add_argument('--threads', type=int, default=50, help='Submissões simultâneas')
+        parser.add_argument('--ondas', type=int, default=5, help='Ondas para comparar a latência')
+        parser.add_argument('--manter', action='store_true', help='Não remove os dados criados')
+
+    def handle(self, *args, **options):
+        total = options['submissoes']
+        ondas = max(1, options['ondas'])
+        formulario = self._criar_formulario()
+
+        try:
+            latencias_por_onda = []
+            falhas = []
+            por_onda = max(1, total // ondas)
+
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                for onda in range(ondas):
+                    resultados = list(executor.map(
+                        lambda i: self._submeter(formulario, i),
+                        range(onda * por_onda, (onda + 1) * por_onda)
+                    ))
+                    latencias_por_onda.append([r[0] for r in resultados if r[1] is None])
+                    falhas.extend(r[1] for r in resultados if r[1] is not None)
+
+            numeros = list(InstanciaProcesso.objects.filter(
+                tipo_processo=formulario.tipo_processo
+            ).values_list('numero', flat=True))
+            duplicados = len(numeros) - len(set(numeros))
+
+            self.stdout.write(f"Banco: {connection.vendor}")
+            self.stdout.write(f"Submissões: {ondas * por_onda} | criadas: {len(numeros)} | falhas: {len(falhas)}")
+            for indice, latencias in enumerate(latencias_por_onda, start=1):
+                self.stdout.write(f"  Onda {indice}: {self._resumo(latencias)}")
+            for erro in sorted(set(falhas))[:5]:
+                self.stdout.write(self.style.WARNING(f"  Erro: {erro}"))
+
+            if duplicados:
+                raise CommandError(f"{duplicados} números duplicados encontrados")
+
+            primeira, ultima = latencias_por_onda[0], latencias_por_onda[-1]
+            if primeira and ultima and self._p95(ultima) > 2 * self._p95(primeira):
+                self.stdout.write(self.style.WARNING(
+                    "Latência p95 da última onda é mais que o dobro da primeira"
+                ))
+            self.stdout.write(self.style.SUCCESS("Nenhuma colisão de numeração"))
+        finally:
+            if not options['manter']:
+                self._limpar(formulario)
+
+    def _submeter(self, formulario, indice):
+        inicio = time.perf_counter()
+        try:
+            formulario.processar_submissao({'descricao': f'Benchmark {indice}'}, ip_origem='127.0.0.1')
+            return time.perf_counter() - inicio, None
+        except Exception as e:
+            return time.perf_counter() - inicio, f"{type(e).__name__}: {e}"
+        finally:
+            close_old_connections()
+            connection.close()
+
+    def _criar_formulario(self):
+        sufixo = uuid.uuid4().hex[:6].upper()
+        prefixo = 'BENCH' + ''.join(c for c in sufixo if c.isalpha())[:5]
+        tipo = TipoProcesso.objects.create(
+            nome=f'Benchmark Numeração {sufixo}',
+            descricao='Tipo temporário criado pelo benchmark de numeração',
+            prefixo_numero=prefixo,
+        )
+        Fase.objects.create(
+            tipo_processo=tipo, nome='Entrada', ordem=1,
+            setor_responsavel='TODOS', fase_inicial=True
+        )
+        CampoFormulario.objects.create(
+            tipo_processo=tipo, nome_campo='descricao', label='Descrição', tipo_campo='text'
+        )
+        return FormularioExterno.objects.create(
+            tipo_processo=tipo, titulo='Benchmark', descricao='Benchmark'
+        )
+
+    def _limpar(self, formulario):
+        tipo = formulario.tipo_processo
+        InstanciaProcesso.objects.filter(tipo_processo=tipo).delete()
+        tipo.delete()
+
+    @staticmethod
+    def _p95(latencias):
+        ordenadas = sorted(latencias)
+        return ordenadas[int(0.95 * (len(ordenadas) - 1))]
+
+    def _resumo(self, latencias):
+        if not latencias:
+            return "sem submissões bem-sucedidas"
+        return (
+            f"p50={statistics.median(latencias) * 1000:.1f}ms "
+            f"p95={self._p95(latencias) * 1000:.1f}ms "
+            f"max={max(latencias) * 1000:.1f}ms"
+        )
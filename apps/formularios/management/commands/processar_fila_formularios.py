@@ -0,0 +1,62 @@
+"""
+Worker da fila de entrada dos formulários externos
+Também remove as submissões concluídas há mais de --retencao-dias
+Execute: python manage.py processar_fila_formularios --continuo
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.formularios.models import SubmissaoPendente
+
+
+class Command(BaseCommand):
+    help = 'Cria os processos das submissões pendentes de formulário externo, em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100, help='Submissões por transação')
+        parser.add_argument('--max-tentativas', type=int, default=5,
+                            help='Tentativas antes de mover para a fila de falhas')
+        parser.add_argument('--continuo', action='store_true', help='Continua aguardando novas submissões')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera quando a fila está vazia (modo contínuo)')
+        parser.add_argument('--retencao-dias', type=int, default=settings.FORMULARIO_FILA_RETENCAO_DIAS,
+                            help='Dias até remover as submissões concluídas (0 remove todas; -1 não remove)')
+
+    def handle(self, *args, **options):
+        ultima_limpeza = None
+        while True:
+            processadas = self._drenar(options['lote'], options['max_tentativas'])
+            # No modo contínuo, a limpeza roda no máximo uma vez por hora
+            if options['retencao_dias'] >= 0 and (
+                ultima_limpeza is None or time.monotonic() - ultima_limpeza >= 3600
+            ):
+                self._limpar(options['retencao_dias'])
+                ultima_limpeza = time.monotonic()
+            if not options['continuo']:
+                break
+            if not processadas:
+                time.sleep(options['intervalo'])
+
+    def _limpar(self, dias):
+        removidas = SubmissaoPendente.purgar_concluidas(dias)
+        if removidas:
+            self.stdout.write(f"{removidas} submissão(ões) concluída(s) removida(s) da fila")
+
+    def _drenar(self, tamanho_lote, max_tentativas):
+        """Processa lotes até esvaziar a fila. Retorna o total de submissões tratadas"""
+        total = 0
+        while True:
+            with transaction.atomic():
+                lote = SubmissaoPendente.obter_lote(tamanho_lote)
+                criados = sum(1 for submissao in lote if submissao.processar(max_tentativas))
+
+            if not lote:
+                return total
+
+            total += len(lote)
+            falhas = len(lote) - criados
+            mensagem = f"Lote: {criados} processo(s) criado(s), {falhas} falha(s)"
+            self.stdout.write(self.style.WARNING(mensagem) if falhas else mensagem)
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.28 on 2026-10-17 22:32
+
+import apps.formularios.models
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0001_initial'),
+        ('formularios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissaoFalha',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('protocolo', models.CharField(max_length=40, unique=True, verbose_name='Protocolo Provisório')),
+                ('dados', models.JSONField(default=dict, verbose_name='Dados Submetidos')),
+                ('ip_origem', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP de Origem')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('recebido_em', models.DateTimeField(verbose_name='Recebido em')),
+                ('falhou_em', models.DateTimeField(auto_now_add=True, verbose_name='Falhou em')),
+                ('formulario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissoes_falhas', to='formularios.formularioexterno', verbose_name='Formulário')),
+            ],
+            options={
+                'verbose_name': 'Submissão com Falha',
+                'verbose_name_plural': 'Submissões com Falha',
+                'ordering': ['-falhou_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SubmissaoPendente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('protocolo', models.CharField(default=apps.formularios.models.gerar_protocolo, editable=False, max_length=40, unique=True, verbose_name='Protocolo Provisório')),
+                ('dados', models.JSONField(default=dict, verbose_name='Dados Submetidos')),
+                ('ip_origem', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP de Origem')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('concluida', 'Concluída')], default='pendente', max_length=20, verbose_name='Status')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima Tentativa')),
+                ('ultimo_erro', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Recebido em')),
+                ('processado_em', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+                ('formulario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissoes_pendentes', to='formularios.formularioexterno', verbose_name='Formulário')),
+                ('instancia', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='processos.instanciaprocesso', verbose_name='Processo Criado')),
+            ],
+            options={
+                'verbose_name': 'Submissão Pendente',
+                'verbose_name_plural': 'Submissões Pendentes',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa'], name='formularios_status_6c3278_idx')],
+            },
+        ),
+    ]
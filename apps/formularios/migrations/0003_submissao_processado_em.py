@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-18 00:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formularios', '0002_filasubmissoes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submissaopendente',
+            index=models.Index(fields=['status', 'processado_em'], name='formularios_status_f9a5b6_idx'),
+        ),
+    ]
@@ -1,7 +1,13 @@
-from django.db import models
+from datetime import timedelta
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
 import uuid
 from apps.core.models import TipoProcesso
+from apps.core.esquema import obter_esquema
+from .pagina import invalidar_pagina
 
 
 class FormularioExterno(models.Model):
@@ -72,50 +78,237 @@ class FormularioExterno(models.Model):
             )
         return reverse('formularios:externo', kwargs={'token': self.token})
 
-    def processar_submissao(self, dados_formulario, ip_origem=None):
+    def processar_submissao(self, dados_formulario, ip_origem=None, protocolo=None):
         """
         Processa a submissão do formulário externo
         Cria uma InstanciaProcesso e registra no histórico
         """
-        from apps.processos.models import InstanciaProcesso
-        from apps.auditoria.models import HistoricoProcesso
-        from apps.core.models import Fase
+        from apps.workflow.services import WorkflowService
         
         # Obtém a fase inicial do processo
-        fase_inicial = Fase.objects.filter(
-            tipo_processo=self.tipo_processo,
-            fase_inicial=True
-        ).first()
+        fase_inicial = self.esquema.fase_inicial
         
         if not fase_inicial:
             raise ValueError(
                 f"Nenhuma fase inicial configurada para o processo {self.tipo_processo.nome}"
             )
         
-        # Cria a instância do processo
-        instancia = InstanciaProcesso.objects.create(
-            tipo_processo=self.tipo_processo,
-            fase_atual=fase_inicial,
-            dados=dados_formulario,
-            origem='formulario_externo',
-            criado_por=None  # Criado externamente
-        )
-        
-        # Registra no histórico
         observacoes = f"Processo criado via formulário externo"
         if ip_origem:
             observacoes += f" (IP: {ip_origem})"
+        if protocolo:
+            observacoes += f" - Protocolo {protocolo}"
         
-        HistoricoProcesso.registrar_criacao(
-            instancia_processo=instancia,
-            usuario=None,
+        # Cria a instância (o número vem da SequenciaProcesso) e o histórico
+        return WorkflowService.criar_processo(
+            tipo_processo=self.tipo_processo,
+            fase=fase_inicial,
+            dados=dados_formulario,
+            origem='formulario_externo',
+            usuario=None,  # Criado externamente
             observacoes=observacoes
         )
-        
-        return instancia
+
+    def enfileirar_submissao(self, dados_formulario, ip_origem=None):
+        """
+        Grava a submissão na fila de entrada para processamento assíncrono
+        Retorna a SubmissaoPendente com o protocolo provisório
+        """
+        return SubmissaoPendente.objects.create(
+            formulario=self,
+            dados=dados_formulario,
+            ip_origem=ip_origem,
+        )
+
+    @property
+    def esquema(self):
+        """Esquema compilado (campos e fases) do tipo de processo"""
+        return obter_esquema(self.tipo_processo_id)
 
     def get_campos_visiveis(self):
         """Retorna apenas os campos visíveis no formulário externo"""
-        return self.tipo_processo.campos.filter(
-            visivel_formulario_externo=True
-        ).order_by('grupo', 'ordem')
+        return self.esquema.campos_visiveis
+
+
+def gerar_protocolo():
+    """Protocolo provisório entregue ao cliente antes da criação do processo"""
+    return f"PRT-{timezone.now():%Y%m%d}-{uuid.uuid4().hex[:8].upper()}"
+
+
+class SubmissaoPendente(models.Model):
+    """
+    Fila de entrada (outbox) das submissões de formulário externo
+    A view apenas grava o payload; o comando processar_fila_formularios
+    cria os processos em lote, com novas tentativas em caso de erro
+    """
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('concluida', 'Concluída'),
+    ]
+
+    formulario = models.ForeignKey(
+        FormularioExterno,
+        on_delete=models.CASCADE,
+        related_name='submissoes_pendentes',
+        verbose_name="Formulário"
+    )
+    protocolo = models.CharField(
+        max_length=40,
+        unique=True,
+        default=gerar_protocolo,
+        editable=False,
+        verbose_name="Protocolo Provisório"
+    )
+    dados = models.JSONField(default=dict, verbose_name="Dados Submetidos")
+    ip_origem = models.GenericIPAddressField(null=True, blank=True, verbose_name="IP de Origem")
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pendente',
+        verbose_name="Status"
+    )
+    tentativas = models.PositiveIntegerField(default=0, verbose_name="Tentativas")
+    proxima_tentativa = models.DateTimeField(default=timezone.now, verbose_name="Próxima Tentativa")
+    ultimo_erro = models.TextField(blank=True, verbose_name="Último Erro")
+    instancia = models.ForeignKey(
+        'processos.InstanciaProcesso',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Processo Criado"
+    )
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Recebido em")
+    processado_em = models.DateTimeField(null=True, blank=True, verbose_name="Processado em")
+
+    class Meta:
+        verbose_name = "Submissão Pendente"
+        verbose_name_plural = "Submissões Pendentes"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa']),
+            models.Index(fields=['status', 'processado_em']),
+        ]
+
+    def __str__(self):
+        return f"{self.protocolo} - {self.get_status_display()}"
+
+    @classmethod
+    def purgar_concluidas(cls, dias, tamanho_lote=1000):
+        """
+        Remove as submissões concluídas há mais de `dias` dias, um lote por
+        transação (o processo criado guarda o protocolo). Retorna o total removido
+        """
+        limite = timezone.now() - timedelta(days=dias)
+        concluidas = cls.objects.filter(status='concluida', processado_em__lt=limite)
+        removidas = 0
+        while True:
+            with transaction.atomic():
+                ids = list(concluidas.order_by('id').values_list('id', flat=True)[:tamanho_lote])
+                if not ids:
+                    return removidas
+                removidas += cls.objects.filter(id__in=ids).delete()[0]
+
+    @classmethod
+    def obter_lote(cls, tamanho):
+        """
+        Seleciona as próximas submissões prontas para processamento
+        Deve ser chamado dentro de uma transação; no PostgreSQL as linhas
+        ficam bloqueadas e outros workers pulam para as seguintes
+        """
+        return list(
+            cls.objects.select_for_update(skip_locked=True)
+            .select_related('formulario__tipo_processo')
+            .filter(status='pendente', proxima_tentativa__lte=timezone.now())
+            .order_by('id')[:tamanho]
+        )
+
+    def processar(self, max_tentativas):
+        """
+        Cria o processo a partir da submissão
+        Em caso de erro agenda nova tentativa com backoff exponencial ou,
+        esgotadas as tentativas, move a submissão para SubmissaoFalha
+        Retorna True se o processo foi criado
+        """
+        try:
+            with transaction.atomic():
+                self.instancia = self.formulario.processar_submissao(
+                    dados_formulario=self.dados,
+                    ip_origem=self.ip_origem,
+                    protocolo=self.protocolo
+                )
+        except Exception as e:
+            self.tentativas += 1
+            self.ultimo_erro = f"{type(e).__name__}: {e}"
+            if self.tentativas >= max_tentativas:
+                SubmissaoFalha.registrar(self)
+                self.delete()
+            else:
+                self.proxima_tentativa = timezone.now() + timedelta(seconds=30 * 2 ** (self.tentativas - 1))
+                self.save(update_fields=['tentativas', 'ultimo_erro', 'proxima_tentativa'])
+            return False
+
+        self.status = 'concluida'
+        self.tentativas += 1
+        self.processado_em = timezone.now()
+        self.save(update_fields=['instancia', 'status', 'tentativas', 'processado_em'])
+        return True
+
+
+class SubmissaoFalha(models.Model):
+    """
+    Fila de mensagens mortas: submissões que esgotaram as tentativas
+    Podem ser reenviadas pelo admin após correção da configuração
+    """
+    formulario = models.ForeignKey(
+        FormularioExterno,
+        on_delete=models.CASCADE,
+        related_name='submissoes_falhas',
+        verbose_name="Formulário"
+    )
+    protocolo = models.CharField(max_length=40, unique=True, verbose_name="Protocolo Provisório")
+    dados = models.JSONField(default=dict, verbose_name="Dados Submetidos")
+    ip_origem = models.GenericIPAddressField(null=True, blank=True, verbose_name="IP de Origem")
+    tentativas = models.PositiveIntegerField(default=0, verbose_name="Tentativas")
+    erro = models.TextField(blank=True, verbose_name="Erro")
+    recebido_em = models.DateTimeField(verbose_name="Recebido em")
+    falhou_em = models.DateTimeField(auto_now_add=True, verbose_name="Falhou em")
+
+    class Meta:
+        verbose_name = "Submissão com Falha"
+        verbose_name_plural = "Submissões com Falha"
+        ordering = ['-falhou_em']
+
+    def __str__(self):
+        return f"{self.protocolo} - {self.erro[:50]}"
+
+    @classmethod
+    def registrar(cls, pendente):
+        """Copia a submissão pendente para a fila de falhas"""
+        return cls.objects.create(
+            formulario=pendente.formulario,
+            protocolo=pendente.protocolo,
+            dados=pendente.dados,
+            ip_origem=pendente.ip_origem,
+            tentativas=pendente.tentativas,
+            erro=pendente.ultimo_erro,
+            recebido_em=pendente.criado_em,
+        )
+
+    @transaction.atomic
+    def reenfileirar(self):
+        """Devolve a submissão para a fila de entrada, mantendo o protocolo"""
+        pendente = SubmissaoPendente.objects.create(
+            formulario=self.formulario,
+            protocolo=self.protocolo,
+            dados=self.dados,
+            ip_origem=self.ip_origem,
+        )
+        self.delete()
+        return pendente
+
+
+@receiver([post_save, post_delete], sender=FormularioExterno)
+def invalidar_pagina_formulario(sender, instance, **kwargs):
+    """Descarta a página renderizada quando o formulário muda"""
+    invalidar_pagina(instance.token)
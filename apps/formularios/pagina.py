@@ -0,0 +1,99 @@
+"""
+Página renderizada dos formulários externos
+O HTML de cada formulário é renderizado uma vez e guardado no cache do Django,
+validado por duas versões no banco (apps.core.versoes, as mesmas em todos os
+workers): a do próprio FormularioExterno (trocada pelo signal do modelo) e a
+do esquema do tipo de processo (trocada pelos signals de TipoProcesso, Fase e
+CampoFormulario). Só o token CSRF é inserido a cada requisição, no lugar de
+um marcador: com o cache e os carimbos aquecidos o GET não consulta o banco
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from apps.core import versoes
+from apps.core.esquema import CHAVE_VERSAO as CHAVE_VERSAO_ESQUEMA
+
+CHAVE_PAGINA = 'formulario:pagina:{}'
+CHAVE_VERSAO = 'formulario:versao:{}'
+# Renderizado pela tag {% csrf_token %} no lugar do token (apenas [a-z_])
+MARCADOR_CSRF = '__csrf_formulario_externo__'
+
+
+def obter_versao(token):
+    """Versão atual do formulário"""
+    return versoes.obter(CHAVE_VERSAO.format(token))
+
+
+def invalidar_pagina(token):
+    """Troca a versão do formulário após o commit da transação corrente"""
+    versoes.trocar(CHAVE_VERSAO.format(token))
+
+
+def _valida(pagina):
+    """Se as versões gravadas na página ainda são as atuais (uma leitura para as duas)"""
+    chaves = [CHAVE_VERSAO.format(pagina['token']), CHAVE_VERSAO_ESQUEMA.format(pagina['tipo'])]
+    atuais = versoes.obter_varias(chaves)
+    return pagina['versoes'] == tuple(atuais[chave] for chave in chaves)
+
+
+def renderizar(token):
+    """
+    Renderiza o formulário ativo do token com o marcador no lugar do token CSRF
+    Retorna None se o formulário não existe ou está inativo
+    """
+    from .models import FormularioExterno
+
+    # Versão lida antes da consulta: uma alteração durante a renderização
+    # troca a versão e descarta o resultado na próxima requisição
+    versao = obter_versao(token)
+    formulario = FormularioExterno.objects.select_related('tipo_processo').filter(
+        token=token, ativo=True
+    ).first()
+    if formulario is None:
+        return None
+
+    esquema = formulario.esquema
+    html = render_to_string('formularios/externo.html', {
+        'formulario': formulario,
+        'grupos': esquema.grupos_visiveis,
+        'csrf_token': MARCADOR_CSRF,
+    })
+    return {
+        'token': token,
+        'tipo': formulario.tipo_processo_id,
+        'versoes': (versao, esquema.versao),
+        'html': html,
+        'digest': hashlib.sha256(html.encode()).hexdigest()[:32],
+    }
+
+
+def obter_pagina(token):
+    """
+    Página do formulário: {'html', 'digest', ...} ou None se não há formulário
+    ativo com o token. Com o cache e os carimbos aquecidos, nenhuma consulta é feita
+    """
+    chave = CHAVE_PAGINA.format(token)
+    pagina = cache.get(chave)
+    if pagina is not None and _valida(pagina):
+        return pagina
+
+    pagina = renderizar(token)
+    if pagina is not None:
+        cache.set(chave, pagina, settings.FORMULARIO_CACHE_SEGUNDOS)
+    return pagina
+
+
+def etag(pagina, segredo_csrf):
+    """
+    ETag forte da resposta: conteúdo renderizado e segredo CSRF do visitante
+    O corpo só varia pela máscara do token, que vale para o mesmo segredo
+    """
+    chave = f"{pagina['digest']}:{segredo_csrf}".encode()
+    return f'"{hashlib.sha256(chave).hexdigest()[:32]}"'
+
+
+def html_com_csrf(pagina, token_csrf):
+    return pagina['html'].replace(MARCADOR_CSRF, token_csrf)
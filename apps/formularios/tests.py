@@ -1,3 +1,85 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.core.models import TipoProcesso, Fase, CampoFormulario
+from apps.formularios.models import FormularioExterno, SubmissaoPendente, SubmissaoFalha
+from apps.processos.models import InstanciaProcesso
+
+CACHE_ISOLADO = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=CACHE_ISOLADO)
+class FilaSubmissoesTest(TestCase):
+    """Fila de entrada: novas tentativas, fila de falhas, reenvio e limpeza"""
+
+    def setUp(self):
+        # Troca o carimbo do esquema, como no commit real
+        with self.captureOnCommitCallbacks(execute=True):
+            tipo = TipoProcesso.objects.create(nome='Fila', descricao='Fila', prefixo_numero='FILA')
+            Fase.objects.create(tipo_processo=tipo, nome='Entrada', ordem=1, fase_inicial=True)
+            CampoFormulario.objects.create(tipo_processo=tipo, nome_campo='nome', label='Nome', tipo_campo='text')
+        self.formulario = FormularioExterno.objects.create(tipo_processo=tipo, titulo='Fila')
+        self.submissao = SubmissaoPendente.objects.create(formulario=self.formulario, dados={'nome': 'Teste'})
+
+    def falhar(self):
+        return mock.patch.object(FormularioExterno, 'processar_submissao', side_effect=RuntimeError('indisponível'))
+
+    def test_novas_tentativas_com_intervalo_crescente(self):
+        agora = timezone.now()
+        with self.falhar(), mock.patch('django.utils.timezone.now', return_value=agora):
+            for tentativa, segundos in enumerate([30, 60, 120], start=1):
+                self.assertFalse(self.submissao.processar(max_tentativas=5))
+                self.submissao.refresh_from_db()
+                self.assertEqual(self.submissao.tentativas, tentativa)
+                self.assertEqual(self.submissao.proxima_tentativa, agora + timedelta(seconds=segundos))
+                self.assertEqual(self.submissao.ultimo_erro, 'RuntimeError: indisponível')
+                self.assertEqual(self.submissao.status, 'pendente')
+
+        # Fora do intervalo, a submissão não entra no lote
+        self.assertEqual(SubmissaoPendente.obter_lote(10), [])
+
+    def test_vai_para_falhas_e_reenfileira_com_o_mesmo_protocolo(self):
+        protocolo = self.submissao.protocolo
+        with self.falhar():
+            for _ in range(3):
+                self.submissao.processar(max_tentativas=3)
+
+        self.assertFalse(SubmissaoPendente.objects.exists())
+        falha = SubmissaoFalha.objects.get()
+        self.assertEqual((falha.protocolo, falha.tentativas, falha.dados), (protocolo, 3, {'nome': 'Teste'}))
+
+        pendente = falha.reenfileirar()
+        self.assertEqual(pendente.protocolo, protocolo)
+        self.assertEqual(pendente.tentativas, 0)
+        self.assertFalse(SubmissaoFalha.objects.exists())
+
+        self.assertTrue(pendente.processar(max_tentativas=3))
+        pendente.refresh_from_db()
+        self.assertEqual(pendente.status, 'concluida')
+        self.assertEqual(InstanciaProcesso.objects.get().pk, pendente.instancia_id)
+
+    def test_comando_processa_e_remove_concluidas_antigas(self):
+        call_command('processar_fila_formularios', stdout=io.StringIO())
+        self.submissao.refresh_from_db()
+        self.assertEqual(self.submissao.status, 'concluida')
+
+        antiga = SubmissaoPendente.objects.create(
+            formulario=self.formulario, status='concluida',
+            processado_em=timezone.now() - timedelta(days=10),
+        )
+        pendente = SubmissaoPendente.objects.create(
+            formulario=self.formulario, proxima_tentativa=timezone.now() + timedelta(hours=1),
+        )
+        call_command('processar_fila_formularios', retencao_dias=7, stdout=io.StringIO())
+        self.assertEqual(
+            set(SubmissaoPendente.objects.values_list('id', flat=True)), {self.submissao.id, pendente.id}
+        )
+        self.assertFalse(SubmissaoPendente.objects.filter(id=antiga.id).exists())
+
+        self.assertEqual(SubmissaoPendente.purgar_concluidas(0), 1)
+        self.assertEqual(list(SubmissaoPendente.objects.values_list('id', flat=True)), [pendente.id])
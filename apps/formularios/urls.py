@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, views_assincronas
 
 app_name = 'formularios'
 
+# Com o servidor ASGI (uvicorn), a variante assíncrona só ocupa uma thread nas chamadas ao ORM
+modulo = views_assincronas if settings.VIEWS_ASSINCRONAS else views
+
 urlpatterns = [
-    path('<str:token>/', views.formulario_externo, name='externo'),
+    path('<str:token>/', modulo.formulario_externo, name='externo'),
 ]
@@ -1,93 +1,125 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
+from django.http import Http404, HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from apps.core.desempenho import orcamento_consultas
 from .models import FormularioExterno
-from apps.core.models import CampoFormulario
+from .pagina import obter_pagina, etag as etag_pagina, html_com_csrf
 
 
+@orcamento_consultas(16)
 def formulario_externo(request, token):
     """
     View pública para formulário externo
     Não requer autenticação
     """
-    formulario = get_object_or_404(FormularioExterno, token=token, ativo=True)
-    
-    if request.method == 'POST':
-        # Processa a submissão
-        dados_formulario = {}
-        erros = []
-        
-        # Obtém os campos visíveis
-        campos = formulario.get_campos_visiveis()
-        
-        # Valida e coleta os dados
-        for campo in campos:
-            valor = request.POST.get(campo.nome_campo, '').strip()
-            
-            # Valida campos obrigatórios
-            if campo.obrigatorio and not valor:
-                erros.append(f'O campo "{campo.label}" é obrigatório.')
-                continue
-            
-            # Valida regex se configurado
-            if campo.validacao_regex and valor:
-                import re
-                if not re.match(campo.validacao_regex, valor):
-                    erros.append(f'O campo "{campo.label}" está em formato inválido.')
-                    continue
-            
-            dados_formulario[campo.nome_campo] = valor
-        
-        if erros:
-            context = {
-                'formulario': formulario,
-                'campos': campos,
-                'erros': erros,
-                'dados': dados_formulario,
-            }
-            return render(request, 'formularios/externo.html', context)
-        
-        # Processa a submissão
-        try:
-            # Obtém IP do cliente
-            ip_origem = request.META.get('REMOTE_ADDR')
-            
-            # Cria o processo
-            instancia = formulario.processar_submissao(
-                dados_formulario=dados_formulario,
-                ip_origem=ip_origem
-            )
-            
-            # Redireciona para página de sucesso
-            return render(request, 'formularios/sucesso.html', {
-                'formulario': formulario,
-                'numero_processo': instancia.numero,
-            })
-            
-        except Exception as e:
-            erros.append(f'Erro ao processar formulário: {str(e)}')
-            context = {
-                'formulario': formulario,
-                'campos': campos,
-                'erros': erros,
-                'dados': dados_formulario,
-            }
-            return render(request, 'formularios/externo.html', context)
+    if request.method != 'POST':
+        return exibir_formulario(request, token)
+
+    formulario = get_object_or_404(
+        FormularioExterno.objects.select_related('tipo_processo'),
+        token=token,
+        ativo=True
+    )
     
-    # GET - exibe o formulário
+    # Obtém os campos visíveis
     campos = formulario.get_campos_visiveis()
     
-    # Agrupa campos por grupo
-    grupos = {}
-    for campo in campos:
-        grupo_nome = campo.grupo or 'Informações Gerais'
-        if grupo_nome not in grupos:
-            grupos[grupo_nome] = []
-        grupos[grupo_nome].append(campo)
+    # Valida e coleta os dados
+    dados_formulario, erros = coletar_dados(campos, request.POST)
+    
+    if erros:
+        context = {
+            'formulario': formulario,
+            'campos': campos,
+            'erros': erros,
+            'dados': dados_formulario,
+        }
+        return render(request, 'formularios/externo.html', context)
+    
+    # Obtém IP do cliente
+    ip_origem = request.META.get('REMOTE_ADDR')
     
-    context = {
-        'formulario': formulario,
-        'grupos': grupos,
-    }
+    # Modo fila: grava na fila de entrada e responde com protocolo provisório
+    if settings.FORMULARIO_FILA_ASSINCRONA:
+        submissao = formulario.enfileirar_submissao(
+            dados_formulario=dados_formulario,
+            ip_origem=ip_origem
+        )
+        return render(request, 'formularios/sucesso.html', {
+            'formulario': formulario,
+            'numero_processo': submissao.protocolo,
+            'protocolo_provisorio': True,
+        })
     
-    return render(request, 'formularios/externo.html', context)
+    # Processa a submissão
+    try:
+        # Cria o processo
+        instancia = formulario.processar_submissao(
+            dados_formulario=dados_formulario,
+            ip_origem=ip_origem
+        )
+        
+        # Redireciona para página de sucesso
+        return render(request, 'formularios/sucesso.html', {
+            'formulario': formulario,
+            'numero_processo': instancia.numero,
+        })
+        
+    except Exception as e:
+        erros.append(f'Erro ao processar formulário: {str(e)}')
+        context = {
+            'formulario': formulario,
+            'campos': campos,
+            'erros': erros,
+            'dados': dados_formulario,
+        }
+        return render(request, 'formularios/externo.html', context)
+
+
+def coletar_dados(campos, post):
+    """Valores dos campos visíveis e os erros de validação: (dados, erros)"""
+    dados = {}
+    erros = []
+    for campo in campos:
+        valor = post.get(campo.nome_campo, '').strip()
+        
+        # Valida obrigatoriedade e regex configurada
+        erro = campo.validar_valor(valor)
+        if erro:
+            erros.append(erro)
+            continue
+        
+        dados[campo.nome_campo] = valor
+    return dados, erros
+
+
+def exibir_formulario(request, token):
+    """
+    GET do formulário externo a partir da página em cache
+    Não acessa sessão nem usuário: o cache aquecido responde sem consultas.
+    Visitantes que já têm a página respondem 304 pelo ETag
+    """
+    pagina = obter_pagina(token)
+    if pagina is None:
+        raise Http404("Formulário não encontrado")
+    return responder_pagina(request, pagina)
+
+
+def responder_pagina(request, pagina):
+    """Resposta (ou 304) com a página em cache e o token CSRF do visitante"""
+    # O segredo CSRF vem do cookie (criado agora na primeira visita)
+    token_csrf = get_token(request)
+    etag = etag_pagina(pagina, request.META['CSRF_COOKIE'])
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(html_com_csrf(pagina, token_csrf))
+    response['ETag'] = etag
+    # Corpo com token CSRF: só o navegador guarda, sempre revalidando
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
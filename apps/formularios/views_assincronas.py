@@ -0,0 +1,85 @@
+"""
+Formulário externo assíncrono (servidor ASGI, VIEWS_ASSINCRONAS=True)
+Mesmo comportamento de views.formulario_externo: a submissão busca o
+formulário pelo ORM assíncrono e a criação do processo (WorkflowService, em
+transaction.atomic) e as renderizações rodam numa thread, pela fronteira
+sync_to_async
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
+from django.shortcuts import render
+
+from apps.core.desempenho import orcamento_consultas
+from .models import FormularioExterno
+from .pagina import obter_pagina
+from .views import coletar_dados, responder_pagina
+
+
+@orcamento_consultas(16)
+async def formulario_externo(request, token):
+    """View pública do formulário externo (não requer autenticação)"""
+    if request.method != 'POST':
+        return await exibir_formulario(request, token)
+
+    try:
+        formulario = await FormularioExterno.objects.select_related('tipo_processo').aget(
+            token=token, ativo=True
+        )
+    except FormularioExterno.DoesNotExist:
+        raise Http404("Formulário não encontrado")
+
+    # Esquema compilado: cache ou ORM síncrono
+    campos = await sync_to_async(formulario.get_campos_visiveis)()
+    dados_formulario, erros = coletar_dados(campos, request.POST)
+
+    if erros:
+        return await sync_to_async(render)(request, 'formularios/externo.html', {
+            'formulario': formulario,
+            'campos': campos,
+            'erros': erros,
+            'dados': dados_formulario,
+        })
+
+    ip_origem = request.META.get('REMOTE_ADDR')
+
+    # Modo fila: grava na fila de entrada e responde com protocolo provisório
+    if settings.FORMULARIO_FILA_ASSINCRONA:
+        submissao = await sync_to_async(formulario.enfileirar_submissao)(
+            dados_formulario=dados_formulario,
+            ip_origem=ip_origem
+        )
+        return await sync_to_async(render)(request, 'formularios/sucesso.html', {
+            'formulario': formulario,
+            'numero_processo': submissao.protocolo,
+            'protocolo_provisorio': True,
+        })
+
+    try:
+        instancia = await sync_to_async(formulario.processar_submissao)(
+            dados_formulario=dados_formulario,
+            ip_origem=ip_origem
+        )
+        return await sync_to_async(render)(request, 'formularios/sucesso.html', {
+            'formulario': formulario,
+            'numero_processo': instancia.numero,
+        })
+    except Exception as e:
+        erros.append(f'Erro ao processar formulário: {str(e)}')
+        return await sync_to_async(render)(request, 'formularios/externo.html', {
+            'formulario': formulario,
+            'campos': campos,
+            'erros': erros,
+            'dados': dados_formulario,
+        })
+
+
+async def exibir_formulario(request, token):
+    """
+    GET a partir da página em cache, numa única passagem pela thread (a API
+    assíncrona do cache no Django 4.2 também roda cada leitura numa thread)
+    """
+    pagina = await sync_to_async(obter_pagina)(token)
+    if pagina is None:
+        raise Http404("Formulário não encontrado")
+    return responder_pagina(request, pagina)
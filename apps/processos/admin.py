@@ -1,13 +1,43 @@
-from django.contrib import admin
-from .models import InstanciaProcesso
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.urls import reverse
+from django.utils.html import format_html
+from apps.core.models import Fase
+from apps.core.paginacao import PaginadorContagemAproximada
+from apps.auditoria.arquivamento import total_arquivado
+from apps.workflow.services import WorkflowService
+from .models import InstanciaProcesso, EstadiaFase
+from .busca import filtrar_busca
+
+
+class TransicaoLoteActionForm(ActionForm):
+    """Formulário de ações com a fase de destino da mudança em lote"""
+    nova_fase = forms.ModelChoiceField(
+        queryset=Fase.objects.select_related('tipo_processo'),
+        required=False,
+        label='Nova fase'
+    )
 
 
 @admin.register(InstanciaProcesso)
 class InstanciaProcessoAdmin(admin.ModelAdmin):
     list_display = ['numero', 'tipo_processo', 'fase_atual', 'responsavel_atual', 'origem', 'criado_em']
     list_filter = ['tipo_processo', 'fase_atual', 'origem', 'criado_em']
-    search_fields = ['numero', 'dados']
-    readonly_fields = ['numero', 'criado_em', 'atualizado_em', 'criado_por']
+    search_fields = ['numero']
+    # Tipo, fase e dados só mudam pelo WorkflowService (ação "Mover processos" ou
+    # telas do sistema), que mantém busca, valores tipados, contagens e estadias
+    readonly_fields = [
+        'numero', 'tipo_processo', 'fase_atual', 'dados',
+        'criado_em', 'atualizado_em', 'criado_por', 'historico_arquivado',
+    ]
+    action_form = TransicaoLoteActionForm
+    actions = ['mudar_fase_lote']
+    list_select_related = ['tipo_processo', 'fase_atual', 'responsavel_atual']
+    ordering = ['-criado_em', '-id']
+    # Total estimado pelo banco e sem o COUNT(*) extra da tabela inteira
+    paginator = PaginadorContagemAproximada
+    show_full_result_count = False
     
     fieldsets = (
         ('Informações do Processo', {
@@ -21,11 +51,68 @@ class InstanciaProcessoAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Metadados', {
-            'fields': ('criado_em', 'atualizado_em'),
+            'fields': ('criado_em', 'atualizado_em', 'historico_arquivado'),
             'classes': ('collapse',)
         }),
     )
     
+    @admin.display(description='Histórico arquivado')
+    def historico_arquivado(self, obj):
+        total = total_arquivado(obj) if obj.pk else 0
+        if not total:
+            return '-'
+        url = reverse('admin:auditoria_historicoprocesso_arquivado', args=[obj.pk])
+        return format_html('<a href="{}">{} evento(s) arquivado(s)</a>', url, total)
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Usa o índice de busca textual em vez de varrer o JSON dos dados"""
+        if not search_term:
+            return queryset, False
+        return filtrar_busca(queryset, search_term), False
+    
+    def has_add_permission(self, request):
+        """Processos são criados pelo sistema (formulários, importação, telas internas)"""
+        return False
+    
     def has_delete_permission(self, request, obj=None):
         """Impede exclusão de processos pelo admin"""
         return request.user.is_superuser
+
+    @admin.action(description='Mover processos selecionados para a fase')
+    def mudar_fase_lote(self, request, queryset):
+        nova_fase = Fase.objects.filter(id=request.POST.get('nova_fase') or None).first()
+        if not nova_fase:
+            self.message_user(request, 'Selecione a nova fase.', messages.ERROR)
+            return
+        
+        resultados = WorkflowService.transicionar_em_lote(
+            instancias=queryset,
+            nova_fase=nova_fase,
+            usuario=request.user,
+            observacoes='Mudança de fase em lote pelo admin'
+        )
+        
+        movidos = sum(1 for _, sucesso, _ in resultados if sucesso)
+        if movidos:
+            self.message_user(request, f'{movidos} processo(s) movido(s).', messages.SUCCESS)
+        for instancia, sucesso, mensagem in resultados:
+            if not sucesso:
+                self.message_user(request, f'{instancia.numero}: {mensagem}', messages.WARNING)
+
+
+@admin.register(EstadiaFase)
+class EstadiaFaseAdmin(admin.ModelAdmin):
+    list_display = ['instancia_processo', 'fase', 'entrada_em', 'saida_em', 'duracao', 'usuario_entrada']
+    list_filter = ['fase__tipo_processo', 'fase']
+    search_fields = ['instancia_processo__numero']
+    list_select_related = ['instancia_processo', 'fase', 'usuario_entrada']
+    raw_id_fields = ['instancia_processo']
+    readonly_fields = ['instancia_processo', 'fase', 'entrada_em', 'saida_em', 'duracao',
+                       'usuario_entrada', 'usuario_saida']
+    
+    def has_add_permission(self, request):
+        """Estadias são gravadas pelas mudanças de fase"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
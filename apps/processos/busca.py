@@ -0,0 +1,91 @@
+"""
+Busca textual de processos
+Cada processo tem um DocumentoBusca com o número e os campos marcados como
+pesquisáveis, mantido na mesma transação da criação e da edição de dados.
+- PostgreSQL: índice GIN sobre to_tsvector('simple', texto)
+- SQLite: tabela virtual FTS5 sincronizada por triggers
+- Outros bancos: icontains sobre o documento
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from apps.core.esquema import obter_esquema
+from apps.processos.models import DocumentoBusca
+
+TABELA_FTS = 'processos_documentobusca_fts'
+CONFIGURACAO_TS = 'simple'
+
+SQL_POSTGRES = (
+    "SELECT instancia_id FROM processos_documentobusca "
+    "WHERE to_tsvector('simple', texto) @@ to_tsquery('simple', %s)"
+)
+SQL_SQLITE = f"SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s"
+
+_fts_disponivel = None
+
+
+def montar_texto(instancia):
+    """Texto pesquisável: número do processo e campos pesquisáveis"""
+    esquema = obter_esquema(instancia.tipo_processo_id)
+    partes = [instancia.numero]
+    for campo in esquema.campos:
+        if campo.pesquisavel:
+            valor = instancia.dados.get(campo.nome_campo)
+            if valor not in (None, ''):
+                partes.append(str(valor))
+    return '\n'.join(partes)
+
+
+def atualizar_documento(instancia):
+    """Atualiza o documento de busca do processo (criando-o se não existir)"""
+    atualizados = DocumentoBusca.objects.filter(instancia=instancia).update(
+        texto=montar_texto(instancia),
+        atualizado_em=timezone.now()
+    )
+    if not atualizados:
+        atualizar_documentos([instancia])
+
+
+def atualizar_documentos(instancias, batch_size=500):
+    """Cria ou atualiza os documentos de busca de vários processos (upsert em lote)"""
+    DocumentoBusca.objects.bulk_create(
+        [DocumentoBusca(instancia=instancia, texto=montar_texto(instancia)) for instancia in instancias],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['instancia'],
+        update_fields=['texto', 'atualizado_em'],
+    )
+
+
+def _termos(busca):
+    return re.findall(r'\w+', busca.lower())
+
+
+def filtrar_busca(queryset, busca):
+    """Filtra um queryset de InstanciaProcesso pelo texto de busca"""
+    termos = _termos(busca)
+    if not termos:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        consulta = ' & '.join(f"{termo}:*" for termo in termos)
+        return queryset.filter(id__in=RawSQL(SQL_POSTGRES, [consulta]))
+
+    if connection.vendor == 'sqlite' and fts_disponivel():
+        consulta = ' '.join(f'"{termo}"*' for termo in termos)
+        return queryset.filter(id__in=RawSQL(SQL_SQLITE, [consulta]))
+
+    for termo in termos:
+        queryset = queryset.filter(documento_busca__texto__icontains=termo)
+    return queryset
+
+
+def fts_disponivel():
+    """Verifica (uma vez por processo) se a tabela FTS5 existe no SQLite"""
+    global _fts_disponivel
+    if _fts_disponivel is None:
+        _fts_disponivel = TABELA_FTS in connection.introspection.table_names()
+    return _fts_disponivel
@@ -0,0 +1,427 @@
+"""
+Geração de carga sintética
+Cria tipos de processo, processos e histórico em volume de produção usando
+bulk_create, opcionalmente em vários processos do sistema operacional
+Usado pelos comandos gerar_carga, benchmark_caminhos e benchmark_estado
+"""
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.utils import timezone
+
+from apps.auditoria.models import HistoricoProcesso, SnapshotProcesso
+from apps.core.esquema import obter_esquema
+from apps.core.models import TipoProcesso, Fase, CampoFormulario
+from apps.formularios.models import FormularioExterno
+from apps.usuarios.models import PerfilUsuario
+from .busca import atualizar_documentos
+from .condicional import registrar_alteracao
+from .tipados import atualizar_valores
+from .models import InstanciaProcesso, ContagemFase, EstadiaFase
+
+SETORES = ['COMERCIAL', 'FINANCEIRO', 'OPERACOES', 'PD', 'ADMIN']
+
+# (tipo_campo, opções) usados ciclicamente na criação dos campos
+TIPOS_CAMPO = [
+    ('text', None), ('email', None), ('tel', None), ('number', None),
+    ('select', ['Cielo', 'Rede', 'Stone', 'Getnet', 'PagSeguro']),
+    ('date', None), ('textarea', None), ('radio', ['Sim', 'Não']),
+]
+
+PALAVRAS = (
+    'pagamento terminal cadastro credenciamento loja matriz filial contrato '
+    'taxa adquirente banco conta chave pix cliente suporte integração teste '
+    'homologação documento fiscal endereço contato comercial financeiro'
+).split()
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Heitor', 'Isabela', 'João']
+
+# Distribuição dos eventos após a criação
+EVENTOS = [('mudanca_fase', 40), ('comentario', 30), ('edicao_dados', 15), ('atribuicao', 15)]
+
+
+@contextmanager
+def datas_explicitas(*modelos):
+    """
+    Desliga auto_now/auto_now_add dos modelos, para gravar datas históricas
+    Altera os campos do modelo para todo o processo: use apenas em comandos
+    """
+    campos = [
+        campo for modelo in modelos for campo in modelo._meta.concrete_fields
+        if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False)
+    ]
+    originais = [(campo, campo.auto_now, campo.auto_now_add) for campo in campos]
+    for campo in campos:
+        campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in originais:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+def sufixo(indice):
+    """Sufixo só de letras (1 -> A, 26 -> Z, 27 -> AA): prefixo_numero aceita apenas [A-Z]"""
+    letras = ''
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(ord('A') + resto) + letras
+    return letras
+
+
+def indice_do_sufixo(letras):
+    """Inverso de sufixo (0 se não for só de letras maiúsculas)"""
+    if not letras.isalpha() or not letras.isupper() or not letras.isascii():
+        return 0
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - ord('A') + 1
+    return indice
+
+
+def criar_estrutura(tipos, fases, campos, prefixo='CARGA', usuarios=10):
+    """Cria tipos de processo com fases, campos, formulário externo e usuários"""
+    criados = []
+    # Continua após o maior sufixo existente (contar colidiria após uma exclusão)
+    existentes = TipoProcesso.objects.filter(prefixo_numero__startswith=prefixo).values_list(
+        'prefixo_numero', flat=True
+    )
+    inicio = max((indice_do_sufixo(p[len(prefixo):]) for p in existentes), default=0)
+    for indice in range(inicio + 1, inicio + tipos + 1):
+        tipo = TipoProcesso.objects.create(
+            nome=f'Carga {prefixo} {sufixo(indice)}',
+            descricao='Tipo de processo gerado pelo comando gerar_carga',
+            prefixo_numero=f'{prefixo}{sufixo(indice)}',
+        )
+        Fase.objects.bulk_create([
+            Fase(
+                tipo_processo=tipo,
+                nome=f'Fase {ordem}',
+                ordem=ordem,
+                setor_responsavel=SETORES[(ordem - 1) % len(SETORES)],
+                fase_inicial=ordem == 1,
+                fase_final=ordem == fases,
+            )
+            for ordem in range(1, fases + 1)
+        ])
+        CampoFormulario.objects.bulk_create([
+            CampoFormulario(
+                tipo_processo=tipo,
+                nome_campo=f'campo_{ordem}',
+                label=f'Campo {ordem}',
+                tipo_campo=TIPOS_CAMPO[(ordem - 1) % len(TIPOS_CAMPO)][0],
+                opcoes=TIPOS_CAMPO[(ordem - 1) % len(TIPOS_CAMPO)][1],
+                grupo=f'Grupo {(ordem - 1) // 4 + 1}',
+                ordem=ordem,
+                obrigatorio=ordem == 1,
+                visivel_formulario_externo=True,
+            )
+            for ordem in range(1, campos + 1)
+        ])
+        FormularioExterno.objects.create(
+            tipo_processo=tipo,
+            titulo=f'Solicitação {tipo.nome}',
+            descricao='Formulário gerado pelo comando gerar_carga',
+        )
+        criados.append(tipo)
+
+    existentes = set(User.objects.filter(username__startswith='carga_').values_list('username', flat=True))
+    for indice in range(1, usuarios + 1):
+        username = f'carga_{indice}'
+        if username in existentes:
+            continue
+        usuario = User.objects.create_user(
+            username=username,
+            password=None,
+            first_name=NOMES[(indice - 1) % len(NOMES)],
+            last_name='Carga',
+        )
+        PerfilUsuario.objects.create(user=usuario, setor=SETORES[(indice - 1) % len(SETORES)])
+
+    return criados
+
+
+def planejar(tipos, total, dias, tamanho_lote):
+    """
+    Divide a geração em lotes independentes
+    Cada lote é de um único tipo e ano, com a numeração já reservada,
+    para que possa ser gravado em paralelo sem disputa pelo contador
+    """
+    fim = timezone.now()
+    inicio = fim - timedelta(days=dias)
+
+    # Fatias da janela por ano, com o peso proporcional à duração
+    fatias = []
+    cursor = inicio
+    while cursor < fim:
+        proximo_ano = cursor.replace(
+            year=cursor.year + 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        limite = min(proximo_ano, fim)
+        fatias.append((cursor.year, cursor, limite))
+        cursor = limite
+    duracao = (fim - inicio).total_seconds()
+
+    lotes = []
+    por_tipo, resto = divmod(total, len(tipos))
+    for posicao, tipo in enumerate(tipos):
+        quantidade_tipo = por_tipo + (1 if posicao < resto else 0)
+        distribuidos = 0
+        for indice, (ano, de, ate) in enumerate(fatias):
+            if indice == len(fatias) - 1:
+                quantidade = quantidade_tipo - distribuidos
+            else:
+                quantidade = round(quantidade_tipo * (ate - de).total_seconds() / duracao)
+            distribuidos += quantidade
+            if quantidade <= 0:
+                continue
+            numeros = tipo.reservar_sequencias(quantidade, ano=ano)
+            for deslocamento in range(0, quantidade, tamanho_lote):
+                bloco = numeros[deslocamento:deslocamento + tamanho_lote]
+                lotes.append({
+                    'indice': len(lotes),
+                    'tipo_processo_id': tipo.id,
+                    'ano': ano,
+                    'inicio': de.timestamp(),
+                    'fim': ate.timestamp(),
+                    'numeros': (bloco.start, bloco.stop),
+                })
+    return lotes
+
+
+def _valor(rng, tipo_campo, opcoes, indice):
+    if tipo_campo == 'email':
+        return f'{rng.choice(NOMES).lower()}{indice}@exemplo.com.br'
+    if tipo_campo == 'tel':
+        return f'(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}'
+    if tipo_campo == 'number':
+        return str(rng.randint(1, 999999))
+    if tipo_campo == 'date':
+        return (datetime(2020, 1, 1) + timedelta(days=rng.randint(0, 2500))).date().isoformat()
+    if tipo_campo in ('select', 'radio') and opcoes:
+        opcao = rng.choice(opcoes)
+        return opcao['value'] if isinstance(opcao, dict) else opcao
+    if tipo_campo == 'textarea':
+        return ' '.join(rng.choices(PALAVRAS, k=rng.randint(8, 30)))
+    return ' '.join(rng.choices(PALAVRAS, k=rng.randint(1, 4))).title()
+
+
+def gerar_dados(rng, esquema, indice):
+    """Dados de formulário plausíveis para os campos do tipo"""
+    return {
+        campo.nome_campo: _valor(rng, campo.tipo_campo, campo.opcoes, indice)
+        for campo in esquema.campos
+        if campo.tipo_campo != 'file'
+    }
+
+
+def gravar_lote(lote, eventos_por_processo, usuarios_ids, semente=0, exatos=False):
+    """
+    Gera e grava um lote: processos, histórico, snapshots, estadias, documentos de busca
+    e valores tipados
+    Com exatos=True são sorteados eventos_por_processo eventos por processo (sem variação)
+    Retorna (processos, eventos, {fase_id: quantidade}) para o ajuste das contagens
+    """
+    rng = random.Random(semente * 1_000_003 + lote['indice'])
+    esquema = obter_esquema(lote['tipo_processo_id'])
+    tipo = TipoProcesso.objects.get(id=lote['tipo_processo_id'])
+    fases = esquema.fases
+    usuarios_ids = usuarios_ids or [None]
+    nomes = dict(User.objects.filter(id__in=[u for u in usuarios_ids if u]).values_list('id', 'username'))
+    intervalo = settings.HISTORICO_SNAPSHOT_INTERVALO
+    # Nenhum evento no futuro: estadias, espera atual e estado num instante dependem disso
+    agora = timezone.now()
+
+    instancias = []
+    eventos_por_instancia = []
+    # (índice do evento, dados, fase, responsável) dos snapshots de cada processo
+    snapshots_por_instancia = []
+    # [fase, entrada, usuário de entrada, saída, usuário de saída] de cada passagem
+    estadias_por_instancia = []
+    for sequencia in range(*lote['numeros']):
+        criado_em = datetime.fromtimestamp(
+            rng.uniform(lote['inicio'], lote['fim']), tz=timezone.get_current_timezone()
+        )
+        criado_por = rng.choice(usuarios_ids)
+        dados = gerar_dados(rng, esquema, sequencia)
+        posicao = 0
+        momento = criado_em
+        responsavel = None
+        eventos = [HistoricoProcesso(
+            tipo_evento='criacao', fase_nova=fases[0], usuario_id=criado_por,
+            observacoes='Processo criado', dados_alterados={'origem': 'criacao_interna'},
+            criado_em=criado_em,
+        )]
+        snapshots = [(0, dict(dados), fases[0], None)]
+        estadias = [[fases[0], criado_em, criado_por, None, None]]
+        desde_snapshot = 0
+
+        if exatos:
+            total_eventos = eventos_por_processo
+            # Intervalos menores que (agora - criação) / eventos: todos cabem até agora
+            media = (agora - criado_em) / (total_eventos + 1)
+        else:
+            total_eventos = rng.randint(0, 2 * eventos_por_processo) if eventos_por_processo else 0
+        for _ in range(total_eventos):
+            if exatos:
+                proximo = momento + media * rng.uniform(0.5, 1)
+            else:
+                proximo = momento + timedelta(hours=rng.expovariate(1 / 18))
+            if proximo > agora:
+                break
+            momento = proximo
+            usuario_id = rng.choice(usuarios_ids)
+            tipo_evento = rng.choices([e for e, _ in EVENTOS], weights=[p for _, p in EVENTOS])[0]
+            if tipo_evento == 'mudanca_fase':
+                if fases[posicao].fase_final or len(fases) == 1:
+                    continue
+                passo = -1 if posicao > 0 and rng.random() < 0.15 else 1
+                anterior, posicao = fases[posicao], posicao + passo
+                eventos.append(HistoricoProcesso(
+                    tipo_evento='mudanca_fase', fase_anterior=anterior, fase_nova=fases[posicao],
+                    usuario_id=usuario_id, observacoes=f'Movido para {fases[posicao].nome}',
+                    dados_alterados={'fase_anterior_nome': anterior.nome, 'fase_nova_nome': fases[posicao].nome},
+                    criado_em=momento,
+                ))
+                snapshots.append((len(eventos) - 1, dict(dados), fases[posicao], responsavel))
+                desde_snapshot = 0
+                estadias[-1][3:] = [momento, usuario_id]
+                estadias.append([fases[posicao], momento, usuario_id, None, None])
+                continue
+            elif tipo_evento == 'comentario':
+                eventos.append(HistoricoProcesso(
+                    tipo_evento='comentario', usuario_id=usuario_id,
+                    observacoes=' '.join(rng.choices(PALAVRAS, k=rng.randint(4, 16))).capitalize(),
+                    criado_em=momento,
+                ))
+                continue
+            elif tipo_evento == 'edicao_dados' and esquema.campos:
+                campo = rng.choice(esquema.campos)
+                novo = _valor(rng, campo.tipo_campo, campo.opcoes, sequencia)
+                eventos.append(HistoricoProcesso(
+                    tipo_evento='edicao_dados', usuario_id=usuario_id,
+                    observacoes='Dados editados',
+                    dados_alterados={campo.nome_campo: {'anterior': dados.get(campo.nome_campo), 'novo': novo}},
+                    criado_em=momento,
+                ))
+                dados[campo.nome_campo] = novo
+            elif tipo_evento == 'atribuicao':
+                anterior, responsavel = responsavel, rng.choice(usuarios_ids)
+                eventos.append(HistoricoProcesso(
+                    tipo_evento='atribuicao', usuario_id=usuario_id,
+                    observacoes='Responsável atribuído',
+                    dados_alterados={
+                        'responsavel_anterior': nomes.get(anterior),
+                        'responsavel_novo': nomes.get(responsavel),
+                    },
+                    criado_em=momento,
+                ))
+            else:
+                continue
+
+            # Edições e atribuições: snapshot a cada HISTORICO_SNAPSHOT_INTERVALO
+            desde_snapshot += 1
+            if desde_snapshot >= intervalo:
+                snapshots.append((len(eventos) - 1, dict(dados), fases[posicao], responsavel))
+                desde_snapshot = 0
+
+        instancias.append(InstanciaProcesso(
+            tipo_processo=tipo,
+            numero=InstanciaProcesso.formatar_numero(tipo, lote['ano'], sequencia),
+            fase_atual=fases[posicao],
+            dados=dados,
+            responsavel_atual_id=responsavel,
+            criado_por_id=criado_por,
+            origem=rng.choice(['criacao_interna', 'formulario_externo']),
+            criado_em=criado_em,
+            atualizado_em=momento,
+        ))
+        eventos_por_instancia.append(eventos)
+        snapshots_por_instancia.append(snapshots)
+        estadias_por_instancia.append(estadias)
+
+    with transaction.atomic(), datas_explicitas(InstanciaProcesso, HistoricoProcesso):
+        InstanciaProcesso.objects.bulk_create(instancias, batch_size=1000)
+        historico = []
+        for instancia, eventos in zip(instancias, eventos_por_instancia):
+            for evento in eventos:
+                evento.instancia_processo = instancia
+            historico.extend(eventos)
+        HistoricoProcesso.objects.bulk_create(historico, batch_size=2000)
+        SnapshotProcesso.objects.bulk_create([
+            SnapshotProcesso(
+                instancia_processo=instancia,
+                evento_id=eventos[indice].id,
+                evento_em=eventos[indice].criado_em,
+                dados=dados,
+                fase=fase,
+                responsavel_id=responsavel,
+            )
+            for instancia, eventos, snapshots in zip(instancias, eventos_por_instancia, snapshots_por_instancia)
+            for indice, dados, fase, responsavel in snapshots
+        ], batch_size=2000)
+        EstadiaFase.objects.bulk_create([
+            EstadiaFase(
+                instancia_processo=instancia, fase=fase, entrada_em=entrada, usuario_entrada_id=usuario_entrada,
+                saida_em=saida, usuario_saida_id=usuario_saida, duracao=saida - entrada if saida else None,
+            )
+            for instancia, estadias in zip(instancias, estadias_por_instancia)
+            for fase, entrada, usuario_entrada, saida, usuario_saida in estadias
+        ], batch_size=2000)
+        atualizar_documentos(instancias, batch_size=1000)
+        atualizar_valores(instancias, batch_size=2000, novos=True)
+
+    por_fase = {}
+    for instancia in instancias:
+        por_fase[instancia.fase_atual_id] = por_fase.get(instancia.fase_atual_id, 0) + 1
+    return len(instancias), len(historico), por_fase
+
+
+def _gravar_lote_worker(argumentos):
+    """Ponto de entrada dos processos do pool (cada um abre sua conexão)"""
+    try:
+        return gravar_lote(*argumentos)
+    finally:
+        connections.close_all()
+
+
+def gerar(lotes, eventos_por_processo, workers=1, semente=0, progresso=None):
+    """
+    Grava os lotes planejados e ajusta as contagens por fase
+    Com workers > 1 usa multiprocessing (fork): recomendado apenas no PostgreSQL
+    """
+    usuarios_ids = list(User.objects.filter(username__startswith='carga_').values_list('id', flat=True))
+    argumentos = [(lote, eventos_por_processo, usuarios_ids, semente) for lote in lotes]
+
+    total_processos = total_eventos = 0
+    por_fase = {}
+
+    def acumular(resultado):
+        nonlocal total_processos, total_eventos
+        processos, eventos, fases = resultado
+        total_processos += processos
+        total_eventos += eventos
+        for fase_id, quantidade in fases.items():
+            por_fase[fase_id] = por_fase.get(fase_id, 0) + quantidade
+        if progresso:
+            progresso(total_processos, total_eventos)
+
+    if workers > 1:
+        import multiprocessing
+
+        # As conexões não podem ser compartilhadas entre processos
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            for resultado in pool.imap_unordered(_gravar_lote_worker, argumentos):
+                acumular(resultado)
+    else:
+        for argumento in argumentos:
+            acumular(gravar_lote(*argumento))
+
+    ContagemFase.ajustar(por_fase)
+    registrar_alteracao(*(lote['tipo_processo_id'] for lote in lotes))
+    return total_processos, total_eventos
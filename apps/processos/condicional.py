@@ -0,0 +1,83 @@
+"""
+GET condicional da listagem e da tela do processo
+A listagem é validada por uma marca de alterações por tipo de processo (e uma
+de todos os tipos), um carimbo no banco (apps.core.versoes) trocado após o
+commit de cada criação, mudança de fase, atribuição, edição ou exclusão, em
+qualquer worker, na fila ou nos comandos de carga. A marca é lida do banco a
+cada GET (uma consulta), nunca de uma cópia local. A tela do processo é
+validada por InstanciaProcesso.atualizado_em e pelo evento mais recente do
+histórico. Os dois validadores incluem o usuário e suas permissões, para que
+um usuário nunca receba 304 para a página renderizada para outro
+"""
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from apps.core import versoes
+from apps.core.esquema import CHAVE_VERSAO as CHAVE_VERSAO_ESQUEMA, obter_versao as versao_esquema
+from apps.usuarios.permissoes import fases_autorizadas, versao_permissoes
+
+CHAVE_MARCA = 'processos:marca:{}'
+TODOS = 'todos'
+
+
+def registrar_alteracao(*tipos_processo_ids):
+    """Troca as marcas dos tipos e a de todos os tipos após o commit"""
+    versoes.trocar(*(CHAVE_MARCA.format(tipo_id) for tipo_id in tipos_processo_ids), CHAVE_MARCA.format(TODOS))
+
+
+def _partes_usuario(request):
+    """Usuário, permissões e segredo CSRF (os formulários da página levam o token)"""
+    usuario = request.user
+    return (
+        usuario.pk, usuario.username, usuario.get_full_name(), usuario.is_staff, usuario.is_superuser,
+        versao_permissoes(), ','.join(map(str, sorted(fases_autorizadas(usuario)))),
+        request.META.get('CSRF_COOKIE', ''),
+    )
+
+
+def _etag(*partes):
+    texto = '|'.join('' if parte is None else str(parte) for parte in partes)
+    return f'"{hashlib.sha256(texto.encode()).hexdigest()[:32]}"'
+
+
+def etag_lista(request, tipo_processo_id):
+    """ETag da listagem: uma consulta (marca e versão do esquema, do banco)"""
+    chaves = [CHAVE_MARCA.format(tipo_processo_id or TODOS)]
+    if tipo_processo_id:
+        # Rótulos dos filtros por campo
+        chaves.append(CHAVE_VERSAO_ESQUEMA.format(tipo_processo_id))
+    atuais = versoes.obter_varias(chaves, segundos=0)
+    return _etag(*(atuais[chave] for chave in chaves), *_partes_usuario(request))
+
+
+def etag_processo(request, processo):
+    """
+    ETag da tela do processo
+    processo deve vir anotado com ultimo_evento e total_eventos (o total muda
+    quando eventos antigos são arquivados)
+    """
+    return _etag(
+        processo.atualizado_em.isoformat(), processo.ultimo_evento, processo.total_eventos,
+        versao_esquema(processo.tipo_processo_id), *_partes_usuario(request),
+    )
+
+
+def nao_modificado(request, etag):
+    """
+    Resposta 304 se o cliente já tem a versão do ETag, senão None
+    Com mensagens pendentes a página é sempre renderizada (para exibi-las)
+    """
+    if len(get_messages(request)):
+        return None
+    response = get_conditional_response(request, etag=etag)
+    return com_validador(response, etag) if response is not None else None
+
+
+def com_validador(response, etag):
+    """Aplica o ETag; o navegador guarda a página mas sempre revalida"""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
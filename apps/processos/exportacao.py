@@ -0,0 +1,189 @@
+"""
+Exportação da listagem de processos em CSV e XLSX
+As linhas são lidas com iterator() e escritas em blocos num gerador, para
+uso com StreamingHttpResponse: a memória usada não depende do número de
+processos exportados. Os dados dinâmicos viram uma coluna por
+CampoFormulario, na ordem do esquema
+"""
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.esquema import obter_esquema
+from apps.core.models import CampoFormulario
+
+COLUNAS_FIXAS = ['Número', 'Tipo de Processo', 'Fase Atual', 'Responsável', 'Criado em', 'Atualizado em']
+CAMPOS_FIXOS = (
+    'numero', 'tipo_processo__nome', 'fase_atual__nome', 'responsavel_atual__username',
+    'criado_em', 'atualizado_em', 'dados',
+)
+
+# Limite de linhas de uma planilha do Excel (incluindo o cabeçalho)
+LINHAS_XLSX = 1048576
+
+# Caracteres que o CSV aberto numa planilha interpretaria como fórmula
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+_NUMERO = re.compile(r'[+-]?\d+([.,]\d+)?')
+# Caracteres de controle não permitidos em XML
+_CONTROLE_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def campos_exportados(tipo_processo_id=None):
+    """
+    CampoFormulario de cada coluna dinâmica
+    Com um tipo, os campos do seu esquema; sem tipo, os de todos os tipos
+    (por nome do tipo), sem repetir nomes de campo
+    """
+    if tipo_processo_id:
+        return list(obter_esquema(tipo_processo_id).campos)
+
+    campos = {}
+    for campo in CampoFormulario.objects.order_by('tipo_processo__nome', 'tipo_processo_id', 'ordem', 'id'):
+        campos.setdefault(campo.nome_campo, campo)
+    return list(campos.values())
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, (list, tuple)):
+        return ', '.join(str(item) for item in valor)
+    return str(valor)
+
+
+def _data(valor):
+    return timezone.localtime(valor).strftime('%d/%m/%Y %H:%M') if valor else ''
+
+
+def linhas(processos, campos):
+    """Cabeçalho e uma lista de textos por processo, lidos em blocos"""
+    yield COLUNAS_FIXAS + [campo.label for campo in campos]
+
+    nomes = [campo.nome_campo for campo in campos]
+    registros = processos.order_by('-criado_em', '-id').values_list(*CAMPOS_FIXOS)
+    for numero, tipo, fase, responsavel, criado_em, atualizado_em, dados in registros.iterator(
+        chunk_size=settings.PROCESSOS_EXPORTACAO_BLOCO
+    ):
+        dados = dados or {}
+        yield [
+            numero, tipo, fase, responsavel or '', _data(criado_em), _data(atualizado_em),
+        ] + [_texto(dados.get(nome)) for nome in nomes]
+
+
+def _celula_csv(valor):
+    if valor.startswith(_INICIO_FORMULA) and not _NUMERO.fullmatch(valor):
+        return "'" + valor
+    return valor
+
+
+def gerar_csv(processos, campos, linhas_por_bloco=500):
+    """Gerador de blocos de texto CSV (separador ';', com BOM para o Excel)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';')
+    yield '\ufeff'
+    for indice, linha in enumerate(linhas(processos, campos), start=1):
+        escritor.writerow([_celula_csv(valor) for valor in linha])
+        if indice % linhas_por_bloco == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _SaidaZip:
+    """Arquivo só de escrita para o ZipFile; os bytes são retirados a cada bloco"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        dados = b''.join(self.partes)
+        self.partes = []
+        return dados
+
+
+XLSX_ESTATICOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Processos" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _linha_xlsx(linha):
+    celulas = ''.join(
+        f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_CONTROLE_XML.sub("", valor))}</t></is></c>'
+        for valor in linha
+    )
+    return f'<row>{celulas}</row>'
+
+
+def gerar_xlsx(processos, campos, linhas_por_bloco=500):
+    """
+    Gerador de blocos de bytes de uma planilha XLSX (texto inline, sem estilos)
+    O ZIP é escrito em sequência (descritores de dados após cada arquivo), sem
+    voltar ao início; processos além do limite de linhas do Excel são omitidos
+    """
+    saida = _SaidaZip()
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as pacote:
+        for nome, conteudo in XLSX_ESTATICOS.items():
+            pacote.writestr(nome, conteudo)
+        yield saida.retirar()
+
+        with pacote.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            bloco = []
+            for indice, linha in enumerate(linhas(processos, campos), start=1):
+                if indice > LINHAS_XLSX:
+                    break
+                bloco.append(_linha_xlsx(linha))
+                if len(bloco) == linhas_por_bloco:
+                    planilha.write(''.join(bloco).encode('utf-8'))
+                    bloco = []
+                    yield saida.retirar()
+            planilha.write(''.join(bloco).encode('utf-8'))
+            planilha.write(b'</sheetData></worksheet>')
+    yield saida.retirar()
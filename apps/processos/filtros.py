@@ -0,0 +1,57 @@
+"""
+Filtros da listagem de processos
+Compartilhados pela lista e pela exportação, para que o arquivo exportado
+tenha exatamente os processos que a lista mostra
+Campos indexados do tipo filtrado chegam como dado_<nome_campo>; intervalos
+de campos numéricos e de data como de_<nome_campo> e ate_<nome_campo>
+"""
+from .busca import filtrar_busca
+from .indices import filtrar_dados
+from .tipados import filtrar_intervalos
+
+PARAMETROS = ('tipo', 'fase', 'setor', 'responsavel', 'busca')
+PREFIXO_DADO = 'dado_'
+PREFIXOS_INTERVALO = ('de_', 'ate_')
+
+
+def filtros_da_requisicao(request):
+    """Valores dos filtros na querystring (None quando ausentes)"""
+    filtros = {nome: request.GET.get(nome) for nome in PARAMETROS}
+    filtros['dados'] = {
+        chave[len(PREFIXO_DADO):]: valor
+        for chave, valor in request.GET.items()
+        if chave.startswith(PREFIXO_DADO) and valor
+    }
+    intervalos = {}
+    for chave, valor in request.GET.items():
+        for posicao, prefixo in enumerate(PREFIXOS_INTERVALO):
+            if chave.startswith(prefixo) and valor:
+                intervalos.setdefault(chave[len(prefixo):], ['', ''])[posicao] = valor
+    filtros['intervalos'] = intervalos
+    return filtros
+
+
+def filtrar_processos(processos, filtros):
+    """Aplica os filtros ao queryset de InstanciaProcesso"""
+    if filtros['tipo']:
+        processos = processos.filter(tipo_processo_id=filtros['tipo'])
+
+    if filtros['fase']:
+        processos = processos.filter(fase_atual_id=filtros['fase'])
+
+    if filtros['setor']:
+        processos = processos.filter(fase_atual__setor_responsavel=filtros['setor'])
+
+    if filtros['responsavel']:
+        processos = processos.filter(responsavel_atual_id=filtros['responsavel'])
+
+    if filtros['busca']:
+        processos = filtrar_busca(processos, filtros['busca'])
+
+    if filtros['tipo'] and filtros['dados']:
+        processos = filtrar_dados(processos, filtros['tipo'], filtros['dados'])
+
+    if filtros['tipo'] and filtros['intervalos']:
+        processos = filtrar_intervalos(processos, filtros['tipo'], filtros['intervalos'])
+
+    return processos
@@ -0,0 +1,122 @@
+"""
+Índices de expressão sobre InstanciaProcesso.dados
+Cada CampoFormulario marcado como indexado ganha um índice parcial, só com
+as linhas do seu tipo de processo:
+- PostgreSQL: ((dados ->> 'campo')) WHERE tipo_processo_id = N, criado e
+  removido com CONCURRENTLY (sem bloquear escritas)
+- SQLite: (json_extract(dados, '$."campo"')) WHERE tipo_processo_id = N
+Os índices são criados e removidos pelo comando sincronizar_indices_dados,
+nunca no salvamento do campo. O filtro usa exatamente a mesma expressão do
+índice, para que o planejador possa usá-lo
+"""
+import hashlib
+
+from django.db import connection
+from django.db.models import TextField
+from django.db.models.expressions import RawSQL
+
+from apps.core.esquema import obter_esquema
+from .models import InstanciaProcesso
+
+PREFIXO_INDICE = 'dados_idx_'
+TABELA = InstanciaProcesso._meta.db_table
+VENDORS_SUPORTADOS = ('postgresql', 'sqlite')
+
+
+class IndicesNaoSuportados(Exception):
+    """Banco sem suporte a índices de expressão parciais"""
+
+
+def suportado():
+    return connection.vendor in VENDORS_SUPORTADOS
+
+
+def expressao(nome_campo, qualificada=False):
+    """Expressão do valor do campo em dados (nome_campo já validado: [a-z][a-z0-9_]*)"""
+    coluna = f'{connection.ops.quote_name(TABELA)}.{connection.ops.quote_name("dados")}' if qualificada else 'dados'
+    if connection.vendor == 'postgresql':
+        return f"({coluna} ->> '{nome_campo}')"
+    return f"json_extract({coluna}, '$.\"{nome_campo}\"')"
+
+
+def nome_indice(campo):
+    """Nome do índice do campo; muda se o campo trocar de nome ou de tipo"""
+    chave = hashlib.md5(f'{campo.tipo_processo_id}:{campo.nome_campo}'.encode()).hexdigest()[:8]
+    return f'{PREFIXO_INDICE}{campo.id}_{chave}'
+
+
+def sql_criar(campo):
+    concorrente = ' CONCURRENTLY' if connection.vendor == 'postgresql' else ''
+    return (
+        f'CREATE INDEX{concorrente} IF NOT EXISTS {connection.ops.quote_name(nome_indice(campo))} '
+        f'ON {connection.ops.quote_name(TABELA)} ({expressao(campo.nome_campo)}) '
+        f'WHERE tipo_processo_id = {int(campo.tipo_processo_id)}'
+    )
+
+
+def sql_remover(nome):
+    concorrente = ' CONCURRENTLY' if connection.vendor == 'postgresql' else ''
+    return f'DROP INDEX{concorrente} IF EXISTS {connection.ops.quote_name(nome)}'
+
+
+def indices_existentes():
+    """{nome do índice: válido} dos índices de dados já criados"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Um CREATE INDEX CONCURRENTLY interrompido deixa o índice inválido
+            cursor.execute(
+                "SELECT indice.relname, i.indisvalid FROM pg_index i "
+                "JOIN pg_class indice ON indice.oid = i.indexrelid "
+                "JOIN pg_class tabela ON tabela.oid = i.indrelid "
+                "WHERE tabela.relname = %s AND indice.relname LIKE %s",
+                [TABELA, PREFIXO_INDICE + '%'],
+            )
+            return dict(cursor.fetchall())
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name LIKE %s",
+            [TABELA, PREFIXO_INDICE + '%'],
+        )
+        return {nome: True for nome, in cursor.fetchall()}
+
+
+def pendencias():
+    """
+    (campos cujo índice falta criar, nomes de índices a remover)
+    Índices inválidos entram nas duas listas: são removidos e recriados
+    """
+    from apps.core.models import CampoFormulario
+
+    if not suportado():
+        raise IndicesNaoSuportados(f"Índices de dados não suportados no banco {connection.vendor}")
+
+    existentes = indices_existentes()
+    desejados = {nome_indice(campo): campo for campo in CampoFormulario.objects.filter(indexado=True)}
+    criar = [campo for nome, campo in desejados.items() if not existentes.get(nome)]
+    remover = [nome for nome, valido in existentes.items() if nome not in desejados or not valido]
+    return criar, remover
+
+
+def campos_indexados(tipo_processo_id):
+    """Campos indexados do tipo, na ordem do esquema (filtros da listagem)"""
+    return [campo for campo in obter_esquema(tipo_processo_id).campos if campo.indexado]
+
+
+def filtrar_dados(processos, tipo_processo_id, valores):
+    """
+    Filtra por igualdade nos campos indexados do tipo
+    valores: {nome_campo: valor}; campos não indexados são ignorados, para
+    que um parâmetro da URL não provoque uma varredura da tabela
+    """
+    esquema = obter_esquema(tipo_processo_id)
+    for nome_campo, valor in valores.items():
+        campo = esquema.campos_por_nome.get(nome_campo)
+        if campo is None or not campo.indexado:
+            continue
+        if not suportado():
+            processos = processos.filter(tipo_processo_id=tipo_processo_id, **{f'dados__{nome_campo}': valor})
+            continue
+        apelido = f'dado_{nome_campo}'
+        processos = processos.alias(**{apelido: RawSQL(expressao(nome_campo, qualificada=True), [], output_field=TextField())}).filter(
+            tipo_processo_id=tipo_processo_id, **{apelido: valor}
+        )
+    return processos
@@ -0,0 +1,226 @@
+"""
+Benchmark dos caminhos mais usados do workflow
+Mede listagem, detalhes, formulário externo (GET/POST), mudança de fase e
+edição de dados em vários volumes de dados e grava os resultados em JSON,
+para comparação entre commits
+Execute: python manage.py benchmark_caminhos --tamanhos 1000,10000,100000 --saida resultado.json
+         python manage.py benchmark_caminhos --tamanhos 10000 --comparar anterior.json
+"""
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.desempenho import MedidorConsultas
+from apps.core.esquema import obter_esquema
+from apps.core.models import TipoProcesso
+from apps.core.utilitarios_teste import banco_de_teste
+from apps.formularios.models import FormularioExterno
+from apps.processos.carga import criar_estrutura, planejar, gerar, gerar_dados
+from apps.processos.models import InstanciaProcesso
+from apps.usuarios.models import PerfilUsuario
+
+PREFIXO = 'BENCH'
+
+CACHE_ISOLADO = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class Command(BaseCommand):
+    help = 'Mede os caminhos críticos do workflow em vários volumes de dados e grava JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', default='1000,10000', help='Volumes de processos, separados por vírgula')
+        parser.add_argument('--repeticoes', type=int, default=20, help='Execuções medidas por caminho')
+        parser.add_argument('--eventos', type=int, default=10, help='Média de eventos de histórico por processo')
+        parser.add_argument('--workers', type=int, default=1, help='Processos paralelos na geração (PostgreSQL)')
+        parser.add_argument('--saida', help='Arquivo JSON de resultados')
+        parser.add_argument('--comparar', help='JSON de uma execução anterior para comparação')
+        parser.add_argument('--banco-atual', action='store_true',
+                            help='Usa o banco configurado (e os tipos BENCH existentes) em vez de um banco de teste')
+
+    def handle(self, *args, **options):
+        try:
+            tamanhos = sorted(int(t) for t in options['tamanhos'].split(','))
+        except ValueError:
+            raise CommandError("--tamanhos deve ser uma lista de inteiros separados por vírgula")
+
+        with banco_de_teste(not options['banco_atual']):
+            with override_settings(CACHES=CACHE_ISOLADO, DESEMPENHO_MONITORAR=False):
+                resultados = self._executar(tamanhos, options)
+
+        relatorio = {
+            'gerado_em': timezone.now().isoformat(),
+            'commit': self._commit(),
+            'banco': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'parametros': {
+                'tamanhos': tamanhos,
+                'repeticoes': options['repeticoes'],
+                'eventos': options['eventos'],
+            },
+            'resultados': resultados,
+        }
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['saida']}"))
+        if options['comparar']:
+            self._comparar(resultados, options['comparar'])
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _preparar(self):
+        """Tipo BENCH (o primeiro existente ou um novo) e usuário autorizado em todas as fases"""
+        tipo = TipoProcesso.objects.filter(prefixo_numero__startswith=PREFIXO).order_by('id').first()
+        if tipo is None:
+            tipo = criar_estrutura(1, 6, 12, prefixo=PREFIXO)[0]
+
+        usuario, criado = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True})
+        if criado:
+            PerfilUsuario.objects.create(user=usuario, setor='COMERCIAL')
+        for fase in tipo.fases.all():
+            fase.usuarios_autorizados.add(usuario)
+        return tipo, usuario
+
+    def _executar(self, tamanhos, options):
+        tipo, usuario = self._preparar()
+        formulario = FormularioExterno.objects.filter(tipo_processo=tipo).first()
+        cliente = Client()
+        cliente.force_login(usuario)
+
+        resultados = []
+        for tamanho in tamanhos:
+            atual = InstanciaProcesso.objects.filter(tipo_processo=tipo).count()
+            if atual < tamanho:
+                self.stdout.write(f"Gerando {tamanho - atual} processos...")
+                lotes = planejar([tipo], tamanho - atual, 730, 2000)
+                gerar(lotes, options['eventos'], workers=options['workers'], semente=tamanho)
+            elif atual > tamanho and not options['banco_atual']:
+                self.stdout.write(self.style.WARNING(f"Já existem {atual} processos (> {tamanho})"))
+            tamanho_real = InstanciaProcesso.objects.filter(tipo_processo=tipo).count()
+
+            self.stdout.write(f"\nTamanho: {tamanho_real} processos")
+            for caminho, requisicao in self._caminhos(tipo, formulario):
+                medicao = self._medir(cliente, requisicao, options['repeticoes'])
+                medicao.update({'tamanho': tamanho_real, 'caminho': caminho})
+                resultados.append(medicao)
+                self.stdout.write(
+                    f"  {caminho:18} p50 {medicao['p50_ms']:8.2f} ms | p95 {medicao['p95_ms']:8.2f} ms | "
+                    f"{medicao['consultas']:.1f} consultas"
+                )
+        return resultados
+
+    def _caminhos(self, tipo, formulario):
+        """(nome, função que devolve (método, url, dados)) de cada caminho medido"""
+        rng = random.Random(0)
+        esquema = obter_esquema(tipo.id)
+        fases = list(esquema.fases)
+        ids = list(InstanciaProcesso.objects.filter(tipo_processo=tipo).values_list('id', flat=True))
+        nao_finais = list(InstanciaProcesso.objects.filter(
+            tipo_processo=tipo, fase_atual__fase_final=False
+        ).values_list('id', 'fase_atual_id'))
+        posicao_fase = {fase.id: indice for indice, fase in enumerate(fases)}
+
+        def lista():
+            return 'get', reverse('processos:lista'), None
+
+        def lista_busca():
+            return 'get', reverse('processos:lista'), {'busca': rng.choice(['cielo', 'terminal', 'pix'])}
+
+        def detalhe():
+            return 'get', reverse('processos:detalhes', args=[rng.choice(ids)]), None
+
+        def formulario_get():
+            return 'get', reverse('formularios:externo', args=[formulario.token]), None
+
+        def formulario_post():
+            return 'post', reverse('formularios:externo', args=[formulario.token]), gerar_dados(rng, esquema, 0)
+
+        def transicao():
+            processo_id, fase_id = nao_finais.pop(rng.randrange(len(nao_finais)))
+            proxima = fases[posicao_fase[fase_id] + 1]
+            return 'post', reverse('processos:mudar_fase', args=[processo_id]), {'nova_fase': proxima.id}
+
+        def edicao():
+            processo_id = rng.choice(ids)
+            return 'post', reverse('processos:editar_dados', args=[processo_id]), gerar_dados(rng, esquema, processo_id)
+
+        return [
+            ('lista', lista),
+            ('lista_busca', lista_busca),
+            ('detalhe', detalhe),
+            ('formulario_get', formulario_get),
+            ('formulario_post', formulario_post),
+            ('transicao', transicao),
+            ('edicao', edicao),
+        ]
+
+    def _medir(self, cliente, requisicao, repeticoes):
+        # Uma execução de aquecimento (caches de esquema e permissões)
+        metodo, url, dados = requisicao()
+        getattr(cliente, metodo)(url, dados or {})
+
+        tempos = []
+        consultas = []
+        for _ in range(repeticoes):
+            metodo, url, dados = requisicao()
+            medidor = MedidorConsultas()
+            inicio = time.perf_counter()
+            with connection.execute_wrapper(medidor):
+                response = getattr(cliente, metodo)(url, dados or {})
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(medidor.total)
+            if response.status_code >= 400:
+                raise CommandError(f"{metodo.upper()} {url} respondeu {response.status_code}")
+
+        tempos.sort()
+        return {
+            'repeticoes': repeticoes,
+            'media_ms': round(statistics.mean(tempos), 2),
+            'p50_ms': round(statistics.median(tempos), 2),
+            'p95_ms': round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 2),
+            'max_ms': round(tempos[-1], 2),
+            'consultas': round(statistics.mean(consultas), 1),
+        }
+
+    def _comparar(self, resultados, caminho_arquivo):
+        try:
+            with open(caminho_arquivo, encoding='utf-8') as arquivo:
+                anterior = json.load(arquivo)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Não foi possível ler {caminho_arquivo}: {e}")
+
+        referencia = {(r['tamanho'], r['caminho']): r for r in anterior.get('resultados', [])}
+        self.stdout.write(f"\nComparação com {anterior.get('commit') or caminho_arquivo}:")
+        for resultado in resultados:
+            base = referencia.get((resultado['tamanho'], resultado['caminho']))
+            if base is None or not base['p50_ms']:
+                continue
+            variacao = (resultado['p50_ms'] - base['p50_ms']) / base['p50_ms'] * 100
+            linha = (
+                f"  {resultado['tamanho']:>9} {resultado['caminho']:18} "
+                f"p50 {base['p50_ms']:8.2f} -> {resultado['p50_ms']:8.2f} ms ({variacao:+.0f}%) | "
+                f"consultas {base['consultas']} -> {resultado['consultas']}"
+            )
+            if variacao > 20 or resultado['consultas'] > base['consultas']:
+                self.stdout.write(self.style.WARNING(linha))
+            else:
+                self.stdout.write(linha)
@@ -0,0 +1,121 @@
+"""
+Benchmark da exportação da listagem (CSV/XLSX em streaming)
+Consome a resposta da view em blocos, como um cliente HTTP, e acompanha a
+memória residente (RSS) do processo durante a exportação: o crescimento deve
+ficar constante qualquer que seja o número de processos exportados
+Execute: python manage.py benchmark_exportacao --tamanhos 10000,100000,1000000
+"""
+import os
+import resource
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from apps.core.models import TipoProcesso
+from apps.core.utilitarios_teste import banco_de_teste
+from apps.processos.carga import criar_estrutura, planejar, gerar
+from apps.processos.models import InstanciaProcesso
+
+PREFIXO = 'EXPORT'
+
+CACHE_ISOLADO = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def rss_atual():
+    """Memória residente atual em MB (pico do processo onde /proc não existe)"""
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Mede tempo e memória residente da exportação de processos em vários volumes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', default='10000,100000', help='Volumes de processos, separados por vírgula')
+        parser.add_argument('--formatos', default='csv,xlsx', help='Formatos exportados')
+        parser.add_argument('--workers', type=int, default=1, help='Processos paralelos na geração (PostgreSQL)')
+        parser.add_argument('--limite-mb', type=float, default=50,
+                            help='Crescimento máximo de RSS aceito durante uma exportação')
+        parser.add_argument('--banco-atual', action='store_true',
+                            help='Usa o banco configurado (e o tipo EXPORT existente) em vez de um banco de teste')
+
+    def handle(self, *args, **options):
+        try:
+            tamanhos = sorted(int(t) for t in options['tamanhos'].split(','))
+        except ValueError:
+            raise CommandError("--tamanhos deve ser uma lista de inteiros separados por vírgula")
+        formatos = [f.strip() for f in options['formatos'].split(',') if f.strip()]
+
+        with banco_de_teste(not options['banco_atual']):
+            with override_settings(CACHES=CACHE_ISOLADO, DESEMPENHO_MONITORAR=False, DEBUG=False):
+                resultados = self._executar(tamanhos, formatos, options)
+
+        excedidos = [r for r in resultados if r['crescimento_mb'] > options['limite_mb']]
+        if excedidos:
+            raise CommandError(
+                f"RSS cresceu mais de {options['limite_mb']} MB em: "
+                + ', '.join(f"{r['formato']} {r['linhas']}" for r in excedidos)
+            )
+        self.stdout.write(self.style.SUCCESS("Memória constante em todas as exportações"))
+
+    def _executar(self, tamanhos, formatos, options):
+        tipo = TipoProcesso.objects.filter(prefixo_numero__startswith=PREFIXO).order_by('id').first()
+        if tipo is None:
+            tipo = criar_estrutura(1, 6, 12, prefixo=PREFIXO)[0]
+        usuario, _ = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True})
+        cliente = Client()
+        cliente.force_login(usuario)
+
+        resultados = []
+        for tamanho in tamanhos:
+            atual = InstanciaProcesso.objects.filter(tipo_processo=tipo).count()
+            if atual < tamanho:
+                self.stdout.write(f"Gerando {tamanho - atual} processos...")
+                gerar(planejar([tipo], tamanho - atual, 730, 5000), 0, workers=options['workers'], semente=tamanho)
+
+            for formato in formatos:
+                resultado = self._medir(cliente, tipo, formato)
+                resultados.append(resultado)
+                self.stdout.write(
+                    f"  {formato:5} {resultado['linhas']:>9} linhas | {resultado['mb']:8.1f} MB em "
+                    f"{resultado['segundos']:6.1f}s ({resultado['linhas_s']:>7} linhas/s) | "
+                    f"RSS {resultado['rss_inicial_mb']:.0f} -> pico {resultado['rss_pico_mb']:.0f} MB "
+                    f"(+{resultado['crescimento_mb']:.1f})"
+                )
+        return resultados
+
+    def _medir(self, cliente, tipo, formato):
+        url = reverse('processos:exportar')
+        linhas = InstanciaProcesso.objects.filter(tipo_processo=tipo).count()
+
+        inicio_rss = pico = rss_atual()
+        inicio = time.perf_counter()
+        response = cliente.get(url, {'tipo': tipo.id, 'formato': formato})
+        if response.status_code != 200 or not response.streaming:
+            raise CommandError(f"{url} respondeu {response.status_code} sem streaming")
+
+        total = 0
+        for indice, bloco in enumerate(response.streaming_content):
+            total += len(bloco)
+            if indice % 50 == 0:
+                pico = max(pico, rss_atual())
+        pico = max(pico, rss_atual())
+        segundos = time.perf_counter() - inicio
+
+        return {
+            'formato': formato,
+            'linhas': linhas,
+            'mb': total / 2 ** 20,
+            'segundos': segundos,
+            'linhas_s': int(linhas / segundos) if segundos else 0,
+            'rss_inicial_mb': inicio_rss,
+            'rss_pico_mb': pico,
+            'crescimento_mb': pico - inicio_rss,
+        }
@@ -0,0 +1,71 @@
+"""
+Gera carga sintética em volume de produção
+Cria tipos de processo com fases e campos, processos com dados plausíveis e
+histórico de eventos distribuídos ao longo do tempo
+Execute: python manage.py gerar_carga --tipos 5 --processos 1000000 --eventos 10 --workers 8
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.core.models import TipoProcesso
+from apps.processos.carga import criar_estrutura, planejar, gerar
+
+
+class Command(BaseCommand):
+    help = 'Gera tipos de processo, processos e histórico sintéticos com inserções em lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipos', type=int, default=3, help='Tipos de processo a criar')
+        parser.add_argument('--fases', type=int, default=6, help='Fases por tipo')
+        parser.add_argument('--campos', type=int, default=12, help='Campos por tipo')
+        parser.add_argument('--processos', type=int, default=10000, help='Total de processos')
+        parser.add_argument('--eventos', type=int, default=10, help='Média de eventos de histórico por processo')
+        parser.add_argument('--dias', type=int, default=730, help='Janela de datas de criação (dias)')
+        parser.add_argument('--lote', type=int, default=2000, help='Processos por lote')
+        parser.add_argument('--workers', type=int, default=1, help='Processos paralelos (PostgreSQL)')
+        parser.add_argument('--prefixo', default='CARGA', help='Prefixo dos tipos gerados')
+        parser.add_argument('--reutilizar', action='store_true',
+                            help='Gera processos nos tipos já existentes com o prefixo, sem criar novos')
+        parser.add_argument('--semente', type=int, default=0, help='Semente aleatória (reprodutível)')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "SQLite serializa as escritas: gerando com um único processo"
+            ))
+            workers = 1
+
+        if options['reutilizar']:
+            tipos = list(TipoProcesso.objects.filter(
+                prefixo_numero__startswith=options['prefixo']
+            ).order_by('id'))
+            if not tipos:
+                raise CommandError(f"Nenhum tipo com prefixo '{options['prefixo']}' para reutilizar")
+        else:
+            tipos = criar_estrutura(
+                options['tipos'], options['fases'], options['campos'], prefixo=options['prefixo']
+            )
+        self.stdout.write(f"Tipos: {', '.join(t.prefixo_numero for t in tipos)}")
+
+        inicio = time.perf_counter()
+        lotes = planejar(tipos, options['processos'], options['dias'], options['lote'])
+        self.stdout.write(f"{len(lotes)} lotes planejados, {workers} worker(s)")
+
+        def progresso(processos, eventos):
+            decorrido = time.perf_counter() - inicio
+            self.stdout.write(
+                f"  {processos} processos, {eventos} eventos "
+                f"({processos / decorrido:.0f} processos/s)"
+            )
+
+        processos, eventos = gerar(
+            lotes, options['eventos'], workers=workers,
+            semente=options['semente'], progresso=progresso
+        )
+        decorrido = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{processos} processos e {eventos} eventos gerados em {decorrido:.1f}s"
+        ))
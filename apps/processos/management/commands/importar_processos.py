@@ -0,0 +1,209 @@
+"""
+Importação em massa de processos a partir de CSV ou JSONL
+Execute: python manage.py importar_processos dados.csv --tipo TEF --lote 1000
+"""
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from apps.core.models import TipoProcesso
+from apps.core.esquema import obter_esquema
+from apps.workflow.services import WorkflowService
+
+
+class Command(BaseCommand):
+    help = 'Importa processos em lote (CSV/JSONL) validando os campos do tipo de processo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Arquivo .csv ou .jsonl com uma linha por processo')
+        parser.add_argument('--tipo', required=True, help='Prefixo ou ID do tipo de processo')
+        parser.add_argument('--fase', help='Nome da fase de destino (padrão: fase inicial)')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Formato do arquivo (padrão: pela extensão)')
+        parser.add_argument('--lote', type=int, default=500, help='Linhas por transação')
+        parser.add_argument('--usuario', help='Username registrado como criador dos processos')
+        parser.add_argument('--erros', help='Arquivo JSONL de erros por linha (padrão: <arquivo>.erros.jsonl)')
+        parser.add_argument('--retomar', action='store_true', help='Continua a partir do último lote confirmado')
+        parser.add_argument('--validar', action='store_true', help='Apenas valida, sem gravar')
+
+    def handle(self, *args, **options):
+        arquivo = Path(options['arquivo'])
+        if not arquivo.exists():
+            raise CommandError(f"Arquivo não encontrado: {arquivo}")
+
+        self.tipo = self._obter_tipo(options['tipo'])
+        self.esquema = obter_esquema(self.tipo.id)
+        self.fase = self._obter_fase(options['fase'])
+        self.usuario = self._obter_usuario(options['usuario'])
+        self.campos = self.esquema.campos
+        self.validar_apenas = options['validar']
+        tamanho_lote = max(1, options['lote'])
+
+        formato = options['formato'] or arquivo.suffix.lstrip('.').lower()
+        if formato not in ('csv', 'jsonl'):
+            raise CommandError("Formato não reconhecido, use --formato csv ou jsonl")
+
+        checkpoint = arquivo.with_name(arquivo.name + '.checkpoint')
+        ultima_linha = self._ler_checkpoint(checkpoint) if options['retomar'] else 0
+        if ultima_linha:
+            self.stdout.write(f"Retomando após a linha {ultima_linha}")
+
+        caminho_erros = Path(options['erros'] or arquivo.with_name(arquivo.name + '.erros.jsonl'))
+        self.total_importados = 0
+        self.total_erros = 0
+        inicio = time.perf_counter()
+
+        with open(caminho_erros, 'a' if options['retomar'] else 'w', encoding='utf-8') as self.arquivo_erros:
+            lote = []
+            for numero_linha, linha in self._ler_linhas(arquivo, formato):
+                if numero_linha <= ultima_linha:
+                    continue
+                lote.append((numero_linha, linha))
+                if len(lote) >= tamanho_lote:
+                    self._processar_lote(lote, checkpoint)
+                    self._relatar_progresso(inicio)
+                    lote = []
+            if lote:
+                self._processar_lote(lote, checkpoint)
+
+        duracao = time.perf_counter() - inicio
+        taxa = self.total_importados / duracao if duracao else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Importados: {self.total_importados} | erros: {self.total_erros} | "
+            f"{duracao:.1f}s ({taxa:.0f} linhas/s)"
+        ))
+        if self.total_erros:
+            self.stdout.write(self.style.WARNING(f"Linhas com erro gravadas em {caminho_erros}"))
+        elif not self.validar_apenas:
+            checkpoint.unlink(missing_ok=True)
+
+    # Leitura
+
+    def _ler_linhas(self, arquivo, formato):
+        """Lê o arquivo em streaming, retornando (número da linha, dict)"""
+        with open(arquivo, encoding='utf-8-sig', newline='') as entrada:
+            if formato == 'csv':
+                for numero_linha, linha in enumerate(csv.DictReader(entrada), start=1):
+                    yield numero_linha, linha
+                return
+
+            for numero_linha, texto in enumerate(entrada, start=1):
+                if not texto.strip():
+                    continue
+                try:
+                    linha = json.loads(texto)
+                except ValueError as e:
+                    linha = {'__erro__': f"JSON inválido: {e}"}
+                yield numero_linha, linha
+
+    # Validação
+
+    def _validar(self, linha):
+        """Valida a linha contra os campos do tipo. Retorna (dados, erros)"""
+        if not isinstance(linha, dict):
+            return None, ["A linha deve ser um objeto JSON"]
+        if '__erro__' in linha:
+            return None, [linha['__erro__']]
+
+        dados = {}
+        erros = []
+        for campo in self.campos:
+            valor = linha.get(campo.nome_campo)
+            valor = '' if valor is None else str(valor).strip()
+            erro = campo.validar_valor(valor)
+            if erro:
+                erros.append(erro)
+            elif valor:
+                dados[campo.nome_campo] = valor
+        return dados, erros
+
+    # Gravação
+
+    def _processar_lote(self, lote, checkpoint):
+        validos = []
+        for numero_linha, linha in lote:
+            dados, erros = self._validar(linha)
+            if erros:
+                self._registrar_erro(numero_linha, linha, erros)
+            else:
+                validos.append((numero_linha, dados))
+
+        if validos and not self.validar_apenas:
+            try:
+                self._gravar(validos)
+            except DatabaseError:
+                # Isola as linhas problemáticas gravando uma a uma
+                for numero_linha, dados in validos:
+                    try:
+                        self._gravar([(numero_linha, dados)])
+                    except DatabaseError as e:
+                        self._registrar_erro(numero_linha, dados, [f"Erro ao gravar: {e}"])
+        elif self.validar_apenas:
+            self.total_importados += len(validos)
+
+        self._gravar_checkpoint(checkpoint, lote[-1][0])
+
+    def _gravar(self, validos):
+        """Grava um lote numa transação: uma reserva de números e um bulk_create por tabela"""
+        instancias = WorkflowService.criar_processos_em_lote(
+            tipo_processo=self.tipo,
+            fase=self.fase,
+            lista_dados=[dados for _, dados in validos],
+            usuario=self.usuario,
+            observacoes=[f"Processo importado (linha {numero_linha})" for numero_linha, _ in validos]
+        )
+        self.total_importados += len(instancias)
+
+    # Auxiliares
+
+    def _registrar_erro(self, numero_linha, linha, erros):
+        self.total_erros += 1
+        self.arquivo_erros.write(json.dumps(
+            {'linha': numero_linha, 'erros': erros, 'dados': linha},
+            ensure_ascii=False, default=str
+        ) + '\n')
+
+    def _relatar_progresso(self, inicio):
+        duracao = time.perf_counter() - inicio
+        taxa = self.total_importados / duracao if duracao else 0
+        self.stdout.write(f"  {self.total_importados} importados, {self.total_erros} erros ({taxa:.0f} linhas/s)")
+
+    def _ler_checkpoint(self, checkpoint):
+        if not checkpoint.exists():
+            return 0
+        return json.loads(checkpoint.read_text()).get('linha', 0)
+
+    def _gravar_checkpoint(self, checkpoint, numero_linha):
+        if not self.validar_apenas:
+            checkpoint.write_text(json.dumps({'linha': numero_linha}))
+
+    def _obter_tipo(self, valor):
+        filtro = {'id': valor} if valor.isdigit() else {'prefixo_numero': valor.upper()}
+        try:
+            return TipoProcesso.objects.get(**filtro)
+        except TipoProcesso.DoesNotExist:
+            raise CommandError(f"Tipo de processo não encontrado: {valor}")
+
+    def _obter_fase(self, nome):
+        if nome:
+            fase = next((f for f in self.esquema.fases if f.nome == nome), None)
+        else:
+            fase = self.esquema.fase_inicial
+        if not fase:
+            raise CommandError(
+                f"Fase '{nome}' não encontrada" if nome
+                else f"Nenhuma fase inicial configurada para o processo {self.tipo.nome}"
+            )
+        return fase
+
+    def _obter_usuario(self, username):
+        if not username:
+            return None
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário não encontrado: {username}")
@@ -0,0 +1,23 @@
+"""
+Recalcula as contagens de processos por fase
+Execute: python manage.py reconciliar_contagens
+"""
+from django.core.management.base import BaseCommand
+
+from apps.core.models import Fase
+from apps.processos.models import ContagemFase
+
+
+class Command(BaseCommand):
+    help = 'Corrige divergências entre ContagemFase e os processos existentes'
+
+    def handle(self, *args, **options):
+        divergencias = ContagemFase.reconciliar()
+        nomes = dict(Fase.objects.filter(
+            id__in=[fase_id for fase_id, _, _ in divergencias]
+        ).values_list('id', 'nome'))
+
+        for fase_id, anterior, correto in divergencias:
+            self.stdout.write(f"  {nomes.get(fase_id, fase_id)}: {anterior} -> {correto}")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(divergencias)} contagem(ns) corrigida(s)"))
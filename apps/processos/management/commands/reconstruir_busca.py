@@ -0,0 +1,52 @@
+"""
+Reconstrói os documentos de busca textual dos processos
+Execute: python manage.py reconstruir_busca [--tipo TEF] [--pendentes]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.core.models import TipoProcesso
+from apps.processos.models import InstanciaProcesso
+from apps.processos.busca import atualizar_documentos
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o documento de busca de cada processo (após alterar campos pesquisáveis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', help='Prefixo do tipo de processo (padrão: todos)')
+        parser.add_argument('--pendentes', action='store_true',
+                            help='Apenas processos que ainda não têm documento de busca')
+        parser.add_argument('--lote', type=int, default=1000, help='Processos por transação')
+
+    def handle(self, *args, **options):
+        processos = InstanciaProcesso.objects.order_by('id').only('id', 'numero', 'tipo_processo_id', 'dados')
+
+        if options['tipo']:
+            tipo = TipoProcesso.objects.filter(prefixo_numero=options['tipo'].upper()).first()
+            if not tipo:
+                raise CommandError(f"Tipo de processo não encontrado: {options['tipo']}")
+            processos = processos.filter(tipo_processo=tipo)
+
+        if options['pendentes']:
+            processos = processos.filter(documento_busca__isnull=True)
+
+        inicio = time.perf_counter()
+        total = 0
+        ultimo_id = 0
+        while True:
+            # Paginação por id para não carregar a tabela inteira
+            lote = list(processos.filter(id__gt=ultimo_id)[:options['lote']])
+            if not lote:
+                break
+            with transaction.atomic():
+                atualizar_documentos(lote)
+            total += len(lote)
+            ultimo_id = lote[-1].id
+            self.stdout.write(f"  {total} documentos atualizados")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} documentos de busca reconstruídos em {time.perf_counter() - inicio:.1f}s"
+        ))
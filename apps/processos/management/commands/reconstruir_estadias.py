@@ -0,0 +1,120 @@
+"""
+Monta a tabela de estadias em fases a partir do histórico
+(eventos de criação e mudança de fase, inclusive os arquivados)
+Execute: python manage.py reconstruir_estadias [--tipo TEF] [--recriar]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.auditoria.arquivamento import SegmentoCorrompido, eventos_arquivados
+from apps.auditoria.models import HistoricoProcesso, IndiceSegmentoHistorico
+from apps.core.models import TipoProcesso
+from apps.processos.models import InstanciaProcesso, EstadiaFase
+
+EVENTOS_DE_FASE = ('criacao', 'mudanca_fase')
+
+
+class Command(BaseCommand):
+    help = 'Gera as estadias em fases dos processos que ainda não as têm, a partir do histórico'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', help='Prefixo do tipo de processo (padrão: todos)')
+        parser.add_argument('--recriar', action='store_true',
+                            help='Apaga as estadias existentes e reconstrói todas')
+        parser.add_argument('--lote', type=int, default=500, help='Processos por transação')
+
+    def handle(self, *args, **options):
+        processos = InstanciaProcesso.objects.order_by('id').only(
+            'id', 'numero', 'tipo_processo_id', 'fase_atual_id', 'criado_em', 'criado_por_id'
+        )
+        if options['tipo']:
+            tipo = TipoProcesso.objects.filter(prefixo_numero=options['tipo'].upper()).first()
+            if not tipo:
+                raise CommandError(f"Tipo de processo não encontrado: {options['tipo']}")
+            processos = processos.filter(tipo_processo=tipo)
+
+        if options['recriar']:
+            removidas = EstadiaFase.objects.filter(instancia_processo__in=processos.values('id')).delete()[0]
+            self.stdout.write(f"{removidas} estadias removidas")
+        else:
+            processos = processos.filter(estadias__isnull=True)
+
+        inicio = time.perf_counter()
+        total = estadias = 0
+        ultimo_id = 0
+        while True:
+            lote = list(processos.filter(id__gt=ultimo_id)[:options['lote']])
+            if not lote:
+                break
+            novas = []
+            for processo, eventos in self._eventos(lote):
+                novas.extend(self._estadias(processo, eventos))
+            with transaction.atomic():
+                EstadiaFase.objects.bulk_create(novas, batch_size=1000)
+            estadias += len(novas)
+            total += len(lote)
+            ultimo_id = lote[-1].id
+            self.stdout.write(f"  {total} processos, {estadias} estadias")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{estadias} estadias criadas para {total} processos em {time.perf_counter() - inicio:.1f}s"
+        ))
+
+    def _eventos(self, lote):
+        """(processo, eventos de fase em ordem cronológica) de cada processo do lote"""
+        eventos = {processo.id: [] for processo in lote}
+        for evento in HistoricoProcesso.objects.filter(
+            instancia_processo__in=lote, tipo_evento__in=EVENTOS_DE_FASE
+        ).order_by('criado_em', 'id'):
+            eventos[evento.instancia_processo_id].append(evento)
+        com_arquivo = set(IndiceSegmentoHistorico.objects.filter(
+            instancia_processo__in=lote
+        ).values_list('instancia_processo_id', flat=True))
+
+        for processo in lote:
+            lista = eventos[processo.id]
+            if processo.id in com_arquivo:
+                try:
+                    arquivados = [e for e in eventos_arquivados(processo) if e.tipo_evento in EVENTOS_DE_FASE]
+                except SegmentoCorrompido as e:
+                    self.stdout.write(self.style.ERROR(f"{processo.numero}: {e}"))
+                    continue
+                lista = sorted(arquivados + lista, key=lambda e: (e.criado_em, e.id))
+            yield processo, lista
+
+    def _estadias(self, processo, eventos):
+        """Uma estadia por passagem; a última fica aberta"""
+        mudancas = [e for e in eventos if e.tipo_evento == 'mudanca_fase']
+        criacao = next((e for e in eventos if e.tipo_evento == 'criacao'), None)
+
+        # Fase inicial: a do evento de criação, a anterior à primeira mudança ou a atual
+        fase_id = (
+            (criacao.fase_nova_id if criacao else None)
+            or (mudancas[0].fase_anterior_id if mudancas else None)
+            or processo.fase_atual_id
+        )
+        atual = EstadiaFase(
+            instancia_processo=processo,
+            fase_id=fase_id,
+            entrada_em=criacao.criado_em if criacao else processo.criado_em,
+            usuario_entrada_id=criacao.usuario_id if criacao else processo.criado_por_id,
+        )
+
+        estadias = []
+        for mudanca in mudancas:
+            if not mudanca.fase_nova_id:
+                continue
+            atual.saida_em = mudanca.criado_em
+            atual.usuario_saida_id = mudanca.usuario_id
+            atual.duracao = mudanca.criado_em - atual.entrada_em
+            estadias.append(atual)
+            atual = EstadiaFase(
+                instancia_processo=processo,
+                fase_id=mudanca.fase_nova_id,
+                entrada_em=mudanca.criado_em,
+                usuario_entrada_id=mudanca.usuario_id,
+            )
+        estadias.append(atual)
+        return estadias
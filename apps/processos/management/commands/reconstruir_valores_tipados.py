@@ -0,0 +1,62 @@
+"""
+Reconstrói os valores tipados (campos numéricos e de data) dos processos
+Use para os processos anteriores à tabela e após mudar o tipo de um campo
+Execute: python manage.py reconstruir_valores_tipados [--tipo TEF]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.core.models import CampoFormulario, TipoProcesso
+from apps.processos.models import InstanciaProcesso, ValorTipado
+from apps.processos.tipados import COLUNAS, atualizar_valores
+
+
+class Command(BaseCommand):
+    help = 'Regrava os valores tipados dos campos numéricos e de data a partir dos dados dos processos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', help='Prefixo do tipo de processo (padrão: todos)')
+        parser.add_argument('--lote', type=int, default=1000, help='Processos por transação')
+
+    def handle(self, *args, **options):
+        # Só os tipos que têm campos numéricos ou de data
+        tipos = set(CampoFormulario.objects.filter(
+            tipo_campo__in=list(COLUNAS)
+        ).values_list('tipo_processo_id', flat=True))
+
+        if options['tipo']:
+            tipo = TipoProcesso.objects.filter(prefixo_numero=options['tipo'].upper()).first()
+            if not tipo:
+                raise CommandError(f"Tipo de processo não encontrado: {options['tipo']}")
+            tipos &= {tipo.id}
+            ValorTipado.objects.filter(instancia_processo__tipo_processo=tipo).exclude(
+                campo__tipo_campo__in=list(COLUNAS)
+            ).delete()
+        else:
+            # Valores de campos que deixaram de ser numéricos ou de data
+            ValorTipado.objects.exclude(campo__tipo_campo__in=list(COLUNAS)).delete()
+
+        processos = InstanciaProcesso.objects.filter(
+            tipo_processo_id__in=tipos
+        ).order_by('id').only('id', 'tipo_processo_id', 'dados')
+
+        inicio = time.perf_counter()
+        total = 0
+        ultimo_id = 0
+        while True:
+            # Paginação por id para não carregar a tabela inteira
+            lote = list(processos.filter(id__gt=ultimo_id)[:options['lote']])
+            if not lote:
+                break
+            with transaction.atomic():
+                atualizar_valores(lote, batch_size=1000)
+            total += len(lote)
+            ultimo_id = lote[-1].id
+            self.stdout.write(f"  {total} processos")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Valores tipados de {total} processos reconstruídos em {time.perf_counter() - inicio:.1f}s "
+            f"({ValorTipado.objects.count()} valores)"
+        ))
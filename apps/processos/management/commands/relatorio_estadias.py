@@ -0,0 +1,46 @@
+"""
+Tempo de permanência por fase (SLA e tempo de ciclo)
+Lê apenas a tabela de estadias, pelos índices por fase
+Execute: python manage.py relatorio_estadias --tipo TEF --dias 7
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.models import TipoProcesso
+from apps.processos.models import EstadiaFase
+
+PERCENTIS = (50, 90, 95)
+
+
+def formatar_duracao(duracao):
+    if duracao is None:
+        return '-'
+    horas = duracao.total_seconds() / 3600
+    return f"{horas / 24:.1f}d" if horas >= 48 else f"{horas:.1f}h"
+
+
+class Command(BaseCommand):
+    help = 'Percentis de duração e processos parados há mais de N dias, por fase'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', required=True, help='Prefixo do tipo de processo')
+        parser.add_argument('--dias', type=int, default=7, help='Limite para "abertos há mais de N dias"')
+
+    def handle(self, *args, **options):
+        tipo = TipoProcesso.objects.filter(prefixo_numero=options['tipo'].upper()).first()
+        if not tipo:
+            raise CommandError(f"Tipo de processo não encontrado: {options['tipo']}")
+
+        self.stdout.write(
+            f"{'Fase':30} {'concluídas':>10} " + ' '.join(f"{'p' + str(p):>8}" for p in PERCENTIS) +
+            f" {'abertas':>8} {'> ' + str(options['dias']) + 'd':>8}"
+        )
+        for fase in tipo.fases.order_by('ordem'):
+            percentis = EstadiaFase.percentis(fase, PERCENTIS)
+            concluidas = EstadiaFase.objects.filter(fase=fase, saida_em__isnull=False).count()
+            abertas = EstadiaFase.objects.filter(fase=fase, saida_em__isnull=True).count()
+            atrasadas = EstadiaFase.abertas_ha_mais_de(fase, options['dias']).count()
+            self.stdout.write(
+                f"{fase.nome[:30]:30} {concluidas:>10} " +
+                ' '.join(f"{formatar_duracao(percentis.get(p)):>8}" for p in PERCENTIS) +
+                f" {abertas:>8} {atrasadas:>8}"
+            )
@@ -0,0 +1,58 @@
+"""
+Cria e remove os índices sobre dados dos campos marcados como indexados
+No PostgreSQL usa CREATE/DROP INDEX CONCURRENTLY: as escritas continuam
+durante a construção. Execute após alterar "Indexado" em um campo
+Execute: python manage.py sincronizar_indices_dados [--verificar]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.processos import indices
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza os índices de expressão sobre dados com os campos marcados como indexados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true',
+                            help='Apenas lista o que seria criado ou removido; falha se houver pendências')
+
+    def handle(self, *args, **options):
+        try:
+            criar, remover = indices.pendencias()
+        except indices.IndicesNaoSuportados as e:
+            raise CommandError(str(e))
+
+        if options['verificar']:
+            for nome in remover:
+                self.stdout.write(f"  remover {nome}")
+            for campo in criar:
+                self.stdout.write(f"  criar {indices.nome_indice(campo)} ({campo.tipo_processo_id}: {campo.nome_campo})")
+            if criar or remover:
+                raise CommandError(f"{len(criar)} índices a criar e {len(remover)} a remover")
+            self.stdout.write(self.style.SUCCESS("Índices de dados sincronizados"))
+            return
+
+        # Cada comando fora de transação (CONCURRENTLY não roda dentro de uma)
+        with connection.cursor() as cursor:
+            for nome in remover:
+                inicio = time.perf_counter()
+                cursor.execute(indices.sql_remover(nome))
+                self.stdout.write(f"  {nome} removido em {time.perf_counter() - inicio:.1f}s")
+            for campo in criar:
+                inicio = time.perf_counter()
+                cursor.execute(indices.sql_criar(campo))
+                self.stdout.write(
+                    f"  {indices.nome_indice(campo)} ({campo.nome_campo}) criado em {time.perf_counter() - inicio:.1f}s"
+                )
+            # Estatísticas das expressões indexadas: sem elas o planejador
+            # tende a preferir o índice por tipo de processo
+            if criar and connection.vendor == 'postgresql':
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(indices.TABELA)}')
+            elif criar:
+                for campo in criar:
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(indices.nome_indice(campo))}')
+
+        self.stdout.write(self.style.SUCCESS(f"{len(criar)} índices criados, {len(remover)} removidos"))
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.28 on 2026-10-17 22:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SQL_POSTGRES = [
+    "CREATE INDEX processos_documentobusca_tsv_idx ON processos_documentobusca "
+    "USING gin (to_tsvector('simple', texto))",
+]
+SQL_POSTGRES_REVERSO = [
+    "DROP INDEX IF EXISTS processos_documentobusca_tsv_idx",
+]
+
+SQL_SQLITE = [
+    "CREATE VIRTUAL TABLE processos_documentobusca_fts USING fts5("
+    "texto, content='processos_documentobusca', content_rowid='instancia_id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER processos_documentobusca_ai AFTER INSERT ON processos_documentobusca BEGIN "
+    "INSERT INTO processos_documentobusca_fts(rowid, texto) VALUES (new.instancia_id, new.texto); END",
+    "CREATE TRIGGER processos_documentobusca_ad AFTER DELETE ON processos_documentobusca BEGIN "
+    "INSERT INTO processos_documentobusca_fts(processos_documentobusca_fts, rowid, texto) "
+    "VALUES ('delete', old.instancia_id, old.texto); END",
+    "CREATE TRIGGER processos_documentobusca_au AFTER UPDATE ON processos_documentobusca BEGIN "
+    "INSERT INTO processos_documentobusca_fts(processos_documentobusca_fts, rowid, texto) "
+    "VALUES ('delete', old.instancia_id, old.texto); "
+    "INSERT INTO processos_documentobusca_fts(rowid, texto) VALUES (new.instancia_id, new.texto); END",
+]
+SQL_SQLITE_REVERSO = [
+    "DROP TRIGGER IF EXISTS processos_documentobusca_ai",
+    "DROP TRIGGER IF EXISTS processos_documentobusca_ad",
+    "DROP TRIGGER IF EXISTS processos_documentobusca_au",
+    "DROP TABLE IF EXISTS processos_documentobusca_fts",
+]
+
+
+def _executar(schema_editor, comandos):
+    for sql in comandos:
+        schema_editor.execute(sql)
+
+
+def criar_indice_textual(apps, schema_editor):
+    """Índice GIN no PostgreSQL ou tabela FTS5 no SQLite (demais bancos usam icontains)"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _executar(schema_editor, SQL_POSTGRES)
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        _executar(schema_editor, SQL_SQLITE)
+
+
+def remover_indice_textual(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _executar(schema_editor, SQL_POSTGRES_REVERSO)
+    elif vendor == 'sqlite':
+        _executar(schema_editor, SQL_SQLITE_REVERSO)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentoBusca',
+            fields=[
+                ('instancia', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='documento_busca', serialize=False, to='processos.instanciaprocesso', verbose_name='Processo')),
+                ('texto', models.TextField(verbose_name='Texto Pesquisável')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Documento de Busca',
+                'verbose_name_plural': 'Documentos de Busca',
+            },
+        ),
+        migrations.RunPython(criar_indice_textual, remover_indice_textual),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.28 on 2026-10-17 22:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def popular_contagens(apps, schema_editor):
+    """Contagem inicial a partir dos processos existentes"""
+    InstanciaProcesso = apps.get_model('processos', 'InstanciaProcesso')
+    ContagemFase = apps.get_model('processos', 'ContagemFase')
+    contagens = InstanciaProcesso.objects.values(
+        'tipo_processo_id', 'fase_atual_id'
+    ).annotate(total=models.Count('id')).order_by()
+    ContagemFase.objects.bulk_create([
+        ContagemFase(
+            tipo_processo_id=item['tipo_processo_id'],
+            fase_id=item['fase_atual_id'],
+            total=item['total']
+        )
+        for item in contagens
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_campo_pesquisavel'),
+        ('processos', '0002_documentobusca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContagemFase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0, verbose_name='Total de Processos')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('fase', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='contagem', to='core.fase', verbose_name='Fase')),
+                ('tipo_processo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contagens_fase', to='core.tipoprocesso', verbose_name='Tipo de Processo')),
+            ],
+            options={
+                'verbose_name': 'Contagem por Fase',
+                'verbose_name_plural': 'Contagens por Fase',
+                'ordering': ['tipo_processo', 'fase__ordem'],
+            },
+        ),
+        migrations.RunPython(popular_contagens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.28 on 2026-10-17 23:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0003_campo_pesquisavel'),
+        ('processos', '0003_contagemfase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadiaFase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entrada_em', models.DateTimeField(verbose_name='Entrada')),
+                ('saida_em', models.DateTimeField(blank=True, null=True, verbose_name='Saída')),
+                ('duracao', models.DurationField(blank=True, help_text='Preenchida na saída da fase', null=True, verbose_name='Duração')),
+                ('fase', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadias', to='core.fase', verbose_name='Fase')),
+                ('instancia_processo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadias', to='processos.instanciaprocesso', verbose_name='Processo')),
+                ('usuario_entrada', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Movido para a fase por')),
+                ('usuario_saida', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Retirado da fase por')),
+            ],
+            options={
+                'verbose_name': 'Estadia em Fase',
+                'verbose_name_plural': 'Estadias em Fases',
+                'ordering': ['instancia_processo', 'entrada_em'],
+                'indexes': [models.Index(condition=models.Q(('saida_em__isnull', True)), fields=['fase', 'entrada_em'], name='estadia_aberta_fase_idx'), models.Index(condition=models.Q(('saida_em__isnull', False)), fields=['fase', 'duracao'], name='estadia_duracao_fase_idx'), models.Index(fields=['instancia_processo', 'entrada_em'], name='processos_e_instanc_156e3a_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='estadiafase',
+            constraint=models.UniqueConstraint(condition=models.Q(('saida_em__isnull', True)), fields=('instancia_processo',), name='estadia_unica_aberta'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.28 on 2026-10-17 23:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_campo_indexado'),
+        ('processos', '0004_estadiafase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValorTipado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor_numero', models.DecimalField(blank=True, decimal_places=6, max_digits=20, null=True, verbose_name='Valor Numérico')),
+                ('valor_data', models.DateField(blank=True, null=True, verbose_name='Valor Data')),
+                ('valor_texto', models.CharField(blank=True, help_text='Texto como gravado nos dados do processo', max_length=255, verbose_name='Valor Original')),
+                ('campo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valores_tipados', to='core.campoformulario', verbose_name='Campo')),
+                ('instancia_processo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valores_tipados', to='processos.instanciaprocesso', verbose_name='Processo')),
+            ],
+            options={
+                'verbose_name': 'Valor Tipado',
+                'verbose_name_plural': 'Valores Tipados',
+                'indexes': [models.Index(fields=['campo', 'valor_numero', 'instancia_processo'], name='valor_tipado_numero_idx'), models.Index(fields=['campo', 'valor_data', 'instancia_processo'], name='valor_tipado_data_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='valortipado',
+            constraint=models.UniqueConstraint(fields=('instancia_processo', 'campo'), name='valor_tipado_unico'),
+        ),
+    ]
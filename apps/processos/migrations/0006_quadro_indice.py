@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-17 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos', '0005_valortipado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='instanciaprocesso',
+            index=models.Index(fields=['fase_atual', '-criado_em', '-id'], name='processo_fase_recentes_idx'),
+        ),
+    ]
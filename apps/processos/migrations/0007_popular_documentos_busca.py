@@ -0,0 +1,49 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:12
+
+from django.db import migrations
+
+
+def popular_documentos(apps, schema_editor):
+    """
+    Documentos de busca dos processos criados antes do índice textual
+    (mesmo texto de busca.montar_texto: número e campos pesquisáveis)
+    """
+    InstanciaProcesso = apps.get_model('processos', 'InstanciaProcesso')
+    DocumentoBusca = apps.get_model('processos', 'DocumentoBusca')
+    CampoFormulario = apps.get_model('core', 'CampoFormulario')
+
+    pesquisaveis = {}
+    for tipo_id, nome_campo in CampoFormulario.objects.filter(pesquisavel=True).order_by(
+        'ordem', 'id'
+    ).values_list('tipo_processo_id', 'nome_campo'):
+        pesquisaveis.setdefault(tipo_id, []).append(nome_campo)
+
+    processos = InstanciaProcesso.objects.filter(documento_busca__isnull=True).order_by('id')
+    ultimo_id = 0
+    while True:
+        lote = list(
+            processos.filter(id__gt=ultimo_id).values_list('id', 'numero', 'tipo_processo_id', 'dados')[:1000]
+        )
+        if not lote:
+            break
+        documentos = []
+        for instancia_id, numero, tipo_id, dados in lote:
+            partes = [numero] + [
+                str(dados[nome]) for nome in pesquisaveis.get(tipo_id, [])
+                if dados.get(nome) not in (None, '')
+            ]
+            documentos.append(DocumentoBusca(instancia_id=instancia_id, texto='\n'.join(partes)))
+        DocumentoBusca.objects.bulk_create(documentos)
+        ultimo_id = lote[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_campo_pesquisavel'),
+        ('processos', '0006_quadro_indice'),
+    ]
+
+    operations = [
+        migrations.RunPython(popular_documentos, migrations.RunPython.noop),
+    ]
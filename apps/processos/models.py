@@ -1,7 +1,15 @@
-from django.db import models
+from datetime import timedelta
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q, Sum, Count, Value, DateTimeField, DurationField, ExpressionWrapper
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils import timezone
-from apps.core.models import TipoProcesso, Fase
+from apps.core.models import TipoProcesso, Fase, CampoFormulario
+from apps.core.esquema import obter_esquema
+from apps.usuarios.permissoes import usuario_tem_permissao_fase
+from .condicional import registrar_alteracao
 
 
 class InstanciaProcesso(models.Model):
@@ -71,6 +79,8 @@ class InstanciaProcesso(models.Model):
             models.Index(fields=['tipo_processo', 'fase_atual']),
             models.Index(fields=['responsavel_atual']),
             models.Index(fields=['-criado_em']),
+            # Cartões de cada coluna do quadro (ROW_NUMBER por fase e "carregar mais")
+            models.Index(fields=['fase_atual', '-criado_em', '-id'], name='processo_fase_recentes_idx'),
         ]
 
     def __str__(self):
@@ -88,8 +98,18 @@ class InstanciaProcesso(models.Model):
         Formato: PREFIXO-ANO-SEQUENCIA (ex: TEF-2026-001)
         """
         ano_atual = timezone.now().year
-        sequencia = self.tipo_processo.get_proxima_sequencia()
-        return f"{self.tipo_processo.prefixo_numero}-{ano_atual}-{sequencia:03d}"
+        sequencia = self.tipo_processo.get_proxima_sequencia(ano=ano_atual)
+        return self.formatar_numero(self.tipo_processo, ano_atual, sequencia)
+
+    @staticmethod
+    def formatar_numero(tipo_processo, ano, sequencia):
+        """Monta o número no formato PREFIXO-ANO-SEQUENCIA"""
+        return f"{tipo_processo.prefixo_numero}-{ano}-{sequencia:03d}"
+
+    @property
+    def esquema(self):
+        """Esquema compilado (campos e fases) do tipo de processo"""
+        return obter_esquema(self.tipo_processo_id)
 
     def pode_avancar_fase(self, usuario):
         """Verifica se o usuário pode avançar a fase do processo"""
@@ -108,47 +128,19 @@ class InstanciaProcesso(models.Model):
 
     def _usuario_tem_permissao_fase(self, usuario, fase):
         """Verifica se o usuário tem permissão para atuar na fase"""
-        # Superusuário tem acesso total
-        if usuario.is_superuser:
-            return True
-        
-        # Verifica se há usuários específicos autorizados
-        usuarios_autorizados = fase.usuarios_autorizados.all()
-        if usuarios_autorizados.exists():
-            return usuario in usuarios_autorizados
-        
-        # Verifica se o usuário pertence ao setor responsável
-        try:
-            perfil = usuario.perfilusuario
-            if fase.setor_responsavel == 'TODOS':
-                return True
-            return perfil.setor == fase.setor_responsavel
-        except:
-            return False
+        # Superusuário, usuários autorizados e setor responsável são
+        # resolvidos uma vez por usuário em apps.usuarios.permissoes
+        return usuario_tem_permissao_fase(usuario, fase.id)
 
     def validar_campos_obrigatorios(self, fase):
         """
         Valida se todos os campos obrigatórios para a fase estão preenchidos
         Retorna (valido, campos_faltantes)
         """
-        from apps.core.models import CampoFormulario
-        
         campos_faltantes = []
         
-        # Campos obrigatórios globalmente
-        campos_obrigatorios = CampoFormulario.objects.filter(
-            tipo_processo=self.tipo_processo,
-            obrigatorio=True
-        )
-        
-        for campo in campos_obrigatorios:
-            valor = self.dados.get(campo.nome_campo)
-            if not valor or (isinstance(valor, str) and not valor.strip()):
-                campos_faltantes.append(campo.label)
-        
-        # Campos obrigatórios na fase específica
-        campos_fase = fase.campos_obrigatorios.all()
-        for campo in campos_fase:
+        # Campos obrigatórios globalmente e na fase específica
+        for campo in self.esquema.campos_obrigatorios(fase.id):
             valor = self.dados.get(campo.nome_campo)
             if not valor or (isinstance(valor, str) and not valor.strip()):
                 if campo.label not in campos_faltantes:
@@ -162,9 +154,8 @@ class InstanciaProcesso(models.Model):
         considerando as permissões do usuário
         """
         fases_disponiveis = []
-        todas_fases = Fase.objects.filter(tipo_processo=self.tipo_processo).order_by('ordem')
         
-        for fase in todas_fases:
+        for fase in self.esquema.fases:
             if fase.id == self.fase_atual.id:
                 continue
             
@@ -182,23 +173,320 @@ class InstanciaProcesso(models.Model):
 
     def get_dados_formatados(self):
         """Retorna os dados do processo formatados e agrupados"""
-        from apps.core.models import CampoFormulario
-        
         dados_formatados = {}
-        campos = CampoFormulario.objects.filter(
-            tipo_processo=self.tipo_processo
-        ).order_by('ordem', 'id')
         
-        for campo in campos:
-            grupo_nome = campo.grupo or 'Informações Gerais'
-            valor = self.dados.get(campo.nome_campo, '')
-            
-            if grupo_nome not in dados_formatados:
-                dados_formatados[grupo_nome] = {}
-            
-            dados_formatados[grupo_nome][campo.label] = {
-                'valor': valor,
-                'tipo': campo.tipo_campo,
+        for grupo_nome, campos in self.esquema.grupos.items():
+            dados_formatados[grupo_nome] = {
+                campo.label: {
+                    'valor': self.dados.get(campo.nome_campo, ''),
+                    'tipo': campo.tipo_campo,
+                }
+                for campo in campos
             }
         
         return dados_formatados
+
+
+class DocumentoBusca(models.Model):
+    """
+    Documento de busca textual de um processo
+    Reúne o número e os campos pesquisáveis; é indexado com tsvector/GIN
+    no PostgreSQL e com uma tabela FTS5 no SQLite (ver apps.processos.busca)
+    """
+    instancia = models.OneToOneField(
+        InstanciaProcesso,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='documento_busca',
+        verbose_name="Processo"
+    )
+    texto = models.TextField(verbose_name="Texto Pesquisável")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Documento de Busca"
+        verbose_name_plural = "Documentos de Busca"
+
+    def __str__(self):
+        return f"Busca: {self.instancia_id}"
+
+
+class ValorTipado(models.Model):
+    """
+    Valor de um campo numérico ou de data de um processo, com o tipo do banco
+    Cópia dos valores de InstanciaProcesso.dados (que guarda texto), mantida
+    na criação e na edição de dados (ver apps.processos.tipados); os índices
+    (campo, valor) atendem filtros de intervalo e ordenação por campo
+    """
+    instancia_processo = models.ForeignKey(
+        InstanciaProcesso,
+        on_delete=models.CASCADE,
+        related_name='valores_tipados',
+        verbose_name="Processo"
+    )
+    campo = models.ForeignKey(
+        CampoFormulario,
+        on_delete=models.CASCADE,
+        related_name='valores_tipados',
+        verbose_name="Campo"
+    )
+    valor_numero = models.DecimalField(
+        max_digits=20,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        verbose_name="Valor Numérico"
+    )
+    valor_data = models.DateField(null=True, blank=True, verbose_name="Valor Data")
+    valor_texto = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Valor Original",
+        help_text="Texto como gravado nos dados do processo"
+    )
+
+    class Meta:
+        verbose_name = "Valor Tipado"
+        verbose_name_plural = "Valores Tipados"
+        constraints = [
+            models.UniqueConstraint(fields=['instancia_processo', 'campo'], name='valor_tipado_unico'),
+        ]
+        indexes = [
+            # Intervalos e ordenação por campo; o processo desempata a ordem
+            models.Index(fields=['campo', 'valor_numero', 'instancia_processo'], name='valor_tipado_numero_idx'),
+            models.Index(fields=['campo', 'valor_data', 'instancia_processo'], name='valor_tipado_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.instancia_processo_id} - {self.campo_id}: {self.valor_texto}"
+
+
+class ContagemFase(models.Model):
+    """
+    Contagem de processos por tipo e fase, mantida incrementalmente
+    Atualizada na mesma transação da criação e das mudanças de fase;
+    o comando reconciliar_contagens corrige eventuais divergências
+    """
+    tipo_processo = models.ForeignKey(
+        TipoProcesso,
+        on_delete=models.CASCADE,
+        related_name='contagens_fase',
+        verbose_name="Tipo de Processo"
+    )
+    fase = models.OneToOneField(
+        Fase,
+        on_delete=models.CASCADE,
+        related_name='contagem',
+        verbose_name="Fase"
+    )
+    total = models.IntegerField(default=0, verbose_name="Total de Processos")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Contagem por Fase"
+        verbose_name_plural = "Contagens por Fase"
+        ordering = ['tipo_processo', 'fase__ordem']
+
+    def __str__(self):
+        return f"{self.fase}: {self.total}"
+
+    @classmethod
+    def ajustar(cls, deltas):
+        """
+        Aplica variações de contagem por fase
+        deltas: dict {fase_id: delta}
+        O total nunca fica negativo (uma divergência vira 0, e não um número
+        sem sentido, até o reconciliar_contagens); fases removidas são ignoradas
+        """
+        for fase_id, delta in sorted(deltas.items()):
+            if not delta:
+                continue
+            atualizados = cls.objects.filter(fase_id=fase_id).update(
+                total=Greatest(F('total') + delta, 0),
+                atualizado_em=timezone.now()
+            )
+            if atualizados:
+                continue
+            tipo_processo_id = Fase.objects.filter(id=fase_id).values_list('tipo_processo_id', flat=True).first()
+            if tipo_processo_id is None:
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(tipo_processo_id=tipo_processo_id, fase_id=fase_id, total=max(delta, 0))
+            except IntegrityError:
+                # Criada por outra transação ao mesmo tempo (ou a fase acabou de ser removida)
+                cls.objects.filter(fase_id=fase_id).update(total=Greatest(F('total') + delta, 0))
+
+    @classmethod
+    def estatisticas(cls, tipo_processo_id=None, fase_id=None, setor=None):
+        """Total e as 5 fases com mais processos, no formato usado pela listagem"""
+        contagens = cls.objects.filter(total__gt=0)
+        if tipo_processo_id:
+            contagens = contagens.filter(tipo_processo_id=tipo_processo_id)
+        if fase_id:
+            contagens = contagens.filter(fase_id=fase_id)
+        if setor:
+            contagens = contagens.filter(fase__setor_responsavel=setor)
+
+        return {
+            'total': contagens.aggregate(total=Sum('total'))['total'] or 0,
+            'por_fase': contagens.values(fase_atual__nome=F('fase__nome')).annotate(
+                count=Sum('total')
+            ).order_by('-count')[:5],
+        }
+
+    @classmethod
+    def reconciliar(cls):
+        """
+        Recalcula todas as contagens a partir dos processos
+        Retorna a lista de (fase_id, contagem anterior, contagem correta) divergentes
+        """
+        reais = dict(
+            InstanciaProcesso.objects.values_list('fase_atual_id').annotate(n=Count('id')).order_by()
+        )
+        divergencias = []
+        with transaction.atomic():
+            atuais = {c.fase_id: c for c in cls.objects.select_for_update()}
+            for fase in Fase.objects.all():
+                correto = reais.get(fase.id, 0)
+                contagem = atuais.get(fase.id)
+                anterior = contagem.total if contagem else 0
+                if anterior == correto:
+                    continue
+                divergencias.append((fase.id, anterior, correto))
+                if contagem:
+                    contagem.total = correto
+                    contagem.save(update_fields=['total', 'atualizado_em'])
+                else:
+                    cls.objects.create(tipo_processo_id=fase.tipo_processo_id, fase=fase, total=correto)
+        return divergencias
+
+
+class EstadiaFase(models.Model):
+    """
+    Passagem de um processo por uma fase: entrada, saída e duração
+    Gravada na mesma transação da criação e das mudanças de fase; o comando
+    reconstruir_estadias monta a tabela a partir do histórico
+    """
+    instancia_processo = models.ForeignKey(
+        InstanciaProcesso,
+        on_delete=models.CASCADE,
+        related_name='estadias',
+        verbose_name="Processo"
+    )
+    fase = models.ForeignKey(
+        Fase,
+        on_delete=models.CASCADE,
+        related_name='estadias',
+        verbose_name="Fase"
+    )
+    entrada_em = models.DateTimeField(verbose_name="Entrada")
+    saida_em = models.DateTimeField(null=True, blank=True, verbose_name="Saída")
+    duracao = models.DurationField(
+        null=True,
+        blank=True,
+        verbose_name="Duração",
+        help_text="Preenchida na saída da fase"
+    )
+    usuario_entrada = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Movido para a fase por"
+    )
+    usuario_saida = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Retirado da fase por"
+    )
+
+    class Meta:
+        verbose_name = "Estadia em Fase"
+        verbose_name_plural = "Estadias em Fases"
+        ordering = ['instancia_processo', 'entrada_em']
+        indexes = [
+            # "Abertos há mais de X dias na fase Y"
+            models.Index(
+                fields=['fase', 'entrada_em'],
+                condition=Q(saida_em__isnull=True),
+                name='estadia_aberta_fase_idx',
+            ),
+            # Percentis de duração por fase
+            models.Index(
+                fields=['fase', 'duracao'],
+                condition=Q(saida_em__isnull=False),
+                name='estadia_duracao_fase_idx',
+            ),
+            models.Index(fields=['instancia_processo', 'entrada_em']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['instancia_processo'],
+                condition=Q(saida_em__isnull=True),
+                name='estadia_unica_aberta',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.instancia_processo_id} em {self.fase}: {self.entrada_em:%d/%m/%Y %H:%M}"
+
+    @classmethod
+    def registrar_mudanca(cls, instancias, fase_nova, usuario, momento):
+        """
+        Fecha a estadia aberta de cada processo e abre a da nova fase (2 consultas)
+        """
+        ids = [instancia.id for instancia in instancias]
+        cls.objects.filter(instancia_processo_id__in=ids, saida_em__isnull=True).update(
+            saida_em=momento,
+            usuario_saida=usuario,
+            duracao=ExpressionWrapper(
+                Value(momento, output_field=DateTimeField()) - F('entrada_em'),
+                output_field=DurationField()
+            ),
+        )
+        cls.objects.bulk_create([
+            cls(instancia_processo_id=instancia_id, fase=fase_nova, entrada_em=momento, usuario_entrada=usuario)
+            for instancia_id in ids
+        ], batch_size=500)
+
+    @classmethod
+    def abertas_ha_mais_de(cls, fase, dias):
+        """Estadias em andamento na fase iniciadas há mais de N dias"""
+        limite = timezone.now() - timedelta(days=dias)
+        return cls.objects.filter(fase=fase, saida_em__isnull=True, entrada_em__lt=limite)
+
+    @classmethod
+    def percentis(cls, fase, percentis=(50, 90, 95)):
+        """
+        Duração das estadias concluídas na fase nos percentis pedidos
+        (posição exata, lida do índice por fase e duração)
+        Retorna {percentil: timedelta}, vazio se não há estadias concluídas
+        """
+        duracoes = cls.objects.filter(fase=fase, saida_em__isnull=False).order_by('duracao')
+        total = duracoes.count()
+        if not total:
+            return {}
+        resultado = {}
+        for percentil in percentis:
+            posicao = max(0, min(total - 1, -(-total * percentil // 100) - 1))
+            resultado[percentil] = duracoes.values_list('duracao', flat=True)[posicao]
+        return resultado
+
+
+@receiver(post_delete, sender=InstanciaProcesso)
+def decrementar_contagem_fase(sender, instance, **kwargs):
+    """Mantém a contagem por fase quando um processo é excluído"""
+    ContagemFase.ajustar({instance.fase_atual_id: -1})
+    registrar_alteracao(instance.tipo_processo_id)
+
+
+@receiver([post_save, post_delete], sender=TipoProcesso)
+@receiver([post_save, post_delete], sender=Fase)
+def invalidar_listagem_configuracao(sender, instance, **kwargs):
+    """Tipos e fases aparecem nos filtros e nas linhas da listagem"""
+    registrar_alteracao(instance.pk if sender is TipoProcesso else instance.tipo_processo_id)
@@ -0,0 +1,99 @@
+"""
+Quadro (kanban) de um tipo de processo
+A carga do quadro traz os cartões mais recentes de todas as fases numa única
+consulta: ROW_NUMBER() particionado por fase_atual e ordenado por
+(-criado_em, -id), filtrado às primeiras PROCESSOS_QUADRO_POR_COLUNA + 1
+linhas de cada fase (a linha extra indica que a coluna tem mais). As páginas
+seguintes de cada coluna vêm do PaginadorCursor, na mesma ordenação e com o
+mesmo formato de cursor
+"""
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from apps.core.models import Fase
+from apps.core.paginacao import PaginadorCursor, codificar_cursor
+from .models import InstanciaProcesso, ContagemFase
+
+
+class Coluna:
+    """Uma fase do quadro com os cartões carregados e a URL da próxima página"""
+
+    def __init__(self, fase, cartoes, total, proximo_cursor=None):
+        self.fase = fase
+        self.cartoes = cartoes
+        self.total = total
+        self.proximo_cursor = proximo_cursor
+
+    @property
+    def proximo_url(self):
+        if not self.proximo_cursor:
+            return None
+        url = reverse('processos:quadro_coluna', args=[self.fase.tipo_processo_id, self.fase.id])
+        return f"{url}?{urlencode({'cursor': self.proximo_cursor})}"
+
+
+def cartoes(queryset):
+    """Só as colunas exibidas nos cartões"""
+    return queryset.select_related('responsavel_atual').only(
+        'id', 'numero', 'tipo_processo_id', 'fase_atual_id', 'criado_em',
+        'responsavel_atual__username', 'responsavel_atual__first_name', 'responsavel_atual__last_name',
+    )
+
+
+def _cursor(cartao):
+    return codificar_cursor([cartao.criado_em.isoformat(), cartao.pk], 'p')
+
+
+def colunas(tipo_processo):
+    """
+    Colunas do quadro em 3 consultas: fases, contagens mantidas por fase
+    (ContagemFase, sem COUNT) e os cartões de todas as fases
+    """
+    por_coluna = settings.PROCESSOS_QUADRO_POR_COLUNA
+    fases = list(Fase.objects.filter(tipo_processo=tipo_processo).order_by('ordem', 'id'))
+    totais = dict(
+        ContagemFase.objects.filter(tipo_processo=tipo_processo).order_by().values_list('fase_id', 'total')
+    )
+
+    por_fase = {fase.id: [] for fase in fases}
+    recentes = cartoes(InstanciaProcesso.objects.filter(fase_atual_id__in=por_fase)).annotate(
+        posicao=Window(
+            RowNumber(),
+            partition_by=F('fase_atual_id'),
+            order_by=[F('criado_em').desc(), F('id').desc()],
+        )
+    ).filter(posicao__lte=por_coluna + 1).order_by('-criado_em', '-id')
+    for cartao in recentes:
+        por_fase[cartao.fase_atual_id].append(cartao)
+
+    resultado = []
+    for fase in fases:
+        itens = por_fase[fase.id]
+        proximo = _cursor(itens[por_coluna - 1]) if len(itens) > por_coluna else None
+        resultado.append(Coluna(fase, itens[:por_coluna], totais.get(fase.id, 0), proximo))
+    return resultado
+
+
+def pagina_coluna(fase, cursor=None):
+    """
+    Próxima página de uma coluna (levanta CursorInvalido)
+    Retorna a Coluna só com os cartões da página
+    """
+    processos = cartoes(InstanciaProcesso.objects.filter(fase_atual=fase))
+    pagina = PaginadorCursor(processos, por_pagina=settings.PROCESSOS_QUADRO_POR_COLUNA).pagina(cursor)
+    return Coluna(fase, pagina.object_list, None, pagina.proximo_cursor)
+
+
+def serializar_cartao(cartao):
+    responsavel = cartao.responsavel_atual
+    return {
+        'id': cartao.id,
+        'numero': cartao.numero,
+        'fase': cartao.fase_atual_id,
+        'responsavel': (responsavel.get_full_name() or responsavel.username) if responsavel else None,
+        'criado_em': cartao.criado_em.isoformat(),
+        'url': reverse('processos:detalhes', args=[cartao.id]),
+    }
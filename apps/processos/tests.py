@@ -1,3 +1,104 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from apps.core.models import TipoProcesso, Fase
+from apps.processos.models import InstanciaProcesso, ContagemFase
+from apps.workflow.services import WorkflowService
+
+CACHE_ISOLADO = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+ESTATICOS_SEM_MANIFESTO = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+
+@override_settings(CACHES=CACHE_ISOLADO)
+class ContagemFaseTest(TestCase):
+    """A contagem incremental acompanha criação, mudanças de fase e exclusão"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_superuser('contagem', password='contagem')
+        self.tipos = []
+        for letra in 'AB':
+            tipo = TipoProcesso.objects.create(
+                nome=f'Contagem {letra}', descricao='Contagem', prefixo_numero=f'CNT{letra}'
+            )
+            fases = [
+                Fase.objects.create(
+                    tipo_processo=tipo, nome=f'Fase {ordem}', ordem=ordem,
+                    fase_inicial=ordem == 1, fase_final=ordem == 3
+                )
+                for ordem in range(1, 4)
+            ]
+            self.tipos.append((tipo, fases))
+
+    def estatisticas(self):
+        resultado = {}
+        for tipo, _ in self.tipos:
+            estatisticas = ContagemFase.estatisticas(tipo_processo_id=tipo.id)
+            resultado[tipo.id] = (
+                estatisticas['total'],
+                sorted((item['fase_atual__nome'], item['count']) for item in estatisticas['por_fase']),
+            )
+        return resultado
+
+    def test_contagem_igual_a_reconciliacao(self):
+        (tipo_a, fases_a), (tipo_b, fases_b) = self.tipos
+        avulsos = [
+            WorkflowService.criar_processo(tipo_a, fases_a[0], {}, usuario=self.usuario) for _ in range(3)
+        ]
+        lote_a = WorkflowService.criar_processos_em_lote(tipo_a, fases_a[0], [{}] * 10, usuario=self.usuario)
+        lote_b = WorkflowService.criar_processos_em_lote(tipo_b, fases_b[0], [{}] * 6, usuario=self.usuario)
+
+        WorkflowService.transicionar_fase(avulsos[0], fases_a[1], self.usuario)
+        WorkflowService.transicionar_fase(avulsos[0], fases_a[2], self.usuario)
+        WorkflowService.transicionar_em_lote(lote_a[:6], fases_a[1], self.usuario)
+        # Processos de outro tipo e já na fase de destino falham sem alterar a contagem
+        resultados = WorkflowService.transicionar_em_lote(
+            lote_a[:8] + lote_b[:2], fases_a[2], self.usuario
+        )
+        self.assertEqual(sum(1 for _, sucesso, _ in resultados if sucesso), 8)
+        WorkflowService.transicionar_em_lote(lote_b, fases_b[1], self.usuario)
+
+        avulsos[1].delete()
+        InstanciaProcesso.objects.filter(id__in=[p.id for p in lote_a[:2] + lote_b[-1:]]).delete()
+
+        incremental = self.estatisticas()
+        self.assertEqual(ContagemFase.reconciliar(), [])
+        self.assertEqual(self.estatisticas(), incremental)
+        self.assertEqual(incremental[tipo_a.id][0], InstanciaProcesso.objects.filter(tipo_processo=tipo_a).count())
+        self.assertEqual(incremental[tipo_b.id], (5, [('Fase 2', 5)]))
+
+    def test_reconciliar_corrige_divergencia(self):
+        tipo, fases = self.tipos[0]
+        WorkflowService.criar_processos_em_lote(tipo, fases[0], [{}] * 4, usuario=self.usuario)
+        ContagemFase.objects.filter(fase=fases[0]).update(total=1)
+        ContagemFase.ajustar({fases[1].id: -2})
+
+        self.assertEqual(ContagemFase.objects.get(fase=fases[1]).total, 0)
+        self.assertEqual(ContagemFase.reconciliar(), [(fases[0].id, 1, 4)])
+        self.assertEqual(ContagemFase.estatisticas(tipo_processo_id=tipo.id)['total'], 4)
+
+
+@override_settings(CACHES=CACHE_ISOLADO, STATICFILES_STORAGE=ESTATICOS_SEM_MANIFESTO)
+class PaginacaoListaTest(TestCase):
+    """Cursor só quando ligado; links com ?page= continuam por número de página"""
+
+    def setUp(self):
+        self.cliente = Client()
+        self.cliente.force_login(User.objects.create_superuser('lista', password='lista'))
+        tipo = TipoProcesso.objects.create(nome='Lista', descricao='Lista', prefixo_numero='LST')
+        fase = Fase.objects.create(tipo_processo=tipo, nome='Entrada', ordem=1, fase_inicial=True)
+        WorkflowService.criar_processos_em_lote(tipo, fase, [{}] * 25, usuario=User.objects.get())
+
+    def modo(self, **parametros):
+        resposta = self.cliente.get(reverse('processos:lista'), parametros)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.context['paginacao_cursor'], len(resposta.context['page_obj'])
+
+    def test_padrao_por_numero_de_pagina(self):
+        self.assertEqual(self.modo(), (False, 20))
+        self.assertEqual(self.modo(page=2), (False, 5))
+
+    @override_settings(PROCESSOS_PAGINACAO_CURSOR=True)
+    def test_cursor_ligado_aceita_links_antigos(self):
+        self.assertEqual(self.modo(), (True, 20))
+        self.assertEqual(self.modo(page=2), (False, 5))
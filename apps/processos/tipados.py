@@ -0,0 +1,141 @@
+"""
+Valores tipados dos campos numéricos e de data
+Os dados do formulário ficam como texto em InstanciaProcesso.dados; para os
+campos 'number' e 'date' uma cópia convertida é gravada em ValorTipado na
+mesma transação da criação e da edição. Filtros de intervalo e ordenação por
+esses campos consultam os índices (campo, valor) dessa tabela
+"""
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Exists, F, FilteredRelation, OuterRef, Q
+
+from apps.core.esquema import obter_esquema
+from .models import ValorTipado
+
+# Coluna de ValorTipado de cada tipo de campo
+COLUNAS = {'number': 'valor_numero', 'date': 'valor_data'}
+
+FORMATOS_DATA = ('%Y-%m-%d', '%d/%m/%Y')
+# Limite de DecimalField(max_digits=20, decimal_places=6)
+LIMITE_NUMERO = Decimal(10) ** 14
+
+
+def converter(tipo_campo, valor):
+    """Decimal ou date do texto do formulário; None se vazio ou inválido"""
+    texto = str(valor).strip() if valor is not None else ''
+    if not texto:
+        return None
+
+    if tipo_campo == 'number':
+        # Aceita "1234.56" e o formato brasileiro "1.234,56"
+        if ',' in texto:
+            texto = texto.replace('.', '').replace(',', '.')
+        try:
+            numero = Decimal(texto)
+        except InvalidOperation:
+            return None
+        if not numero.is_finite() or abs(numero) >= LIMITE_NUMERO:
+            return None
+        return numero
+
+    if tipo_campo == 'date':
+        for formato in FORMATOS_DATA:
+            try:
+                return datetime.strptime(texto, formato).date()
+            except ValueError:
+                continue
+    return None
+
+
+def campos_tipados(tipo_processo_id):
+    """Campos numéricos e de data do tipo, na ordem do esquema"""
+    return [campo for campo in obter_esquema(tipo_processo_id).campos if campo.tipo_campo in COLUNAS]
+
+
+def construir_valores(instancia):
+    """ValorTipado (não salvos) dos campos tipados preenchidos do processo"""
+    valores = []
+    for campo in campos_tipados(instancia.tipo_processo_id):
+        texto = instancia.dados.get(campo.nome_campo)
+        valor = converter(campo.tipo_campo, texto)
+        if valor is None:
+            continue
+        valores.append(ValorTipado(
+            instancia_processo=instancia,
+            campo_id=campo.id,
+            valor_texto=str(texto)[:255],
+            **{COLUNAS[campo.tipo_campo]: valor},
+        ))
+    return valores
+
+
+def atualizar_valores(instancias, batch_size=500, novos=False):
+    """
+    Regrava os valores tipados dos processos
+    novos=True pula a remoção (processos recém-criados)
+    """
+    if not novos:
+        ValorTipado.objects.filter(instancia_processo__in=instancias).delete()
+    ValorTipado.objects.bulk_create(
+        [valor for instancia in instancias for valor in construir_valores(instancia)],
+        batch_size=batch_size,
+    )
+
+
+def altera_tipados(instancia, nomes_campos):
+    """Se algum dos campos alterados é numérico ou de data"""
+    nomes = {campo.nome_campo for campo in campos_tipados(instancia.tipo_processo_id)}
+    return not nomes.isdisjoint(nomes_campos)
+
+
+def filtrar_intervalos(processos, tipo_processo_id, intervalos):
+    """
+    Filtra por intervalo nos campos tipados do tipo
+    intervalos: {nome_campo: (de, ate)} com textos (vazios são ignorados)
+    Cada campo vira um EXISTS sobre o índice (campo, valor, processo)
+    """
+    campos = {campo.nome_campo: campo for campo in campos_tipados(tipo_processo_id)}
+    for nome_campo, (de, ate) in intervalos.items():
+        campo = campos.get(nome_campo)
+        if campo is None:
+            continue
+        coluna = COLUNAS[campo.tipo_campo]
+        condicoes = {}
+        inicio, fim = converter(campo.tipo_campo, de), converter(campo.tipo_campo, ate)
+        if inicio is not None:
+            condicoes[f'{coluna}__gte'] = inicio
+        if fim is not None:
+            condicoes[f'{coluna}__lte'] = fim
+        if not condicoes:
+            continue
+        processos = processos.filter(
+            Exists(ValorTipado.objects.filter(
+                instancia_processo=OuterRef('pk'), campo_id=campo.id, **condicoes
+            ))
+        )
+    return processos
+
+
+def ordenar_por_campo(processos, tipo_processo_id, ordem):
+    """
+    Anota o valor do campo tipado em 'valor_ordem' para a ordenação
+    ordem: nome_campo (crescente) ou -nome_campo (decrescente)
+    Processos sem valor no campo ficam de fora (junção interna com o índice)
+    Retorna (queryset, descendente, conversor do cursor) ou None se a ordem
+    não é um campo tipado do tipo
+    """
+    descendente = ordem.startswith('-')
+    campo = next(
+        (c for c in campos_tipados(tipo_processo_id) if c.nome_campo == ordem.lstrip('-')), None
+    )
+    if campo is None:
+        return None
+
+    coluna = COLUNAS[campo.tipo_campo]
+    processos = processos.annotate(
+        valor_campo=FilteredRelation('valores_tipados', condition=Q(valores_tipados__campo_id=campo.id)),
+        valor_ordem=F(f'valor_campo__{coluna}'),
+    ).filter(valor_ordem__isnull=False)
+    conversor = Decimal if campo.tipo_campo == 'number' else date.fromisoformat
+    return processos, descendente, conversor
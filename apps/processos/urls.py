@@ -5,8 +5,16 @@ app_name = 'processos'
 
 urlpatterns = [
     path('', views.lista_processos, name='lista'),
+    path('exportar/', views.exportar_processos, name='exportar'),
+    path('eventos/', views.eventos_processos, name='eventos'),
+    path('mudar-fase-lote/', views.mudar_fase_lote, name='mudar_fase_lote'),
+    path('quadro/<int:tipo_id>/', views.quadro_processos, name='quadro'),
+    path('quadro/<int:tipo_id>/fases/<int:fase_id>/', views.quadro_coluna, name='quadro_coluna'),
     path('<int:processo_id>/', views.detalhes_processo, name='detalhes'),
+    path('<int:processo_id>/historico/', views.historico_processo, name='historico'),
+    path('<int:processo_id>/comparar/', views.comparar_estados_processo, name='comparar'),
     path('<int:processo_id>/mudar-fase/', views.mudar_fase, name='mudar_fase'),
+    path('<int:processo_id>/mover/', views.mover_processo, name='mover'),
     path('<int:processo_id>/atribuir/', views.atribuir_responsavel, name='atribuir_responsavel'),
     path('<int:processo_id>/comentario/', views.adicionar_comentario, name='adicionar_comentario'),
     path('<int:processo_id>/editar/', views.editar_dados, name='editar_dados'),
@@ -1,15 +1,37 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Count
+from django.db.models import Count, OuterRef, Subquery
 from django.core.paginator import Paginator
-from .models import InstanciaProcesso
+from django.conf import settings
+from .models import InstanciaProcesso, ContagemFase
+from .filtros import filtros_da_requisicao, filtrar_processos
+from .indices import campos_indexados
+from .tipados import campos_tipados, ordenar_por_campo
+from . import condicional, exportacao, quadro
 from apps.core.models import TipoProcesso, Fase
+from apps.core.paginacao import (
+    PaginadorCursor, CursorInvalido, contagem_aproximada, paginar_sequencia,
+)
+from apps.core.desempenho import orcamento_consultas
 from apps.workflow.services import WorkflowService
-from django.http import JsonResponse
+from apps.workflow import eventos
+from apps.usuarios.permissoes import fases_autorizadas
+from apps.auditoria import arquivamento
+from apps.auditoria.estado import estado_em, comparar_estados
+from apps.auditoria.models import HistoricoProcesso
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 from django.views.decorators.http import require_POST
 
 
+@orcamento_consultas(12)
 @login_required
 def lista_processos(request):
     """Lista todos os processos com filtros"""
@@ -17,71 +39,198 @@ def lista_processos(request):
         'tipo_processo', 'fase_atual', 'responsavel_atual', 'criado_por'
     ).all()
     
-    # Filtros
-    tipo_id = request.GET.get('tipo')
-    fase_id = request.GET.get('fase')
-    setor = request.GET.get('setor')
-    responsavel_id = request.GET.get('responsavel')
-    busca = request.GET.get('busca')
-    
-    if tipo_id:
-        processos = processos.filter(tipo_processo_id=tipo_id)
-    
-    if fase_id:
-        processos = processos.filter(fase_atual_id=fase_id)
-    
-    if setor:
-        processos = processos.filter(fase_atual__setor_responsavel=setor)
-    
-    if responsavel_id:
-        processos = processos.filter(responsavel_atual_id=responsavel_id)
-    
-    if busca:
-        processos = processos.filter(
-            Q(numero__icontains=busca) |
-            Q(dados__icontains=busca)
+    # Filtros (os mesmos da exportação)
+    filtros = filtros_da_requisicao(request)
+    
+    # GET condicional: sem alterações no tipo desde a última visita, 304
+    # sem consultar os processos
+    etag = condicional.etag_lista(request, filtros['tipo'])
+    resposta = condicional.nao_modificado(request, etag)
+    if resposta:
+        return resposta
+    
+    processos = filtrar_processos(processos, filtros)
+    tipo_id, fase_id, setor = filtros['tipo'], filtros['fase'], filtros['setor']
+    responsavel_id, busca = filtros['responsavel'], filtros['busca']
+    
+    # Ordenação por um campo numérico ou de data do tipo (só processos com valor)
+    ordem = request.GET.get('ordem') or ''
+    ordenacao = ordenar_por_campo(processos, tipo_id, ordem) if tipo_id and ordem else None
+    if ordenacao:
+        processos, descendente, conversor = ordenacao
+    
+    # Estatísticas: sem filtros ad-hoc (responsável/busca) vêm da contagem
+    # mantida por fase; caso contrário são agregadas sobre o filtro
+    if responsavel_id or busca or filtros['dados'] or filtros['intervalos'] or ordenacao:
+        aproximado = settings.PROCESSOS_CONTAGEM_APROXIMADA
+        stats = {
+            'total': contagem_aproximada(processos) if aproximado else processos.count(),
+            'aproximado': aproximado,
+            'por_fase': processos.values('fase_atual__nome').annotate(
+                count=Count('id')
+            ).order_by('-count')[:5]
+        }
+    else:
+        stats = ContagemFase.estatisticas(
+            tipo_processo_id=tipo_id,
+            fase_id=fase_id,
+            setor=setor
         )
     
-    # Paginação
-    paginator = Paginator(processos, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginação: por cursor (-criado_em, -id) ou por número de página,
+    # reaproveitando o total já calculado; ?page= (links antigos) usa número de página
+    cursor = request.GET.get('cursor')
+    paginacao_cursor = bool(cursor) or (settings.PROCESSOS_PAGINACAO_CURSOR and 'page' not in request.GET)
+    if paginacao_cursor:
+        if ordenacao:
+            paginador = PaginadorCursor(
+                processos, por_pagina=20, campo='valor_ordem', descendente=descendente, conversor=conversor
+            )
+        else:
+            paginador = PaginadorCursor(processos, por_pagina=20)
+        try:
+            page_obj = paginador.pagina(cursor)
+        except CursorInvalido:
+            page_obj = paginador.pagina()
+    else:
+        if ordenacao:
+            processos = processos.order_by(*(['-valor_ordem', '-id'] if descendente else ['valor_ordem', 'id']))
+        paginator = Paginator(processos, 20)
+        paginator.count = stats['total']
+        page_obj = paginator.get_page(request.GET.get('page'))
+    
+    # Filtros atuais para os links de paginação
+    parametros = request.GET.copy()
+    parametros.pop('cursor', None)
+    parametros.pop('page', None)
     
     # Dados para filtros
     tipos_processo = TipoProcesso.objects.filter(ativo=True)
     fases = Fase.objects.all()
-    
-    # Estatísticas
-    stats = {
-        'total': processos.count(),
-        'por_fase': processos.values('fase_atual__nome').annotate(
-            count=Count('id')
-        ).order_by('-count')[:5]
-    }
+    filtros_dados = [
+        {
+            'parametro': f'dado_{campo.nome_campo}',
+            'label': campo.label,
+            'valor': filtros['dados'].get(campo.nome_campo, ''),
+            'opcoes': [
+                (opcao['value'], opcao['label']) if isinstance(opcao, dict) else (opcao, opcao)
+                for opcao in (campo.opcoes or [])
+            ] if campo.tipo_campo in ('select', 'radio') else [],
+        }
+        for campo in campos_indexados(tipo_id)
+    ] if tipo_id else []
+    campos_intervalo = campos_tipados(tipo_id) if tipo_id else []
+    filtros_intervalo = [
+        {
+            'nome': campo.nome_campo,
+            'label': campo.label,
+            'tipo_input': campo.tipo_campo,
+            'de': filtros['intervalos'].get(campo.nome_campo, ('', ''))[0],
+            'ate': filtros['intervalos'].get(campo.nome_campo, ('', ''))[1],
+        }
+        for campo in campos_intervalo
+    ]
+    opcoes_ordem = [
+        opcao
+        for campo in campos_intervalo
+        for opcao in (
+            (campo.nome_campo, f'{campo.label} (crescente)'),
+            (f'-{campo.nome_campo}', f'{campo.label} (decrescente)'),
+        )
+    ]
     
     context = {
         'page_obj': page_obj,
+        'paginacao_cursor': paginacao_cursor,
+        'parametros_filtro': parametros.urlencode(),
         'tipos_processo': tipos_processo,
         'fases': fases,
+        'filtros_dados': filtros_dados,
+        'filtros_intervalo': filtros_intervalo,
+        'opcoes_ordem': opcoes_ordem,
+        'ordem': ordem if ordenacao else '',
         'stats': stats,
-        'filtros': {
-            'tipo': tipo_id,
-            'fase': fase_id,
-            'setor': setor,
-            'responsavel': responsavel_id,
-            'busca': busca,
-        }
+        'filtros': filtros,
     }
     
-    return render(request, 'processos/lista.html', context)
+    return condicional.com_validador(render(request, 'processos/lista.html', context), etag)
+
+
+def _usuario_autenticado(request):
+    return request.user if request.user.is_authenticated else None
+
+
+@orcamento_consultas(5)
+async def eventos_processos(request):
+    """
+    Stream SSE das alterações dos processos nas fases visíveis ao usuário
+    (parâmetro opcional tipo). Exige o servidor ASGI (config.asgi): no WSGI
+    cada conexão prenderia um worker
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'erro': 'Eventos ao vivo exigem o servidor ASGI (config.asgi)'}, status=501)
+    
+    usuario = await sync_to_async(_usuario_autenticado)(request)
+    if usuario is None:
+        return JsonResponse({'erro': 'Autenticação necessária'}, status=401)
+    fases = None if usuario.is_superuser else await sync_to_async(fases_autorizadas)(usuario)
+    tipo = request.GET.get('tipo') or ''
+    
+    response = StreamingHttpResponse(
+        eventos.fluxo(fases, int(tipo) if tipo.isdigit() else None),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Sem buffer no proxy (nginx), para que cada evento chegue na hora
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Processos por requisição em mudar_fase_lote
+LIMITE_LOTE = 500
+
+FORMATOS_EXPORTACAO = {
+    'csv': (exportacao.gerar_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (
+        exportacao.gerar_xlsx,
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    ),
+}
+
+
+@orcamento_consultas(7)
+@login_required
+def exportar_processos(request):
+    """Exporta a listagem filtrada (mesmos filtros da lista) em CSV ou XLSX"""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS_EXPORTACAO:
+        formato = 'csv'
+    gerar, content_type = FORMATOS_EXPORTACAO[formato]
 
+    filtros = filtros_da_requisicao(request)
+    processos = filtrar_processos(InstanciaProcesso.objects.all(), filtros)
+    campos = exportacao.campos_exportados(filtros['tipo'])
 
+    response = StreamingHttpResponse(gerar(processos, campos), content_type=content_type)
+    nome = f"processos-{timezone.localtime():%Y%m%d-%H%M}.{formato}"
+    response['Content-Disposition'] = f'attachment; filename="{nome}"'
+    return response
+
+
+@orcamento_consultas(13)
 @login_required
 def detalhes_processo(request, processo_id):
     """Exibe detalhes completos de um processo"""
+    # Evento mais recente e total do histórico validam o GET condicional
+    eventos = HistoricoProcesso.objects.filter(instancia_processo=OuterRef('pk'))
     processo = get_object_or_404(
         InstanciaProcesso.objects.select_related(
             'tipo_processo', 'fase_atual', 'responsavel_atual', 'criado_por'
+        ).annotate(
+            ultimo_evento=Subquery(eventos.order_by('-criado_em').values('criado_em')[:1]),
+            total_eventos=Subquery(
+                eventos.order_by().values('instancia_processo').annotate(total=Count('id')).values('total')
+            ),
         ),
         id=processo_id
     )
@@ -92,10 +241,13 @@ def detalhes_processo(request, processo_id):
             messages.error(request, 'Você não tem permissão para acessar este processo.')
             return redirect('processos:lista')
     
-    # Histórico
-    historico = processo.historico.select_related(
-        'usuario', 'fase_anterior', 'fase_nova'
-    ).all()
+    etag = condicional.etag_processo(request, processo)
+    resposta = condicional.nao_modificado(request, etag)
+    if resposta:
+        return resposta
+    
+    # Histórico: só a página mais recente; as anteriores vêm de historico_processo
+    historico = _pagina_historico(request, processo)
     
     # Fases disponíveis para transição
     fases_disponiveis = processo.get_fases_disponiveis(request.user)
@@ -106,13 +258,153 @@ def detalhes_processo(request, processo_id):
     context = {
         'processo': processo,
         'historico': historico,
+        'tipos_evento': HistoricoProcesso.TIPO_EVENTO_CHOICES,
         'fases_disponiveis': fases_disponiveis,
         'dados_formatados': dados_formatados,
     }
     
-    return render(request, 'processos/detalhes.html', context)
+    return condicional.com_validador(render(request, 'processos/detalhes.html', context), etag)
+
+
+def _pagina_historico(request, processo, cursor=None):
+    """
+    Página do histórico a partir do cursor, conforme os parâmetros tipo_evento e arquivado
+    Eventos do banco são paginados por (-criado_em, -id); ao fim deles, os
+    eventos arquivados (sempre mais antigos) são lidos dos segmentos
+    Levanta CursorInvalido se o cursor não for válido
+    """
+    por_pagina = settings.PROCESSOS_HISTORICO_POR_PAGINA
+    tipo_evento = request.GET.get('tipo_evento', '')
+    arquivado = request.GET.get('arquivado') == '1'
+    
+    if arquivado:
+        eventos = arquivamento.eventos_arquivados(processo)
+        if tipo_evento:
+            eventos = [e for e in eventos if e.tipo_evento == tipo_evento]
+        pagina = paginar_sequencia(eventos, cursor, por_pagina)
+    else:
+        eventos = processo.historico.select_related('usuario', 'fase_anterior', 'fase_nova')
+        if tipo_evento:
+            eventos = eventos.filter(tipo_evento=tipo_evento)
+        pagina = PaginadorCursor(eventos, por_pagina=por_pagina).pagina(cursor)
+    
+    parametros = {'tipo_evento': tipo_evento} if tipo_evento else {}
+    url_base = reverse('processos:historico', args=[processo.id])
+    pagina.proximo_url = None
+    pagina.arquivado_url = None
+    pagina.total_arquivado = 0
+    if pagina.has_next():
+        pagina.proximo_url = f"{url_base}?{urlencode({**parametros, 'cursor': pagina.proximo_cursor, 'arquivado': int(arquivado)})}"
+    elif not arquivado:
+        # Fim dos eventos do banco: oferece os arquivados, se houver
+        pagina.total_arquivado = arquivamento.total_arquivado(processo)
+        if pagina.total_arquivado:
+            pagina.arquivado_url = f"{url_base}?{urlencode({**parametros, 'arquivado': 1})}"
+    return pagina
+
+
+def _serializar_evento(evento):
+    return {
+        'id': evento.id,
+        'tipo_evento': evento.tipo_evento,
+        'tipo_evento_display': evento.get_tipo_evento_display(),
+        'criado_em': evento.criado_em.isoformat(),
+        'fase_anterior': {'id': evento.fase_anterior.id, 'nome': evento.fase_anterior.nome} if evento.fase_anterior else None,
+        'fase_nova': {'id': evento.fase_nova.id, 'nome': evento.fase_nova.nome} if evento.fase_nova else None,
+        'usuario': {
+            'id': evento.usuario.id,
+            'nome': evento.usuario.get_full_name() or evento.usuario.username,
+        } if evento.usuario else None,
+        'observacoes': evento.observacoes,
+        'dados_alterados': evento.dados_alterados,
+        'arquivado': getattr(evento, 'arquivado', False),
+    }
+
+
+@orcamento_consultas(8)
+@login_required
+def historico_processo(request, processo_id):
+    """
+    Páginas do histórico de um processo (JSON ou fragmento HTML com ?formato=html)
+    Parâmetros: cursor, tipo_evento, arquivado=1
+    """
+    processo = get_object_or_404(
+        InstanciaProcesso.objects.select_related('fase_atual'),
+        id=processo_id
+    )
+    
+    if not processo._usuario_tem_permissao_fase(request.user, processo.fase_atual):
+        if not request.user.is_superuser:
+            return JsonResponse({'erro': 'Você não tem permissão para acessar este processo.'}, status=403)
+    
+    try:
+        pagina = _pagina_historico(request, processo, request.GET.get('cursor'))
+    except CursorInvalido as e:
+        return JsonResponse({'erro': str(e)}, status=400)
+    except arquivamento.SegmentoCorrompido as e:
+        return JsonResponse({'erro': f'Não foi possível ler o histórico arquivado: {e}'}, status=500)
+    
+    if request.GET.get('formato') == 'html':
+        return render(request, 'processos/_historico_itens.html', {'historico': pagina})
+    
+    return JsonResponse({
+        'eventos': [_serializar_evento(evento) for evento in pagina],
+        'proximo_cursor': pagina.proximo_cursor,
+        'proximo_url': pagina.proximo_url,
+        'arquivado_url': pagina.arquivado_url,
+        'total_arquivado': pagina.total_arquivado,
+    })
+
+
+def _instante(valor, padrao):
+    """Data/hora de um campo datetime-local (fuso do projeto), ou o padrão"""
+    momento = parse_datetime(valor or '')
+    if momento is None:
+        return padrao
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+@orcamento_consultas(18)
+@login_required
+def comparar_estados_processo(request, processo_id):
+    """Compara o estado do processo (dados, fase e responsável) em dois instantes"""
+    processo = get_object_or_404(
+        InstanciaProcesso.objects.select_related('tipo_processo', 'fase_atual', 'responsavel_atual'),
+        id=processo_id
+    )
+    
+    if not processo._usuario_tem_permissao_fase(request.user, processo.fase_atual):
+        if not request.user.is_superuser:
+            messages.error(request, 'Você não tem permissão para acessar este processo.')
+            return redirect('processos:lista')
+    
+    de, ate = sorted([
+        max(_instante(request.GET.get('de'), processo.criado_em), processo.criado_em),
+        max(_instante(request.GET.get('ate'), timezone.now()), processo.criado_em),
+    ])
+    
+    try:
+        estado_de = estado_em(processo, de)
+        estado_ate = estado_em(processo, ate)
+    except arquivamento.SegmentoCorrompido as e:
+        messages.error(request, f'Não foi possível ler o histórico arquivado: {e}')
+        return redirect('processos:detalhes', processo_id=processo.id)
+    
+    context = {
+        'processo': processo,
+        'de': de,
+        'ate': ate,
+        'estado_de': estado_de,
+        'estado_ate': estado_ate,
+        'diferencas': comparar_estados(processo, estado_de, estado_ate),
+    }
+    
+    return render(request, 'processos/comparar.html', context)
 
 
+@orcamento_consultas(20)
 @login_required
 @require_POST
 def mudar_fase(request, processo_id):
@@ -143,6 +435,133 @@ def mudar_fase(request, processo_id):
     return redirect('processos:detalhes', processo_id=processo_id)
 
 
+@orcamento_consultas(24)
+@login_required
+@require_POST
+def mudar_fase_lote(request):
+    """
+    Move vários processos para uma fase (JSON)
+    POST: processos=<id>&processos=<id>...&nova_fase=<id>&observacoes=...
+    """
+    ids = request.POST.getlist('processos')
+    nova_fase_id = request.POST.get('nova_fase', '')
+    observacoes = request.POST.get('observacoes', '')
+    
+    if not ids or not nova_fase_id.isdigit() or not all(i.isdigit() for i in ids):
+        return JsonResponse({'erro': 'Informe os processos e a nova fase.'}, status=400)
+    if len(ids) > LIMITE_LOTE:
+        return JsonResponse({'erro': f'Mova no máximo {LIMITE_LOTE} processos por vez.'}, status=400)
+    
+    nova_fase = get_object_or_404(Fase, id=nova_fase_id)
+    processos = InstanciaProcesso.objects.filter(id__in=ids)
+    
+    resultados = WorkflowService.transicionar_em_lote(
+        instancias=processos,
+        nova_fase=nova_fase,
+        usuario=request.user,
+        observacoes=observacoes
+    )
+    
+    encontrados = {instancia.id for instancia, _, _ in resultados}
+    nao_encontrados = [i for i in dict.fromkeys(ids) if int(i) not in encontrados]
+    
+    return JsonResponse({
+        'sucesso': sum(1 for _, sucesso, _ in resultados if sucesso),
+        'falhas': sum(1 for _, sucesso, _ in resultados if not sucesso) + len(nao_encontrados),
+        'resultados': [
+            {
+                'id': instancia.id,
+                'numero': instancia.numero,
+                'sucesso': sucesso,
+                'mensagem': mensagem,
+            }
+            for instancia, sucesso, mensagem in resultados
+        ] + [
+            {'id': int(i), 'numero': None, 'sucesso': False, 'mensagem': 'Processo não encontrado'}
+            for i in nao_encontrados
+        ],
+    })
+
+
+@orcamento_consultas(12)
+@login_required
+def quadro_processos(request, tipo_id):
+    """Quadro (kanban) do tipo de processo: uma coluna por fase, cartões mais recentes primeiro"""
+    tipo_processo = get_object_or_404(TipoProcesso, id=tipo_id, ativo=True)
+    
+    context = {
+        'tipo_processo': tipo_processo,
+        'tipos_processo': TipoProcesso.objects.filter(ativo=True),
+        'colunas': quadro.colunas(tipo_processo),
+        # Colunas em que o usuário pode soltar cartões (o servidor valida de novo)
+        'fases_usuario': fases_autorizadas(request.user),
+    }
+    
+    return render(request, 'processos/quadro.html', context)
+
+
+@orcamento_consultas(6)
+@login_required
+def quadro_coluna(request, tipo_id, fase_id):
+    """
+    Próxima página de cartões de uma coluna do quadro
+    (JSON ou fragmento HTML com ?formato=html). Parâmetro: cursor
+    """
+    fase = get_object_or_404(Fase, id=fase_id, tipo_processo_id=tipo_id)
+    
+    try:
+        coluna = quadro.pagina_coluna(fase, request.GET.get('cursor'))
+    except CursorInvalido as e:
+        return JsonResponse({'erro': str(e)}, status=400)
+    
+    if request.GET.get('formato') == 'html':
+        return render(request, 'processos/_quadro_cartoes.html', {'coluna': coluna})
+    
+    return JsonResponse({
+        'cartoes': [quadro.serializar_cartao(cartao) for cartao in coluna.cartoes],
+        'proximo_cursor': coluna.proximo_cursor,
+        'proximo_url': coluna.proximo_url,
+    })
+
+
+@orcamento_consultas(24)
+@login_required
+@require_POST
+def mover_processo(request, processo_id):
+    """
+    Muda a fase de um processo pelo quadro (JSON)
+    POST: nova_fase=<id>&observacoes=...
+    Responde só com o cartão alterado (dados e HTML), sem recarregar o quadro
+    """
+    processo = get_object_or_404(
+        InstanciaProcesso.objects.select_related('fase_atual', 'responsavel_atual'),
+        id=processo_id
+    )
+    nova_fase_id = request.POST.get('nova_fase', '')
+    
+    if not nova_fase_id.isdigit():
+        return JsonResponse({'erro': 'Informe a nova fase.'}, status=400)
+    
+    nova_fase = get_object_or_404(Fase, id=nova_fase_id)
+    
+    sucesso, mensagem = WorkflowService.transicionar_fase(
+        instancia=processo,
+        nova_fase=nova_fase,
+        usuario=request.user,
+        observacoes=request.POST.get('observacoes', '')
+    )
+    
+    if not sucesso:
+        return JsonResponse({'erro': mensagem, 'fase': processo.fase_atual_id}, status=400)
+    
+    return JsonResponse({
+        'mensagem': mensagem,
+        'cartao': quadro.serializar_cartao(processo),
+        'html': render_to_string('processos/_quadro_cartao.html', {'cartao': processo}, request=request),
+    })
+
+
+@orcamento_consultas(10)
 @login_required
 @require_POST
 def atribuir_responsavel(request, processo_id):
@@ -174,6 +593,7 @@ def atribuir_responsavel(request, processo_id):
     return redirect('processos:detalhes', processo_id=processo_id)
 
 
+@orcamento_consultas(7)
 @login_required
 @require_POST
 def adicionar_comentario(request, processo_id):
@@ -195,6 +615,7 @@ def adicionar_comentario(request, processo_id):
     return redirect('processos:detalhes', processo_id=processo_id)
 
 
+@orcamento_consultas(16)
 @login_required
 def editar_dados(request, processo_id):
     """Edita os dados do formulário do processo"""
@@ -209,7 +630,7 @@ def editar_dados(request, processo_id):
     if request.method == 'POST':
         # Coleta os novos dados do formulário
         novos_dados = {}
-        for campo in processo.tipo_processo.campos.all():
+        for campo in processo.esquema.campos:
             valor = request.POST.get(campo.nome_campo)
             if valor is not None:
                 novos_dados[campo.nome_campo] = valor
@@ -230,7 +651,7 @@ def editar_dados(request, processo_id):
             messages.error(request, mensagem)
     
     # GET - exibe formulário de edição
-    campos = processo.tipo_processo.campos.all().order_by('grupo', 'ordem')
+    campos = processo.esquema.campos_formulario
     
     context = {
         'processo': processo,
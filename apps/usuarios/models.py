@@ -1,7 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from apps.core.models import Fase
+from apps.usuarios.permissoes import invalidar_permissoes, invalidar_permissoes_usuario
 
 
 class PerfilUsuario(models.Model):
@@ -68,3 +70,28 @@ def salvar_perfil_usuario(sender, instance, **kwargs):
     """Salva o perfil quando o usuário é salvo"""
     if hasattr(instance, 'perfilusuario'):
         instance.perfilusuario.save()
+
+
+@receiver(post_save, sender=User)
+def invalidar_permissoes_conta(sender, instance, **kwargs):
+    """Recalcula as fases do usuário quando a conta muda (ex: is_superuser)"""
+    invalidar_permissoes_usuario(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=PerfilUsuario)
+def invalidar_permissoes_perfil(sender, instance, **kwargs):
+    """Recalcula as fases do usuário quando o setor do perfil muda"""
+    invalidar_permissoes_usuario(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Fase)
+def invalidar_permissoes_fase(sender, instance, **kwargs):
+    """Recalcula as fases de todos os usuários quando uma fase muda"""
+    invalidar_permissoes()
+
+
+@receiver(m2m_changed, sender=Fase.usuarios_autorizados.through)
+def invalidar_permissoes_usuarios_autorizados(sender, action, **kwargs):
+    """Recalcula as fases de todos os usuários quando a lista de autorizados muda"""
+    if action.startswith('post_'):
+        invalidar_permissoes()
@@ -0,0 +1,90 @@
+"""
+Resolução de permissões de usuários por fase
+Calcula, uma vez por usuário, o conjunto de fases (de todos os tipos de
+processo) em que ele pode atuar, e guarda o resultado no cache do Django.
+O resultado é validado por dois carimbos no banco (apps.core.versoes): o de
+todos os usuários, trocado pelos signals de Fase e usuários autorizados, e o
+do usuário, trocado pelos signals de User e PerfilUsuario. A verificação
+passa a ser uma consulta O(1) ao conjunto.
+"""
+from django.core.cache import cache
+
+from apps.core import versoes
+
+CHAVE_VERSAO = 'permissoes:versao'
+CHAVE_VERSAO_USUARIO = 'permissoes:versao:{}'
+CHAVE_USUARIO = 'permissoes:fases:{}:{}:{}'
+# Entradas de versões antigas deixam de ser lidas e expiram
+VALIDADE = 86400
+
+
+def versao_permissoes():
+    """Versão das permissões de todos os usuários (trocada quando fases mudam)"""
+    return versoes.obter(CHAVE_VERSAO)
+
+
+def calcular_fases_autorizadas(usuario):
+    """
+    Consulta o banco e retorna o frozenset de IDs das fases do usuário
+    - superusuário: todas as fases
+    - fases com usuários autorizados: apenas se o usuário estiver na lista
+    - demais fases: setor do perfil igual ao setor responsável, ou TODOS
+    """
+    from apps.core.models import Fase
+    from apps.usuarios.models import PerfilUsuario
+
+    if usuario.is_superuser:
+        return frozenset(Fase.objects.values_list('id', flat=True))
+
+    fases = set(Fase.objects.filter(usuarios_autorizados=usuario).values_list('id', flat=True))
+
+    setor = PerfilUsuario.objects.filter(user=usuario).values_list('setor', flat=True).first()
+    if setor is not None:
+        fases.update(Fase.objects.filter(
+            usuarios_autorizados__isnull=True,
+            setor_responsavel__in=[setor, 'TODOS']
+        ).values_list('id', flat=True))
+
+    return frozenset(fases)
+
+
+def fases_autorizadas(usuario):
+    """
+    Conjunto de IDs das fases em que o usuário pode atuar
+    Guardado no cache e memorizado no objeto do usuário (válido durante a
+    requisição)
+    """
+    if not usuario.is_authenticated:
+        return frozenset()
+
+    fases = getattr(usuario, '_fases_autorizadas', None)
+    if fases is not None:
+        return fases
+
+    chave_usuario = CHAVE_VERSAO_USUARIO.format(usuario.pk)
+    atuais = versoes.obter_varias([CHAVE_VERSAO, chave_usuario])
+    chave = CHAVE_USUARIO.format(atuais[CHAVE_VERSAO], atuais[chave_usuario], usuario.pk)
+    fases = cache.get(chave)
+    if fases is None:
+        fases = calcular_fases_autorizadas(usuario)
+        cache.set(chave, fases, VALIDADE)
+
+    usuario._fases_autorizadas = fases
+    return fases
+
+
+def usuario_tem_permissao_fase(usuario, fase_id):
+    """Verifica se o usuário pode atuar na fase"""
+    if usuario.is_superuser:
+        return True
+    return fase_id in fases_autorizadas(usuario)
+
+
+def invalidar_permissoes():
+    """Descarta as permissões calculadas de todos os usuários após o commit"""
+    versoes.trocar(CHAVE_VERSAO)
+
+
+def invalidar_permissoes_usuario(usuario_id):
+    """Descarta as permissões calculadas de um usuário após o commit"""
+    versoes.trocar(CHAVE_VERSAO_USUARIO.format(usuario_id))
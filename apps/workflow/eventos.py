@@ -0,0 +1,287 @@
+"""
+Eventos ao vivo dos processos (Server-Sent Events)
+O WorkflowService publica um evento compacto após o commit de cada criação,
+mudança de fase, atribuição, edição e comentário. O backend configurado em
+EVENTOS_BACKEND leva a mensagem a todos os workers e, em cada worker, o
+Broker a repassa para os streams SSE abertos (uma fila asyncio por conexão)
+Backends:
+- memoria: só o próprio processo (desenvolvimento, um único worker)
+- socket: datagramas Unix entre os workers da mesma máquina, um socket por
+  worker em EVENTOS_SOCKET_DIR
+- postgresql: LISTEN/NOTIFY no banco, para workers em várias máquinas
+- ou o caminho de uma classe com os métodos iniciar(entregar) e publicar(mensagem)
+"""
+import asyncio
+import atexit
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('workflow.eventos')
+
+CANAL = 'workflow_eventos'
+# Eventos por mensagem: abaixo do limite de 8000 bytes do NOTIFY
+EVENTOS_POR_MENSAGEM = 40
+
+
+def montar_evento(tipo, instancia, **extra):
+    """Evento compacto de um processo (campos None são omitidos)"""
+    evento = {
+        'evento': tipo,
+        'processo': instancia.pk,
+        'numero': instancia.numero,
+        'tipo': instancia.tipo_processo_id,
+        'fase': instancia.fase_atual_id,
+        **extra,
+    }
+    return {chave: valor for chave, valor in evento.items() if valor is not None}
+
+
+def publicar(eventos):
+    """Envia os eventos a todos os workers após o commit da transação corrente"""
+    eventos = list(eventos)
+    if not eventos:
+        return
+
+    def enviar():
+        backend = obter_broker().backend
+        for inicio in range(0, len(eventos), EVENTOS_POR_MENSAGEM):
+            mensagem = json.dumps(eventos[inicio:inicio + EVENTOS_POR_MENSAGEM], separators=(',', ':'), default=str)
+            try:
+                backend.publicar(mensagem)
+            except Exception:
+                # Eventos ao vivo são um atalho: a falha não desfaz a operação
+                logger.exception("Falha ao publicar eventos de processos")
+
+    transaction.on_commit(enviar)
+
+
+class MemoriaBackend:
+    """Entrega apenas aos streams do próprio processo"""
+
+    def __init__(self):
+        self._entregar = None
+
+    def iniciar(self, entregar):
+        self._entregar = entregar
+
+    def publicar(self, mensagem):
+        if self._entregar:
+            self._entregar(mensagem)
+
+
+class SocketBackend:
+    """
+    Um socket Unix de datagramas por worker em EVENTOS_SOCKET_DIR
+    Publicar envia a mensagem para todos os sockets do diretório; sockets de
+    workers encerrados são removidos no primeiro envio que falhar
+    """
+
+    def __init__(self):
+        self.diretorio = settings.EVENTOS_SOCKET_DIR
+        self._envio = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # Nunca bloqueia a requisição: com a fila do destino cheia o evento é descartado
+        self._envio.setblocking(False)
+
+    def iniciar(self, entregar):
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = os.path.join(self.diretorio, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.sock')
+        recepcao = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        recepcao.bind(caminho)
+        atexit.register(self._remover, caminho)
+
+        def receber():
+            while True:
+                entregar(recepcao.recv(65536).decode())
+
+        threading.Thread(target=receber, name='eventos-socket', daemon=True).start()
+
+    @staticmethod
+    def _remover(caminho):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+    def publicar(self, mensagem):
+        dados = mensagem.encode()
+        try:
+            nomes = os.listdir(self.diretorio)
+        except FileNotFoundError:
+            return
+        for nome in nomes:
+            if not nome.endswith('.sock'):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                self._envio.sendto(dados, caminho)
+            except (ConnectionRefusedError, FileNotFoundError):
+                self._remover(caminho)
+            except OSError as e:
+                logger.warning("Evento descartado para %s: %s", nome, e)
+
+
+class PostgresBackend:
+    """LISTEN numa conexão dedicada (thread própria) e NOTIFY pela conexão do Django"""
+
+    def iniciar(self, entregar):
+        parametros = connection.get_connection_params()
+        threading.Thread(
+            target=self._escutar, args=(parametros, entregar), name='eventos-listen', daemon=True
+        ).start()
+
+    @staticmethod
+    def _escutar(parametros, entregar):
+        import psycopg2
+
+        while True:
+            try:
+                conexao = psycopg2.connect(**parametros)
+                conexao.autocommit = True
+                with conexao.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CANAL}')
+                while True:
+                    if select.select([conexao], [], [], 30) == ([], [], []):
+                        continue
+                    conexao.poll()
+                    while conexao.notifies:
+                        entregar(conexao.notifies.pop(0).payload)
+            except psycopg2.Error as e:
+                logger.warning("Conexão LISTEN perdida (%s); reconectando em 5s", e)
+                time.sleep(5)
+
+    def publicar(self, mensagem):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CANAL, mensagem])
+
+
+BACKENDS = {
+    'memoria': MemoriaBackend,
+    'socket': SocketBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+class Assinatura:
+    """Fila de eventos de uma conexão SSE, consumida no loop asyncio da conexão"""
+
+    def __init__(self, loop, tamanho):
+        self.loop = loop
+        self.fila = asyncio.Queue(tamanho)
+        # Eventos descartados com a fila cheia: o cliente deve recarregar
+        self.atrasada = False
+
+    def receber(self, eventos):
+        for evento in eventos:
+            if self.fila.full():
+                self.atrasada = True
+                return
+            self.fila.put_nowait(evento)
+
+
+class Broker:
+    """Distribui as mensagens do backend para as assinaturas do processo"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+        self._iniciado = False
+
+    def assinar(self):
+        """Nova assinatura no loop corrente; inicia a escuta do backend na primeira"""
+        assinatura = Assinatura(asyncio.get_running_loop(), settings.EVENTOS_FILA_MAXIMA)
+        with self._lock:
+            if not self._iniciado:
+                self.backend.iniciar(self._entregar)
+                self._iniciado = True
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def _entregar(self, mensagem):
+        """Chamado pelo backend, em qualquer thread"""
+        try:
+            eventos = json.loads(mensagem)
+        except ValueError:
+            logger.warning("Mensagem de eventos inválida descartada")
+            return
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            try:
+                assinatura.loop.call_soon_threadsafe(assinatura.receber, eventos)
+            except RuntimeError:
+                # Loop encerrado sem cancelar a assinatura
+                self.cancelar(assinatura)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def obter_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = settings.EVENTOS_BACKEND
+                classe = BACKENDS.get(backend) or import_string(backend)
+                _broker = Broker(classe())
+    return _broker
+
+
+def visivel(evento, fases, tipo_processo_id=None):
+    """Evento de um processo que está (ou estava) numa das fases; fases=None: todas"""
+    if tipo_processo_id and evento.get('tipo') != tipo_processo_id:
+        return False
+    return fases is None or evento.get('fase') in fases or evento.get('fase_anterior') in fases
+
+
+def _sse(evento, dados):
+    return f"event: {evento}\ndata: {json.dumps(dados, separators=(',', ':'), ensure_ascii=False)}\n\n"
+
+
+async def fluxo(fases, tipo_processo_id=None):
+    """
+    Stream SSE de uma conexão: os eventos visíveis, um comentário de ping a
+    cada EVENTOS_PING_SEGUNDOS e o encerramento após EVENTOS_CONEXAO_SEGUNDOS
+    (o navegador reconecta sozinho). O limite de duração também libera
+    conexões de clientes que saíram sem o servidor perceber
+    """
+    broker = obter_broker()
+    assinatura = broker.assinar()
+    loop = asyncio.get_running_loop()
+    fim = loop.time() + settings.EVENTOS_CONEXAO_SEGUNDOS
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            restante = fim - loop.time()
+            if restante <= 0:
+                break
+            if assinatura.atrasada:
+                assinatura.atrasada = False
+                yield _sse('recarregar', {})
+            try:
+                evento = await asyncio.wait_for(
+                    assinatura.fila.get(), min(restante, settings.EVENTOS_PING_SEGUNDOS)
+                )
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if visivel(evento, fases, tipo_processo_id):
+                yield _sse(evento['evento'], evento)
+    finally:
+        broker.cancelar(assinatura)
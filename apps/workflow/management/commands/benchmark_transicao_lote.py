@@ -0,0 +1,72 @@
+"""
+Benchmark da mudança de fase em lote
+Mostra que o número de consultas se mantém constante conforme N cresce
+Execute: python manage.py benchmark_transicao_lote --tamanhos 10 100 1000
+"""
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.core.models import TipoProcesso, Fase
+from apps.processos.models import InstanciaProcesso
+from apps.workflow.services import WorkflowService
+
+
+class Command(BaseCommand):
+    help = 'Mede consultas e tempo de WorkflowService.transicionar_em_lote para vários tamanhos de lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--usuario', default='admin', help='Username que executa as transições')
+        parser.add_argument('--manter', action='store_true', help='Não remove os dados criados')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário não encontrado: {options['usuario']}")
+
+        tipo, origem, destino = self._criar_tipo()
+        try:
+            self.stdout.write(f"{'N':>8} {'consultas':>10} {'tempo (ms)':>12}")
+            for tamanho in options['tamanhos']:
+                ids = self._criar_processos(tipo, origem, tamanho)
+                processos = InstanciaProcesso.objects.filter(id__in=ids)
+
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    resultados = WorkflowService.transicionar_em_lote(processos, destino, usuario)
+                    duracao = time.perf_counter() - inicio
+
+                falhas = sum(1 for _, sucesso, _ in resultados if not sucesso)
+                linha = f"{tamanho:>8} {len(consultas):>10} {duracao * 1000:>12.1f}"
+                if falhas:
+                    linha += f"  ({falhas} falhas)"
+                self.stdout.write(linha)
+        finally:
+            if not options['manter']:
+                InstanciaProcesso.objects.filter(tipo_processo=tipo).delete()
+                tipo.delete()
+
+    def _criar_tipo(self):
+        sufixo = uuid.uuid4().hex[:6].upper()
+        tipo = TipoProcesso.objects.create(
+            nome=f'Benchmark Lote {sufixo}',
+            descricao='Tipo temporário criado pelo benchmark de mudança de fase em lote',
+            prefixo_numero='LOTE' + ''.join(c for c in sufixo if c.isalpha())[:6],
+        )
+        origem = Fase.objects.create(
+            tipo_processo=tipo, nome='Origem', ordem=1, setor_responsavel='TODOS', fase_inicial=True
+        )
+        destino = Fase.objects.create(
+            tipo_processo=tipo, nome='Destino', ordem=2, setor_responsavel='TODOS'
+        )
+        return tipo, origem, destino
+
+    def _criar_processos(self, tipo, fase, quantidade):
+        instancias = WorkflowService.criar_processos_em_lote(tipo, fase, [{} for _ in range(quantidade)])
+        return [instancia.id for instancia in instancias]
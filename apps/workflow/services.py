@@ -3,7 +3,15 @@ Serviço de Workflow
 Gerencia as transições de fase e validações do processo
 """
 from django.db import transaction
-from apps.auditoria.models import HistoricoProcesso
+from django.db.models import QuerySet
+from django.utils import timezone
+from apps.auditoria.models import HistoricoProcesso, SnapshotProcesso
+from apps.auditoria.estado import registrar_snapshot
+from apps.processos.models import InstanciaProcesso, ContagemFase, EstadiaFase
+from apps.processos.busca import atualizar_documento, atualizar_documentos
+from apps.processos.condicional import registrar_alteracao
+from apps.processos.tipados import altera_tipados, atualizar_valores
+from apps.workflow.eventos import montar_evento, publicar
 
 
 class WorkflowService:
@@ -11,6 +19,101 @@ class WorkflowService:
     Serviço centralizado para gerenciar o workflow dos processos
     """
 
+    @staticmethod
+    @transaction.atomic
+    def criar_processo(tipo_processo, fase, dados, origem='criacao_interna', usuario=None, observacoes=''):
+        """
+        Cria um processo com seu registro de criação e índices auxiliares
+        
+        Returns:
+            InstanciaProcesso
+        """
+        instancia = InstanciaProcesso.objects.create(
+            tipo_processo=tipo_processo,
+            fase_atual=fase,
+            dados=dados,
+            origem=origem,
+            criado_por=usuario
+        )
+        
+        evento = HistoricoProcesso.registrar_criacao(
+            instancia_processo=instancia,
+            usuario=usuario,
+            observacoes=observacoes
+        )
+        SnapshotProcesso.capturar(instancia, evento).save()
+        EstadiaFase.objects.create(
+            instancia_processo=instancia, fase=fase, entrada_em=evento.criado_em, usuario_entrada=usuario
+        )
+        
+        atualizar_documentos([instancia])
+        atualizar_valores([instancia], novos=True)
+        ContagemFase.ajustar({fase.id: 1})
+        registrar_alteracao(tipo_processo.id)
+        publicar([montar_evento('criacao', instancia, fase_nome=fase.nome)])
+        
+        return instancia
+
+    @staticmethod
+    @transaction.atomic
+    def criar_processos_em_lote(tipo_processo, fase, lista_dados, origem='criacao_interna', usuario=None, observacoes=None):
+        """
+        Cria vários processos com uma única reserva de numeração
+        e um bulk_create para cada tabela
+        
+        Args:
+            lista_dados: lista de dicts com os dados de cada processo
+            observacoes: lista com a observação de criação de cada processo (opcional)
+        
+        Returns:
+            list[InstanciaProcesso]
+        """
+        if not lista_dados:
+            return []
+        
+        ano = timezone.now().year
+        sequencias = tipo_processo.reservar_sequencias(len(lista_dados), ano=ano)
+        
+        instancias = InstanciaProcesso.objects.bulk_create([
+            InstanciaProcesso(
+                tipo_processo=tipo_processo,
+                numero=InstanciaProcesso.formatar_numero(tipo_processo, ano, sequencia),
+                fase_atual=fase,
+                dados=dados,
+                origem=origem,
+                criado_por=usuario,
+            )
+            for dados, sequencia in zip(lista_dados, sequencias)
+        ])
+        
+        observacoes = observacoes or [''] * len(instancias)
+        eventos = HistoricoProcesso.objects.bulk_create([
+            HistoricoProcesso.construir_criacao(
+                instancia_processo=instancia,
+                usuario=usuario,
+                observacoes=observacao
+            )
+            for instancia, observacao in zip(instancias, observacoes)
+        ])
+        SnapshotProcesso.objects.bulk_create([
+            SnapshotProcesso.capturar(instancia, evento)
+            for instancia, evento in zip(instancias, eventos)
+        ])
+        EstadiaFase.objects.bulk_create([
+            EstadiaFase(
+                instancia_processo=instancia, fase=fase, entrada_em=evento.criado_em, usuario_entrada=usuario
+            )
+            for instancia, evento in zip(instancias, eventos)
+        ])
+        
+        atualizar_documentos(instancias)
+        atualizar_valores(instancias, novos=True)
+        ContagemFase.ajustar({fase.id: len(instancias)})
+        registrar_alteracao(tipo_processo.id)
+        publicar(montar_evento('criacao', instancia, fase_nome=fase.nome) for instancia in instancias)
+        
+        return instancias
+
     @staticmethod
     @transaction.atomic
     def transicionar_fase(instancia, nova_fase, usuario, observacoes=''):
@@ -26,6 +129,13 @@ class WorkflowService:
         Returns:
             (sucesso: bool, mensagem: str)
         """
+        # Bloqueia o processo; se outra mudança alterou a fase, relê a atual
+        fase_atual_id = InstanciaProcesso.objects.select_for_update().values_list(
+            'fase_atual_id', flat=True
+        ).get(pk=instancia.pk)
+        if fase_atual_id != instancia.fase_atual_id:
+            instancia.refresh_from_db(fields=['fase_atual'])
+        
         # Validações
         valido, mensagem = WorkflowService.validar_transicao(instancia, nova_fase, usuario)
         if not valido:
@@ -43,18 +153,103 @@ class WorkflowService:
         # Atualiza a fase
         instancia.fase_atual = nova_fase
         instancia.save()
+        ContagemFase.ajustar({fase_anterior.id: -1, nova_fase.id: 1})
         
-        # Registra no histórico
-        HistoricoProcesso.registrar_mudanca_fase(
+        # Registra no histórico (com snapshot do estado a cada mudança de fase)
+        evento = HistoricoProcesso.registrar_mudanca_fase(
             instancia_processo=instancia,
             fase_anterior=fase_anterior,
             fase_nova=nova_fase,
             usuario=usuario,
             observacoes=observacoes
         )
+        SnapshotProcesso.capturar(instancia, evento).save()
+        EstadiaFase.registrar_mudanca([instancia], nova_fase, usuario, evento.criado_em)
+        registrar_alteracao(instancia.tipo_processo_id)
+        publicar([montar_evento(
+            'fase', instancia, fase_anterior=fase_anterior.id, fase_nome=nova_fase.nome, cor=nova_fase.cor_badge
+        )])
         
         return True, f"Processo movido para a fase: {nova_fase.nome}"
 
+    @staticmethod
+    @transaction.atomic
+    def transicionar_em_lote(instancias, nova_fase, usuario, observacoes=''):
+        """
+        Move vários processos para a mesma fase
+        Valida cada processo sem consultas adicionais (esquema e permissões
+        em cache) e grava com um bulk_update e um bulk_create de histórico
+        
+        Args:
+            instancias: QuerySet ou lista de InstanciaProcesso (relidos com bloqueio)
+            nova_fase: Fase de destino
+            usuario: User que está realizando a transição
+            observacoes: Observações registradas em cada processo
+        
+        Returns:
+            list[(instancia, sucesso: bool, mensagem: str)]
+        """
+        # Bloqueia os processos movidos (em ordem de id): duas mudanças
+        # simultâneas do mesmo processo fechariam a mesma estadia duas vezes
+        if not isinstance(instancias, QuerySet):
+            instancias = InstanciaProcesso.objects.filter(id__in=[instancia.id for instancia in instancias])
+        instancias = instancias.select_related('fase_atual').select_for_update(of=('self',)).order_by('id')
+        
+        resultados = []
+        movidas = []
+        eventos = []
+        deltas = {}
+        agora = timezone.now()
+        
+        for instancia in instancias:
+            valido, mensagem = WorkflowService.validar_transicao(instancia, nova_fase, usuario)
+            if valido:
+                campos_validos, campos_faltantes = instancia.validar_campos_obrigatorios(nova_fase)
+                if not campos_validos:
+                    valido = False
+                    mensagem = f"Campos obrigatórios não preenchidos: {', '.join(campos_faltantes)}"
+            
+            if not valido:
+                resultados.append((instancia, False, mensagem))
+                continue
+            
+            deltas[instancia.fase_atual_id] = deltas.get(instancia.fase_atual_id, 0) - 1
+            evento = HistoricoProcesso.construir_mudanca_fase(
+                instancia_processo=instancia,
+                fase_anterior=instancia.fase_atual,
+                fase_nova=nova_fase,
+                usuario=usuario,
+                observacoes=observacoes
+            )
+            # Mesmo instante no evento, no snapshot e nas estadias
+            evento.criado_em = agora
+            eventos.append(evento)
+            instancia.fase_atual = nova_fase
+            instancia.atualizado_em = agora
+            movidas.append(instancia)
+            resultados.append((instancia, True, f"Processo movido para a fase: {nova_fase.nome}"))
+        
+        if movidas:
+            InstanciaProcesso.objects.bulk_update(movidas, ['fase_atual', 'atualizado_em'], batch_size=500)
+            HistoricoProcesso.objects.bulk_create(eventos, batch_size=500)
+            SnapshotProcesso.objects.bulk_create([
+                SnapshotProcesso.capturar(instancia, evento)
+                for instancia, evento in zip(movidas, eventos)
+            ], batch_size=500)
+            EstadiaFase.registrar_mudanca(movidas, nova_fase, usuario, agora)
+            deltas[nova_fase.id] = len(movidas)
+            ContagemFase.ajustar(deltas)
+            registrar_alteracao(nova_fase.tipo_processo_id)
+            publicar(
+                montar_evento(
+                    'fase', instancia, fase_anterior=evento.fase_anterior_id,
+                    fase_nome=nova_fase.nome, cor=nova_fase.cor_badge
+                )
+                for instancia, evento in zip(movidas, eventos)
+            )
+        
+        return resultados
+
     @staticmethod
     def validar_transicao(instancia, nova_fase, usuario):
         """
@@ -64,7 +259,7 @@ class WorkflowService:
             (valido: bool, mensagem: str)
         """
         # Verifica se a nova fase pertence ao mesmo tipo de processo
-        if nova_fase.tipo_processo != instancia.tipo_processo:
+        if nova_fase.tipo_processo_id != instancia.tipo_processo_id:
             return False, "A fase selecionada não pertence a este tipo de processo"
         
         # Verifica se não é a mesma fase
@@ -112,13 +307,19 @@ class WorkflowService:
         instancia.responsavel_atual = novo_responsavel
         instancia.save()
         
-        HistoricoProcesso.registrar_atribuicao(
+        evento = HistoricoProcesso.registrar_atribuicao(
             instancia_processo=instancia,
             usuario_responsavel_anterior=responsavel_anterior,
             usuario_responsavel_novo=novo_responsavel,
             usuario_que_atribuiu=usuario_que_atribuiu,
             observacoes=observacoes
         )
+        registrar_snapshot(instancia, evento)
+        registrar_alteracao(instancia.tipo_processo_id)
+        publicar([montar_evento(
+            'atribuicao', instancia,
+            responsavel=novo_responsavel.get_full_name() or novo_responsavel.username
+        )])
         
         return True, f"Processo atribuído para {novo_responsavel.get_full_name() or novo_responsavel.username}"
 
@@ -153,14 +354,20 @@ class WorkflowService:
         # Atualiza os dados
         instancia.dados.update(novos_dados)
         instancia.save()
+        atualizar_documento(instancia)
+        if altera_tipados(instancia, campos_alterados):
+            atualizar_valores([instancia])
         
         # Registra no histórico
-        HistoricoProcesso.registrar_edicao_dados(
+        evento = HistoricoProcesso.registrar_edicao_dados(
             instancia_processo=instancia,
             usuario=usuario,
             campos_alterados=campos_alterados,
             observacoes=observacoes
         )
+        registrar_snapshot(instancia, evento)
+        registrar_alteracao(instancia.tipo_processo_id)
+        publicar([montar_evento('edicao', instancia, campos=list(campos_alterados))])
         
         return True, "Dados atualizados com sucesso"
 
@@ -181,5 +388,6 @@ class WorkflowService:
             usuario=usuario,
             comentario=comentario
         )
+        publicar([montar_evento('comentario', instancia)])
         
         return True, "Comentário adicionado com sucesso"
@@ -3,6 +3,9 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Necessário para os eventos ao vivo (/processos/eventos/):
+    uvicorn config.asgi:application --workers 4 --timeout-graceful-shutdown 10
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
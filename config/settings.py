@@ -41,11 +41,13 @@ INSTALLED_APPS = [
     'apps.formularios',
     'apps.auditoria',
     'apps.usuarios',
+    'apps.api',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Para servir arquivos estáticos
+    'apps.core.middleware.ArquivosEstaticosMiddleware',  # WhiteNoise (arquivos estáticos), também no ASGI
+    'apps.core.middleware.DesempenhoMiddleware',  # Consultas e tempo por view
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,6 +89,22 @@ DATABASES = {
 }
 
 
+# Cache
+# Os carimbos de versão que validam o conteúdo em cache ficam no banco
+# (apps.core.versoes), então o LocMemCache por worker é seguro; um cache
+# compartilhado (ex: Redis) só evita recalcular o mesmo conteúdo em cada worker
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='workflow'),
+    }
+}
+
+# Segundos que cada worker reaproveita um carimbo de versão lido do banco:
+# atraso máximo para uma alteração feita em outro worker ser percebida
+CACHE_VERSOES_SEGUNDOS = config('CACHE_VERSOES_SEGUNDOS', default=5, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -149,6 +167,89 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'processos:lista'
 LOGOUT_REDIRECT_URL = 'login'
 
+# Formulários externos
+# Quando ativo, as submissões vão para a fila de entrada e são processadas
+# pelo comando processar_fila_formularios
+FORMULARIO_FILA_ASSINCRONA = config('FORMULARIO_FILA_ASSINCRONA', default=False, cast=bool)
+# Dias que as submissões concluídas ficam na fila antes de serem removidas pelo worker
+FORMULARIO_FILA_RETENCAO_DIAS = config('FORMULARIO_FILA_RETENCAO_DIAS', default=7, cast=int)
+# Validade da página renderizada no cache (também invalidada pelas versões
+# do formulário e do esquema do tipo de processo)
+FORMULARIO_CACHE_SEGUNDOS = config('FORMULARIO_CACHE_SEGUNDOS', default=86400, cast=int)
+
+# Listagem de processos: paginação por cursor (keyset) em vez de número de
+# página e, com filtros de busca/responsável, total estimado pelo banco.
+# Opcional: com o cursor ligado, links antigos com ?page= seguem por número de página
+PROCESSOS_PAGINACAO_CURSOR = config('PROCESSOS_PAGINACAO_CURSOR', default=False, cast=bool)
+PROCESSOS_CONTAGEM_APROXIMADA = config('PROCESSOS_CONTAGEM_APROXIMADA', default=False, cast=bool)
+
+# Eventos do histórico por página na tela do processo ("carregar anteriores")
+PROCESSOS_HISTORICO_POR_PAGINA = config('PROCESSOS_HISTORICO_POR_PAGINA', default=20, cast=int)
+
+# Exportação da listagem (CSV/XLSX em streaming): processos lidos por vez do banco
+PROCESSOS_EXPORTACAO_BLOCO = config('PROCESSOS_EXPORTACAO_BLOCO', default=2000, cast=int)
+
+# Quadro (kanban) por tipo de processo: cartões por coluna na carga e em cada "carregar mais"
+PROCESSOS_QUADRO_POR_COLUNA = config('PROCESSOS_QUADRO_POR_COLUNA', default=20, cast=int)
+
+# API JSON (/api/v1/): itens por página e máximo por página e por busca em lote
+API_POR_PAGINA = config('API_POR_PAGINA', default=100, cast=int)
+API_LIMITE_MAXIMO = config('API_LIMITE_MAXIMO', default=1000, cast=int)
+
+# Servidor ASGI (uvicorn config.asgi:application): formulário externo e API
+# JSON nas variantes assíncronas, com o ORM assíncrono. Mantenha False no
+# WSGI (gunicorn config.wsgi), onde cada view async abriria um loop de eventos
+VIEWS_ASSINCRONAS = config('VIEWS_ASSINCRONAS', default=False, cast=bool)
+
+# Eventos ao vivo (SSE em /processos/eventos/, servidor ASGI)
+# Backend que leva os eventos a todos os workers: memoria (um worker), socket
+# (workers da mesma máquina) ou postgresql (LISTEN/NOTIFY)
+EVENTOS_BACKEND = config('EVENTOS_BACKEND', default='memoria')
+EVENTOS_SOCKET_DIR = config('EVENTOS_SOCKET_DIR', default='/tmp/workflow-eventos')
+EVENTOS_PING_SEGUNDOS = config('EVENTOS_PING_SEGUNDOS', default=15, cast=int)
+EVENTOS_CONEXAO_SEGUNDOS = config('EVENTOS_CONEXAO_SEGUNDOS', default=300, cast=int)
+EVENTOS_FILA_MAXIMA = config('EVENTOS_FILA_MAXIMA', default=1000, cast=int)
+
+# Arquivamento do histórico de processos (comando arquivar_historico)
+# Meses fora da retenção vão para segmentos JSONL compactados neste diretório
+HISTORICO_ARQUIVO_DIR = config('HISTORICO_ARQUIVO_DIR', default=str(BASE_DIR / 'arquivo_historico'))
+HISTORICO_RETENCAO_MESES = config('HISTORICO_RETENCAO_MESES', default=12, cast=int)
+
+# Snapshots do estado dos processos (reconstrução em um instante): gravados na
+# criação, em cada mudança de fase e a cada N edições/atribuições
+HISTORICO_SNAPSHOT_INTERVALO = config('HISTORICO_SNAPSHOT_INTERVALO', default=50, cast=int)
+
+# Análise do workflow (comando analisar_workflow e /configuracoes/analitico/)
+# Colunas extraídas do histórico (arquivos binários lidos com numpy.memmap)
+ANALITICO_DIR = config('ANALITICO_DIR', default=str(BASE_DIR / 'analitico'))
+# Idade mínima dos eventos extraídos: maior que a transação mais longa que
+# grava histórico, para que nenhum id confirmado tarde fique abaixo da marca
+ANALITICO_ATRASO_SEGUNDOS = config('ANALITICO_ATRASO_SEGUNDOS', default=600, cast=int)
+
+# Instrumentação de desempenho (consultas SQL e tempo por view)
+# As medições vão para o log 'workflow.desempenho' (JSON por linha) e para um
+# buffer com as últimas DESEMPENHO_REGISTROS requisições em /configuracoes/desempenho/
+DESEMPENHO_MONITORAR = config('DESEMPENHO_MONITORAR', default=True, cast=bool)
+DESEMPENHO_REGISTROS = config('DESEMPENHO_REGISTROS', default=500, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'mensagem': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'mensagem'},
+    },
+    'loggers': {
+        'workflow.desempenho': {
+            'handlers': ['console'],
+            'level': config('DESEMPENHO_LOG_NIVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 # Messages
 from django.contrib.messages import constants as messages
 
@@ -21,6 +21,7 @@ urlpatterns = [
     path('processos/', include('apps.processos.urls')),
     path('formulario/', include('apps.formularios.urls')),
     path('configuracoes/', include('apps.core.urls')),
+    path('api/v1/', include('apps.api.urls')),
     
     # Redirect raiz para lista de processos
     path('', RedirectView.as_view(url='/processos/', permanent=False)),